@@ -5,12 +5,21 @@ import tracemalloc
 import logging
 import json
 from utils.github_utils import load_github
-from utils.database_utils import setup_database_connection
+from utils.database_utils import setup_database_pool, database_health_clock
 from utils.config_utils import load_config
-from utils.wild_utils import wild_pokemon_spawn_clock
-from utils.battle_channel_utils import monitor_all_battle_channels_clock
-from utils.battle_commands_utils import on_message_battle_commands
-from utils.hourly_item_grant import hourly_item_grant
+from utils.wild_utils import wild_pokemon_spawn_clock, MAX_RATELIMIT_WAIT
+from utils.capture_utils import CaptureButton
+from utils.spawn_message_utils import spawn_expiry_clock
+from utils.battle_channel_utils import monitor_all_battle_channels_clock, BATTLE_INACTIVITY, BATTLE_CHANNELS
+from utils.battle_session_utils import BATTLES, battle_checkpoint_clock
+from utils.battle_commands_utils import on_message_battle_commands, is_battle_channel
+from utils.store_utils import configure_storage, store_flush_clock, flush_all
+from utils.loop_lag_utils import loop_lag_clock
+from utils.registry_utils import Registry
+from utils.spawn_sampler_utils import SpawnSampler
+from utils.spawn_scheduler_utils import SpawnScheduler
+from utils.battle_engine_utils import BattleEngine
+from utils.leaderboard_utils import LEADERBOARDS
 
 
 handler = logging.FileHandler(filename='discord.log', encoding='utf-8', mode='w')
@@ -18,6 +27,8 @@ logging.basicConfig(level=logging.INFO, handlers=[handler])
 
 config = load_config()
 load_github(config)
+db_pool = setup_database_pool(config)
+configure_storage(config, db_pool)
 
 # Load pokemon.json and abilities.json into bot attributes
 def load_json_data(path):
@@ -36,9 +47,11 @@ PREFIX = "!"
 
 # Ensure application_id exists in config
 application_id = int(config.get('application_id', 0))
-bot = commands.AutoShardedBot(command_prefix=PREFIX, intents=intents, application_id=application_id, help_command=None)
+# discord.py waits out per-route rate limits itself; one longer than this raises RateLimited instead
+bot = commands.AutoShardedBot(command_prefix=PREFIX, intents=intents, application_id=application_id, help_command=None,
+                             max_ratelimit_timeout=MAX_RATELIMIT_WAIT)
 bot.config = config
-bot.db_connection = setup_database_connection(config)
+bot.db_pool = db_pool
 bot.media = "https://echodebates.com/bot_media/pokemon/"
 
 POKEMON_JSON_PATH = os.path.join("datastores", "pokemon.json")
@@ -52,8 +65,12 @@ bot.abilities = load_json_data(ABILITIES_JSON_PATH)
 bot.badges = load_json_data(BADGES_JSON_PATH)
 bot.types = load_json_data(TYPES_JSON_PATH)
 bot.items = load_json_data(ITEMS_JSON_PATH)
-bot.spawnrate = 60
-bot.pokeballrate = 3600
+# Indexed, read-only view of the same data; use it for lookups instead of scanning the lists
+bot.registry = Registry(bot.pokemon, bot.items, bot.abilities, bot.badges)
+bot.spawn_sampler = SpawnSampler(bot.registry)
+bot.spawn_scheduler = SpawnScheduler()
+bot.battle_engine = BattleEngine(bot.registry, bot.types)
+bot.spawnrate = 60  # default seconds between spawns; guilds can override with settings["spawn_interval"]
 
 # Start memory tracking
 tracemalloc.start()
@@ -87,22 +104,40 @@ async def on_ready():
 async def setup_hook():
     await load_extensions_from_folder('functions')
     await bot.tree.sync()
+    await BATTLES.restore()
+    BATTLE_CHANNELS.rebuild(BATTLES.sessions())
+    await LEADERBOARDS.restore()
+    # Capture buttons on spawn messages posted before a restart keep working
+    bot.add_dynamic_items(CaptureButton)
     bot.loop.create_task(wild_pokemon_spawn_clock(bot))
+    bot.loop.create_task(spawn_expiry_clock(bot))
     bot.loop.create_task(monitor_all_battle_channels_clock(bot))
-    bot.loop.create_task(hourly_item_grant(bot))
+    bot.loop.create_task(store_flush_clock(bot))
+    bot.loop.create_task(battle_checkpoint_clock(bot))
+    bot.loop.create_task(loop_lag_clock(bot))
+    if bot.db_pool:
+        bot.loop.create_task(database_health_clock(bot))
     
 # Assign setup_hook to the bot
 bot.setup_hook = setup_hook
 
 @bot.event
 async def on_message(message):
-    await on_message_battle_commands(bot, message)
+    BATTLE_INACTIVITY.touch(message.channel.id)
+    # Only battle channels go through the battle router; everything else skips it with one set lookup
+    if message.guild and is_battle_channel(message.guild, message.channel.id):
+        await on_message_battle_commands(bot, message)
     await bot.process_commands(message)
 
 # Run the bot with token
 if __name__ == '__main__':
     token = config.get('token', '')
     if token:
-        bot.run(token, log_handler=handler, log_level=logging.INFO)
+        try:
+            bot.run(token, log_handler=handler, log_level=logging.INFO)
+        finally:
+            # Write back anything still dirty in the record cache
+            BATTLES.flush()
+            flush_all()
     else:
         print("No token found in config! Please check your config.json file.")
@@ -1,7 +1,10 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from utils.player_handler import read_user_record, remove_active_pokemon
+from utils.player_handler import load_user_record, remove_active_pokemon
+from utils.render_cache_utils import RENDER_CACHE, record_version
+from utils.team_utils import hydrate_team
+from utils.guild_actor_utils import GUILD_ACTORS
 
 class RemovePokemonButton(discord.ui.Button):
     def __init__(self, idx, poke_name):
@@ -27,7 +30,7 @@ class ConfirmRemoveView(discord.ui.View):
     async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
         guild_id = interaction.guild.id
         user_id = interaction.user.id
-        success = remove_active_pokemon(guild_id, user_id, self.idx)
+        success = await GUILD_ACTORS.run(guild_id, remove_active_pokemon, guild_id, user_id, self.idx, interaction.client.registry)
         if success:
             await interaction.response.edit_message(content=f"Pokémon #{self.idx+1} has been removed from your active team.", view=None)
         else:
@@ -41,41 +44,49 @@ class ConfirmRemoveView(discord.ui.View):
         self.value = False
         self.stop()
 
+def render_team_table(active_pokemon):
+    """The team's stats as a code-block table. Takes hydrated team entries."""
+    # Build a table of stats
+    headers = ["#", "Name", "Type", "CP", "HP", "Atk", "Def", "Rarity"]
+    rows = []
+    for idx, poke in enumerate(active_pokemon, 1):
+        rows.append([
+            str(idx),
+            poke.get("name", "Unknown"),
+            ", ".join(poke.get("type", [])),
+            str(poke.get("cp", "")),
+            str(poke.get("hp", "")),
+            str(poke.get("attack", "")),
+            str(poke.get("defense", "")),
+            poke.get("rarity", "")
+        ])
+
+    # Format as a code block table
+    col_widths = [max(len(str(row[i])) for row in [headers] + rows) for i in range(len(headers))]
+    def format_row(row):
+        return " | ".join(str(cell).ljust(col_widths[i]) for i, cell in enumerate(row))
+    table = [format_row(headers)]
+    table.append("-+-".join("-" * w for w in col_widths))
+    table += [format_row(row) for row in rows]
+    table_str = "```\n" + "\n".join(table) + "\n```"
+    return table_str
+
 class ActivePokemon(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
     @app_commands.command(name="active", description="Show your active Pokémon team and their stats.")
     async def active(self, interaction: discord.Interaction):
-        user_data = read_user_record(interaction.guild.id, interaction.user.id)
+        user_data = await load_user_record(interaction.guild.id, interaction.user.id)
         if not user_data or not user_data.get("active_pokemon"):
             await interaction.response.send_message("You have no active Pokémon. Use `/starter` to get started!", ephemeral=True)
             return
 
-        active_pokemon = user_data["active_pokemon"]
-        # Build a table of stats
-        headers = ["#", "Name", "Type", "CP", "HP", "Atk", "Def", "Rarity"]
-        rows = []
-        for idx, poke in enumerate(active_pokemon, 1):
-            rows.append([
-                str(idx),
-                poke.get("name", "Unknown"),
-                ", ".join(poke.get("type", [])),
-                str(poke.get("cp", "")),
-                str(poke.get("hp", "")),
-                str(poke.get("attack", "")),
-                str(poke.get("defense", "")),
-                poke.get("rarity", "")
-            ])
-
-        # Format as a code block table
-        col_widths = [max(len(str(row[i])) for row in [headers] + rows) for i in range(len(headers))]
-        def format_row(row):
-            return " | ".join(str(cell).ljust(col_widths[i]) for i, cell in enumerate(row))
-        table = [format_row(headers)]
-        table.append("-+-".join("-" * w for w in col_widths))
-        table += [format_row(row) for row in rows]
-        table_str = "```\n" + "\n".join(table) + "\n```"
+        active_pokemon = hydrate_team(self.bot.registry, user_data["active_pokemon"])
+        table_str = RENDER_CACHE.get_or_render(
+            interaction.guild.id, interaction.user.id, "active", None, record_version(user_data),
+            lambda: render_team_table(active_pokemon)
+        )
         # Add a remove button for each Pokémon, but only if more than 1 Pokémon
         view = discord.ui.View(timeout=120)
         if len(active_pokemon) > 1:
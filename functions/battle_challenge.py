@@ -2,16 +2,44 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from utils.battle_channel_utils import create_battle_channel, delete_battle_channel
-import os
-import json
+from utils.battle_session_utils import BATTLES, BattleError
+from utils.leaderboard_utils import LEADERBOARDS
+from utils.player_handler import load_user_record
+from utils.rating_utils import DEFAULT_RATING
+
+CHALLENGE_SUGGESTIONS = 5
 
 class BattleChallenge(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    def suggest_opponents(self, guild, user_id):
+        """Trainers in this server rated closest to the user, from the rating index."""
+        board = LEADERBOARDS.board(guild.id)
+        suggestions = []
+        # Ask for extra in case some have left the server
+        for other_id, rating in board.nearest("rating", str(user_id), CHALLENGE_SUGGESTIONS * 2):
+            member = guild.get_member(int(other_id))
+            if member and not member.bot:
+                suggestions.append((member, rating))
+            if len(suggestions) == CHALLENGE_SUGGESTIONS:
+                break
+        return suggestions
+
     @app_commands.command(name="challenge", description="Challenge another user to a Pokémon battle!")
-    @app_commands.describe(opponent="The user you want to challenge")
-    async def challenge(self, interaction: discord.Interaction, opponent: discord.Member):
+    @app_commands.describe(opponent="The user you want to challenge (leave empty for suggestions near your rating)")
+    async def challenge(self, interaction: discord.Interaction, opponent: discord.Member = None):
+        if opponent is None:
+            suggestions = self.suggest_opponents(interaction.guild, interaction.user.id)
+            if not suggestions:
+                await interaction.response.send_message("No other trainers to suggest yet. Invite a friend to `/join`!", ephemeral=True)
+                return
+            lines = "\n".join(f"{member.mention} - {rating}" for member, rating in suggestions)
+            await interaction.response.send_message(
+                f"Trainers close to your rating:\n{lines}\n\nUse `/challenge opponent:` to send a challenge.",
+                ephemeral=True
+            )
+            return
         if opponent.id == interaction.user.id:
             await interaction.response.send_message("You can't challenge yourself!", ephemeral=True)
             return
@@ -37,19 +65,11 @@ class BattleChallenge(commands.Cog):
         guild = interaction.guild
 
         # Check if this channel is an active battle channel and if the user is a participant
-        servers_dir = os.path.join(os.getcwd(), "servers")
-        data_file = os.path.join(servers_dir, str(guild.id), "data.json")
-        if not os.path.isfile(data_file):
-            await interaction.response.send_message("No battle data found for this server.", ephemeral=True)
-            return
-
-        with open(data_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        found = False
-        for battle in data.get("active_battles", []):
-            if battle["channel_id"] == channel.id and interaction.user.id in (battle["user1_id"], battle["user2_id"]):
-                found = True
-                break
+        session = BATTLES.get(channel.id)
+        try:
+            found = session is not None and session.side(interaction.user.id) is not None
+        except BattleError:
+            found = False
 
         if not found:
             await interaction.response.send_message("You can only end a battle if you are a participant in this battle channel.", ephemeral=True)
@@ -58,5 +78,25 @@ class BattleChallenge(commands.Cog):
         await delete_battle_channel(guild, channel.id)
         await interaction.response.send_message("Battle ended and channel will be deleted.", ephemeral=False)
 
+    @app_commands.command(name="rating", description="Show a trainer's battle rating and record.")
+    @app_commands.describe(trainer="The trainer to look up (default: you)")
+    async def rating(self, interaction: discord.Interaction, trainer: discord.Member = None):
+        trainer = trainer or interaction.user
+        user_data = await load_user_record(interaction.guild.id, trainer.id)
+        if not user_data:
+            await interaction.response.send_message(f"{trainer.display_name} hasn't set up a profile with `/join` yet.", ephemeral=True)
+            return
+        board = LEADERBOARDS.board(interaction.guild.id)
+        rank = board.rank_of("rating", str(trainer.id))
+        embed = discord.Embed(title=f"{trainer.display_name}'s Battle Rating", color=discord.Color.purple())
+        embed.add_field(name="Rating", value=str(user_data.get("rating", DEFAULT_RATING)), inline=True)
+        embed.add_field(name="Rank", value=f"#{rank} of {len(board.scores)}" if rank else "Unranked", inline=True)
+        embed.add_field(
+            name="Record",
+            value=f"{user_data.get('battle_wins', 0)} wins | {user_data.get('battle_losses', 0)} losses",
+            inline=True
+        )
+        await interaction.response.send_message(embed=embed)
+
 async def setup(bot):
     await bot.add_cog(BattleChallenge(bot))
\ No newline at end of file
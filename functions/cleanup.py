@@ -1,8 +1,13 @@
 import discord
 from discord.ext import commands
-import os
-import shutil
-from utils.server_handler import read_server_data, generate_pokemon_channels, send_welcome_embed, send_general_guide_embed, send_battle_guide_embed
+from utils.server_handler import load_server_data, generate_pokemon_channels, send_welcome_embed, send_general_guide_embed, send_battle_guide_embed
+from utils.store_utils import purge_guild
+from utils.wild_utils import schedule_next_spawn
+from utils.battle_session_utils import BATTLES
+from utils.leaderboard_utils import LEADERBOARDS
+from utils.spawn_claim_utils import SPAWN_CLAIMS
+from utils.spawn_message_utils import SPAWN_MESSAGES
+from utils.guild_actor_utils import GUILD_ACTORS
 
 class ServerCleanup(commands.Cog):
     def __init__(self, bot):
@@ -11,7 +16,13 @@ class ServerCleanup(commands.Cog):
     @commands.Cog.listener()
     async def on_guild_remove(self, guild):
         print(f"[Listener] Bot removed from guild {guild.id}. Cleaning up Pokémon channels and data.")
-        data = read_server_data(guild.id)
+        self.bot.spawn_scheduler.remove(guild.id)
+        BATTLES.drop_guild(guild.id)
+        LEADERBOARDS.drop_guild(guild.id)
+        SPAWN_CLAIMS.drop_guild(guild.id)
+        SPAWN_MESSAGES.forget_guild(guild.id)
+        GUILD_ACTORS.drop_guild(guild.id)
+        data = await load_server_data(guild.id)
         # Delete channels listed in data.json
         if data and "channels" in data:
             channels = data["channels"]
@@ -37,22 +48,20 @@ class ServerCleanup(commands.Cog):
                     except Exception as e:
                         print(f"[Cleanup] Failed to delete category ({cat_id}): {e}")
 
-        # Delete the server folder from the servers directory
-        servers_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "servers")
-        guild_folder = os.path.join(servers_dir, str(guild.id))
-        if os.path.exists(guild_folder):
-            try:
-                shutil.rmtree(guild_folder)
-                print(f"[Cleanup] Deleted server folder for guild {guild.id}")
-            except Exception as e:
-                print(f"[Cleanup] Failed to delete server folder for guild {guild.id}: {e}")
-        else:
-            print(f"[Cleanup] No server folder found for guild {guild.id}")
+        # Drop cached records so nothing is written back, then delete the stored server data
+        try:
+            if await purge_guild(guild.id):
+                print(f"[Cleanup] Deleted server data for guild {guild.id}")
+            else:
+                print(f"[Cleanup] No server data found for guild {guild.id}")
+        except Exception as e:
+            print(f"[Cleanup] Failed to delete server data for guild {guild.id}: {e}")
 
     @commands.Cog.listener()
     async def on_guild_join(self, guild):
         print(f"[Listener] Bot joined guild {guild.id}. Setting up Pokémon channels and guide embeds.")
         channels = await generate_pokemon_channels(guild)
+        schedule_next_spawn(self.bot, guild.id, await load_server_data(guild.id))
         guide_channel = guild.get_channel(channels["guide"])
         if guide_channel:
             import asyncio
@@ -1,8 +1,10 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from utils.wild_utils import log_active_spawn, generate_wild_pokemon
-from utils.capture_utils import CaptureButton
+from utils.wild_utils import log_active_spawn, generate_wild_pokemon, guild_spawn_slots
+from utils.server_handler import load_server_data, guild_spawns
+from utils.capture_utils import capture_view
+from utils.spawn_message_utils import SPAWN_MESSAGES, spawn_lifetime
 
 class ForceSpawn(commands.Cog):
     def __init__(self, bot):
@@ -12,14 +14,10 @@ class ForceSpawn(commands.Cog):
     @app_commands.checks.has_permissions(administrator=True)
     async def force_spawn(self, interaction: discord.Interaction):
         guild_id = str(interaction.guild.id)
-        servers_dir = "servers"
-        data_file = f"{servers_dir}/{guild_id}/data.json"
 
         # Load server data
-        try:
-            with open(data_file, "r", encoding="utf-8") as f:
-                data = __import__("json").load(f)
-        except Exception:
+        data = await load_server_data(guild_id)
+        if not data:
             await interaction.response.send_message("Server data not found or not set up.", ephemeral=True)
             return
 
@@ -29,26 +27,26 @@ class ForceSpawn(commands.Cog):
             await interaction.response.send_message("Wild channel not set up for this server.", ephemeral=True)
             return
 
-        # Ignore if there is currently one active
-        active_spawn = data.get("active_spawn")
-        if active_spawn and active_spawn.get("status") == "active":
-            await interaction.response.send_message("A wild Pokémon is already active! Wait until it is captured or escapes.", ephemeral=True)
+        # Ignore if every spawn slot is taken
+        live_spawns = guild_spawns(data)
+        if len(live_spawns) >= guild_spawn_slots(self.bot, guild_id, data.get("settings")):
+            await interaction.response.send_message(
+                f"{len(live_spawns)} wild Pokémon are already out! Wait until one is captured or escapes.", ephemeral=True
+            )
             return
 
-        # Generate and log a wild Pokémon
-        pokemon_id = generate_wild_pokemon(self.bot)
-        pokemon = next((p for p in self.bot.pokemon if p.get("id") == pokemon_id), None)
+        # Generate a wild Pokémon; it is logged once its message is posted
+        pokemon_id = generate_wild_pokemon(self.bot, data.get("settings"))
+        pokemon = self.bot.registry.get_species(pokemon_id)
         if not pokemon:
             await interaction.response.send_message("Failed to generate a Pokémon.", ephemeral=True)
             return
 
-        log_active_spawn(guild_id, pokemon_id, status="active", trainer=None)
-
         # Build the embed
-        name = pokemon.get("name", "Unknown")
-        poke_type = ", ".join(pokemon.get("type", []))
-        rarity = pokemon.get("rarity", "Unknown")
-        abilities = ", ".join(pokemon.get("special_abilities", []))
+        name = pokemon.name
+        poke_type = ", ".join(pokemon.types)
+        rarity = pokemon.rarity
+        abilities = ", ".join(pokemon.abilities)
         embed = discord.Embed(
             title=f"A wild {name} appeared!",
             color=discord.Color.green()
@@ -59,8 +57,9 @@ class ForceSpawn(commands.Cog):
 
         channel = self.bot.get_channel(int(wild_channel_id))
         if channel:
-            view = CaptureButton(guild_id, pokemon_id)
-            await channel.send(embed=embed, view=view)
+            message = await channel.send(embed=embed, view=capture_view(guild_id, pokemon_id))
+            await log_active_spawn(guild_id, pokemon_id, message.id)
+            SPAWN_MESSAGES.register(guild_id, channel.id, message.id, pokemon_id, embed, lifetime=spawn_lifetime(data.get("settings")))
             await interaction.response.send_message(f"Forced a wild {name} to spawn in <#{wild_channel_id}>.", ephemeral=True)
         else:
             await interaction.response.send_message("Wild channel not found.", ephemeral=True)
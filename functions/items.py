@@ -1,14 +1,12 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from utils.inventory_utils import add_item_to_inventory, get_player_inventory
+from utils.inventory_utils import grant_item, get_player_inventory
+from utils.player_handler import load_user_record
+from utils.render_cache_utils import RENDER_CACHE, record_version
 
 def get_item_data(bot, item_id):
-    # Use bot.items, which should be a list of item dicts
-    for item in getattr(bot, "items", []):
-        if item["id"] == item_id:
-            return item
-    return {"name": f"Item #{item_id}", "description": "No description."}
+    return bot.registry.get_item(item_id)
 
 class InventoryCog(commands.Cog):
     def __init__(self, bot):
@@ -27,10 +25,10 @@ class InventoryCog(commands.Cog):
         if amount < 1:
             await interaction.response.send_message("Amount must be at least 1.", ephemeral=True)
             return
-        add_item_to_inventory(interaction.guild.id, user.id, item_id, amount)
+        await grant_item(interaction.guild.id, user.id, item_id, amount)
         item_data = get_item_data(self.bot, item_id)
         await interaction.response.send_message(
-            f"Gave {amount} × **{item_data['name']}** to {user.mention}.", ephemeral=True
+            f"Gave {amount} × **{item_data.name}** to {user.mention}.", ephemeral=True
         )
 
     @app_commands.command(name="inventory", description="View a player's inventory.")
@@ -42,24 +40,28 @@ class InventoryCog(commands.Cog):
             await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
             return
         user = user or interaction.user
-        inventory = get_player_inventory(interaction.guild.id, user.id)
+        user_data = await load_user_record(interaction.guild.id, user.id)
+        inventory = await get_player_inventory(interaction.guild.id, user.id)
         if not inventory:
             await interaction.response.send_message(f"{user.display_name} has no items.", ephemeral=True)
             return
 
-        # Use bot.items for item names and descriptions
-        item_lookup = {item["id"]: item for item in getattr(self.bot, "items", [])}
+        embed = RENDER_CACHE.get_or_render(
+            interaction.guild.id, user.id, "inventory", None, record_version(user_data),
+            lambda: self.render_inventory(inventory, user.display_name)
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    def render_inventory(self, inventory, display_name):
         lines = []
         for entry in inventory:
-            item = item_lookup.get(entry["id"], {"name": f"Item #{entry['id']}", "description": "No description."})
-            lines.append(f"**{item['name']}** × {entry['amount']}\n*{item['description']}*")
-        embed = discord.Embed(
-            title=f"{user.display_name}'s Inventory",
+            item = get_item_data(self.bot, entry["id"])
+            lines.append(f"**{item.name}** × {entry['amount']}\n*{item.description}*")
+        return discord.Embed(
+            title=f"{display_name}'s Inventory",
             description="\n\n".join(lines),
             color=discord.Color.blurple()
         )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
 
 async def setup(bot):
     await bot.add_cog(InventoryCog(bot))
\ No newline at end of file
@@ -0,0 +1,57 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+from utils.leaderboard_utils import LEADERBOARDS, LEADERBOARD_SIZE
+
+METRIC_TITLES = {"power": "Power", "pokedex": "Pokédex Completion", "wins": "Battle Wins", "rating": "Battle Rating"}
+
+class Leaderboard(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    def format_score(self, metric, score):
+        if metric == "pokedex":
+            total = len(self.bot.registry.species)
+            return f"{score}/{total} ({score / total:.0%})"
+        return str(score)
+
+    def trainer_name(self, guild, user_id):
+        member = guild.get_member(int(user_id)) if guild else None
+        return member.display_name if member else f"<@{user_id}>"
+
+    @app_commands.command(name="leaderboard", description="Show the top trainers by power, Pokédex completion, battle wins or rating.")
+    @app_commands.describe(metric="What to rank trainers by", scope="This server or every server")
+    @app_commands.choices(
+        metric=[app_commands.Choice(name=title, value=metric) for metric, title in METRIC_TITLES.items()],
+        scope=[app_commands.Choice(name="This server", value="server"), app_commands.Choice(name="Global", value="global")],
+    )
+    async def leaderboard(self, interaction: discord.Interaction, metric: str = "power", scope: str = "server"):
+        if scope == "global":
+            entries = LEADERBOARDS.global_top(metric)
+            lines = []
+            for rank, (guild_id, user_id, score) in enumerate(entries, 1):
+                guild = self.bot.get_guild(int(guild_id))
+                server = guild.name if guild else "Unknown server"
+                lines.append(f"**{rank}.** {self.trainer_name(guild, user_id)} ({server}) - {self.format_score(metric, score)}")
+            title = f"Global Leaderboard: {METRIC_TITLES[metric]}"
+        else:
+            entries = LEADERBOARDS.top(interaction.guild.id, metric)
+            lines = [
+                f"**{rank}.** {self.trainer_name(interaction.guild, user_id)} - {self.format_score(metric, score)}"
+                for rank, (user_id, score) in enumerate(entries, 1)
+            ]
+            title = f"{interaction.guild.name} Leaderboard: {METRIC_TITLES[metric]}"
+
+        embed = discord.Embed(
+            title=title,
+            description="\n".join(lines) or "No trainers ranked yet. Use `/join` to start your journey!",
+            color=discord.Color.gold()
+        )
+        if scope != "global":
+            rank = LEADERBOARDS.board(interaction.guild.id).rank_of(metric, str(interaction.user.id))
+            if rank and rank > LEADERBOARD_SIZE:
+                embed.set_footer(text=f"You are ranked #{rank}")
+        await interaction.response.send_message(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(Leaderboard(bot))
@@ -1,63 +1,75 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from utils.player_handler import read_user_record
+from utils.player_handler import load_user_record
+from utils.inventory_utils import get_player_inventory
+from utils.pokedex_utils import pokedex_mask, mask_ids, count
+from utils.render_cache_utils import RENDER_CACHE, record_version
+from utils.team_utils import hydrate_team
 
-class Pokedex(commands.Cog):
-    def __init__(self, bot):
-        self.bot = bot
-        self.pokemon = bot.pokemon
+NAME_LIST_LIMIT = 1000  # characters of species names per embed field
+POKEDEX_PAGE_SIZE = 20
 
-    @app_commands.command(name="pokedex", description="Show your Pokédex progress.")
-    @app_commands.describe(page="Page number (20 Pokémon per page)")
-    async def pokedex(self, interaction: discord.Interaction, page: int = 1):
-        print(f"[DEBUG] /pokedex called by user {interaction.user.id} in guild {interaction.guild.id} (page {page})")
-        user_data = read_user_record(interaction.guild.id, interaction.user.id)
+class PokedexPager(discord.ui.View):
+    """Previous/next buttons for /pokedex. Pages come from the render cache."""
+    def __init__(self, cog, user_id, page, max_page):
+        super().__init__(timeout=300)
+        self.cog = cog
+        self.user_id = user_id
+        self.page = page
+        self.max_page = max_page
+        self.update_buttons()
+
+    def update_buttons(self):
+        self.previous.disabled = self.page <= 1
+        self.next.disabled = self.page >= self.max_page
+
+    async def turn(self, interaction, step):
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("Use `/pokedex` to open your own Pokédex.", ephemeral=True)
+            return
+        user_data = await load_user_record(interaction.guild.id, self.user_id)
         if not user_data:
-            print("[DEBUG] No user data found.")
             await interaction.response.send_message("You need to set up your profile first with `/join`.", ephemeral=True)
             return
+        self.page = max(1, min(self.max_page, self.page + step))
+        self.update_buttons()
+        embed = self.cog.pokedex_page(interaction.guild.id, self.user_id, user_data, self.page)
+        await interaction.response.edit_message(embed=embed, view=self)
 
-        pokedex_ids = set(user_data.get("pokedex", []))
-        print(f"[DEBUG] User has {len(pokedex_ids)} Pokémon in their Pokédex.")
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn(interaction, -1)
 
-        pokemon_data = self.pokemon
-        print(f"[DEBUG] Loaded {len(pokemon_data)} Pokémon from self.pokemon.")
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn(interaction, 1)
 
-        per_page = 20  # Limit to 25 per page
-        total_pokemon = len(pokemon_data)
-        max_page = (total_pokemon + per_page - 1) // per_page
-        print(f"[DEBUG] Total Pokémon: {total_pokemon}, Pages: {max_page}")
-        if page < 1 or page > max_page:
-            print(f"[DEBUG] Invalid page: {page}")
-            await interaction.response.send_message(f"Invalid page. Please choose a page between 1 and {max_page}.", ephemeral=True)
-            return
+class Pokedex(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.registry = bot.registry
 
-        start = (page - 1) * per_page
-        end = start + per_page
+    def render_pokedex_page(self, caught, page, max_page):
+        pokemon_data = self.registry.species
+        total_pokemon = len(pokemon_data)
+        start = (page - 1) * POKEDEX_PAGE_SIZE
+        end = start + POKEDEX_PAGE_SIZE
         page_pokemon = pokemon_data[start:end]
-        print(f"[DEBUG] Showing Pokémon {start} to {end} (actual: {len(page_pokemon)})")
 
         # Each Pokémon on a new line, show id and data if caught, else 5 question marks
         lines = []
         for p in page_pokemon:
-            poke_id = p.get("id", "?")
-            if poke_id in pokedex_ids:
-                name = p.get("name", "?")
-                poke_type = ", ".join(p.get("type", []))
-                rarity = p.get("rarity", "?")
-                lore = p.get("lore", "")
-                name_display = f"**{name}**"
-                line = f"#{poke_id} {name_display} [{poke_type}, {rarity}]"
-                if lore:
-                    line += f"\n*{lore}*"
+            poke_id = p.id
+            if caught >> poke_id & 1:
+                line = f"#{poke_id} **{p.name}** [{', '.join(p.types)}, {p.rarity}]"
+                if p.lore:
+                    line += f"\n*{p.lore}*"
             else:
                 line = f"#{poke_id} ? ? ? ? ?"
             lines.append(line)
 
         pokedex_str = "\n\n".join(lines)
-        header = f"**Your Pokédex Progress (Page {page}/{max_page}):**"
-
         # Discord embed field value limit is 1024, description limit is 4096
         if len(pokedex_str) > 4000:
             pokedex_str = pokedex_str[:4000] + "\n... (truncated)"
@@ -68,18 +80,50 @@ class Pokedex(commands.Cog):
             color=discord.Color.green()
         )
         embed.set_footer(text=f"Showing {start+1}-{min(end, total_pokemon)} of {total_pokemon} Pokémon")
+        return embed
+
+    def pokedex_page(self, guild_id, user_id, user_data, page):
+        """The page's embed from the render cache; the pages either side are rendered ahead for the buttons."""
+        max_page = self.max_page()
+        version = record_version(user_data)
+        caught = pokedex_mask(user_data)
+        embed = RENDER_CACHE.get_or_render(
+            guild_id, user_id, "pokedex", page, version,
+            lambda: self.render_pokedex_page(caught, page, max_page)
+        )
+        for neighbour in (page - 1, page + 1):
+            if 1 <= neighbour <= max_page:
+                RENDER_CACHE.prefetch(
+                    guild_id, user_id, "pokedex", neighbour, version,
+                    lambda n=neighbour: self.render_pokedex_page(caught, n, max_page)
+                )
+        return embed
 
-        print("[DEBUG] Sending pokedex to user (embed).")
+    def max_page(self):
+        return (len(self.registry.species) + POKEDEX_PAGE_SIZE - 1) // POKEDEX_PAGE_SIZE
+
+    @app_commands.command(name="pokedex", description="Show your Pokédex progress.")
+    @app_commands.describe(page="Page number (20 Pokémon per page)")
+    async def pokedex(self, interaction: discord.Interaction, page: int = 1):
+        user_data = await load_user_record(interaction.guild.id, interaction.user.id)
+        if not user_data:
+            await interaction.response.send_message("You need to set up your profile first with `/join`.", ephemeral=True)
+            return
+
+        max_page = self.max_page()
+        if page < 1 or page > max_page:
+            await interaction.response.send_message(f"Invalid page. Please choose a page between 1 and {max_page}.", ephemeral=True)
+            return
+
+        embed = self.pokedex_page(interaction.guild.id, interaction.user.id, user_data, page)
+        view = PokedexPager(self, interaction.user.id, page, max_page)
         try:
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
         except Exception as e:
             print(f"[ERROR] Failed to send pokedex as embed: {e}")
             # Fallback to plain text
             try:
-                await interaction.followup.send(
-                    f"{header}\n{pokedex_str}",
-                    ephemeral=True
-                )
+                await interaction.followup.send(f"**{embed.title}:**\n{embed.description}", ephemeral=True)
             except Exception as e2:
                 print(f"[ERROR] Failed to send pokedex as text: {e2}")
 
@@ -87,8 +131,7 @@ class Pokedex(commands.Cog):
     @app_commands.describe(user="The user whose Pokédex summary you want to view (leave blank for yourself)")
     async def pokedex_summary(self, interaction: discord.Interaction, user: discord.Member = None):
         target_user = user or interaction.user
-        print(f"[DEBUG] /pokedex_summary called by user {interaction.user.id} in guild {interaction.guild.id} (target: {target_user.id})")
-        user_data = read_user_record(interaction.guild.id, target_user.id)
+        user_data = await load_user_record(interaction.guild.id, target_user.id)
         if not user_data:
             if user:
                 await interaction.response.send_message(f"{target_user.display_name} has not set up their profile yet.", ephemeral=True)
@@ -96,19 +139,26 @@ class Pokedex(commands.Cog):
                 await interaction.response.send_message("You need to set up your profile first with `/join`.", ephemeral=True)
             return
 
-        pokedex_ids = set(user_data.get("pokedex", []))
-        total_discovered = len(pokedex_ids)
-        total_pokemon = len(self.pokemon)
+        # Settle the inventory first: crediting Poké Balls is a write, and changes the record version
+        inventory = await get_player_inventory(interaction.guild.id, target_user.id)
+        embed = RENDER_CACHE.get_or_render(
+            interaction.guild.id, target_user.id, "summary", None, record_version(user_data),
+            lambda: self.render_summary(user_data, inventory, target_user.display_name)
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    def render_summary(self, user_data, inventory, display_name):
+        total_discovered = count(pokedex_mask(user_data))
+        total_pokemon = len(self.registry.species)
 
         # Profile fields
-        profile_name = user_data.get("nickname") or target_user.display_name
+        profile_name = user_data.get("nickname") or display_name
         coin = user_data.get("coin", 0)
         gender = user_data.get("gender", "Not set")
         pronouns = user_data.get("pronouns", "Not set")
         power = user_data.get("power", 0)
         badges = user_data.get("badges", [])
-        inventory = user_data.get("inventory", [])
-        active_pokemon = user_data.get("active_pokemon", [])
+        active_pokemon = hydrate_team(self.registry, user_data.get("active_pokemon", []))
 
         embed = discord.Embed(
             title=f"{profile_name}'s Pokédex Summary",
@@ -120,13 +170,12 @@ class Pokedex(commands.Cog):
         embed.add_field(name="Gender", value=gender, inline=True)
         embed.add_field(name="Pronouns", value=pronouns, inline=True)
 
-        # Inventory (show item names, amounts, and descriptions using bot.items)
+        # Inventory (show item names, amounts, and descriptions from the registry)
         if inventory:
-            item_lookup = {item["id"]: item for item in getattr(self.bot, "items", [])}
             inventory_lines = []
             for entry in inventory:
-                item = item_lookup.get(entry["id"], {"name": f"Item #{entry['id']}", "description": "No description."})
-                inventory_lines.append(f"**{item['name']}** × {entry['amount']}\n*{item['description']}*")
+                item = self.registry.get_item(entry["id"])
+                inventory_lines.append(f"**{item.name}** × {entry['amount']}\n*{item.description}*")
             inventory_str = "\n\n".join(inventory_lines)
         else:
             inventory_str = "None"
@@ -157,7 +206,75 @@ class Pokedex(commands.Cog):
             embed.add_field(name="Active Pokémon", value="None", inline=False)
 
         embed.set_footer(text="Use /pokedex to view your full Pokédex.")
+        return embed
+
+    def species_names(self, mask):
+        names = ", ".join(self.registry.get_species(i).name for i in mask_ids(mask)) or "None"
+        return names if len(names) <= NAME_LIST_LIMIT else names[:NAME_LIST_LIMIT].rsplit(", ", 1)[0] + ", ..."
 
+    @app_commands.command(name="pokedex_compare", description="Compare your Pokédex with another trainer's.")
+    @app_commands.describe(user="The trainer to compare with")
+    async def pokedex_compare(self, interaction: discord.Interaction, user: discord.Member):
+        mine = await load_user_record(interaction.guild.id, interaction.user.id)
+        theirs = await load_user_record(interaction.guild.id, user.id)
+        if not mine:
+            await interaction.response.send_message("You need to set up your profile first with `/join`.", ephemeral=True)
+            return
+        if not theirs:
+            await interaction.response.send_message(f"{user.display_name} has not set up their profile yet.", ephemeral=True)
+            return
+        a, b = pokedex_mask(mine), pokedex_mask(theirs)
+        only_mine, only_theirs, both = a & ~b, b & ~a, a & b
+        embed = discord.Embed(title=f"Pokédex: You vs {user.display_name}", color=discord.Color.blue())
+        embed.add_field(name="Both caught", value=str(count(both)), inline=True)
+        embed.add_field(name="Caught by either", value=str(count(a | b)), inline=True)
+        embed.add_field(name=f"Only you ({count(only_mine)})", value=self.species_names(only_mine), inline=False)
+        embed.add_field(name=f"Only {user.display_name} ({count(only_theirs)})", value=self.species_names(only_theirs), inline=False)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="pokedex_missing", description="List the Pokémon you haven't caught yet.")
+    @app_commands.describe(type="Only this type (e.g. Fire)", rarity="Only this rarity (e.g. Rare)")
+    async def pokedex_missing(self, interaction: discord.Interaction, type: str = None, rarity: str = None):
+        user_data = await load_user_record(interaction.guild.id, interaction.user.id)
+        if not user_data:
+            await interaction.response.send_message("You need to set up your profile first with `/join`.", ephemeral=True)
+            return
+        scope = self.registry.all_species_mask
+        if type:
+            scope &= self.registry.type_mask(type)
+        if rarity:
+            scope &= self.registry.rarity_mask(rarity)
+        missing = scope & ~pokedex_mask(user_data)
+        label = " ".join([part.title() for part in (rarity, type) if part] + ["Pokémon"])
+        embed = discord.Embed(
+            title=f"Missing {label} ({count(missing)} of {count(scope)})",
+            description=self.species_names(missing) if missing else "You've caught them all!",
+            color=discord.Color.orange()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="pokedex_completion", description="Show your Pokédex completion by rarity and type.")
+    async def pokedex_completion(self, interaction: discord.Interaction):
+        user_data = await load_user_record(interaction.guild.id, interaction.user.id)
+        if not user_data:
+            await interaction.response.send_message("You need to set up your profile first with `/join`.", ephemeral=True)
+            return
+        caught = pokedex_mask(user_data)
+
+        def progress(masks):
+            return "\n".join(
+                f"{name.title()}: {count(caught & mask)}/{count(mask)}"
+                for name, mask in masks.items()
+            )
+
+        total = self.registry.all_species_mask
+        embed = discord.Embed(
+            title="Pokédex Completion",
+            description=f"{count(caught & total)}/{count(total)} ({count(caught & total) / count(total):.0%})",
+            color=discord.Color.green()
+        )
+        embed.add_field(name="By Rarity", value=progress(self.registry.mask_by_rarity), inline=True)
+        embed.add_field(name="By Type", value=progress(self.registry.mask_by_type), inline=True)
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 async def setup(bot):
@@ -1,7 +1,8 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from utils.server_handler import generate_pokemon_channels, send_welcome_embed, send_general_guide_embed, send_battle_guide_embed
+from utils.server_handler import generate_pokemon_channels, send_welcome_embed, send_general_guide_embed, send_battle_guide_embed, load_server_data
+from utils.wild_utils import schedule_next_spawn
 
 class ServerSetup(commands.Cog):
     def __init__(self, bot):
@@ -13,6 +14,7 @@ class ServerSetup(commands.Cog):
             await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
             return
         channels = await generate_pokemon_channels(interaction.guild)
+        schedule_next_spawn(self.bot, interaction.guild.id, await load_server_data(interaction.guild.id))
         await interaction.response.send_message(f"Server data folder created and channels set up.", ephemeral=True)
 
         # Post guide embeds to the guide channel after setup
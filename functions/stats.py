@@ -0,0 +1,62 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+from utils.render_cache_utils import RENDER_CACHE
+from utils.guild_actor_utils import GUILD_ACTORS
+
+class BotStats(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @app_commands.command(name="botstats", description="Show event-loop lag, guild actor queues and shard heartbeat latency (admin only).")
+    @app_commands.default_permissions(administrator=True)
+    async def botstats(self, interaction: discord.Interaction):
+        embed = discord.Embed(title="Bot Health", color=discord.Color.dark_teal())
+
+        monitor = getattr(self.bot, "loop_lag", None)
+        if monitor:
+            lag = monitor.stats()
+            embed.add_field(
+                name="Event Loop Lag",
+                value=f"avg {lag['avg_ms']:.1f}ms | p99 {lag['p99_ms']:.1f}ms | max {lag['max_ms']:.1f}ms ({lag['samples']} samples)",
+                inline=False
+            )
+
+        tick = getattr(self.bot, "spawn_tick", None)
+        if tick:
+            embed.add_field(
+                name="Last Spawn Tick",
+                value=f"{tick['due']} due | {tick['spawned']} spawned | {tick['failed']} failed | {tick['ms']:.0f}ms",
+                inline=False
+            )
+
+        cache = RENDER_CACHE.stats()
+        embed.add_field(
+            name="Render Cache",
+            value=f"{cache['hits']} hits | {cache['misses']} misses | {cache['hit_rate']:.0%} hit rate | {cache['entries']} cached",
+            inline=False
+        )
+
+        actors = GUILD_ACTORS.stats()
+        slowest = "".join(
+            f"\nSlow guild {g['guild_id']}: p99 {g['service_p99_ms']:.1f}ms | depth {g['depth']} (max {g['max_depth']})"
+            for g in actors["slowest"]
+        )
+        embed.add_field(
+            name="Guild Actors",
+            value=(
+                f"{actors['actors']} live | {actors['queued']} queued | {actors['processed']} jobs ({actors['failed']} failed)\n"
+                f"service p50 {actors['service_p50_ms']:.1f}ms | p99 {actors['service_p99_ms']:.1f}ms | queue wait p99 {actors['wait_p99_ms']:.1f}ms"
+                f"{slowest}"
+            ),
+            inline=False
+        )
+
+        heartbeats = "\n".join(
+            f"Shard {shard_id}: {latency*1000:.0f}ms" for shard_id, latency in self.bot.latencies
+        )
+        embed.add_field(name="Heartbeat Latency", value=heartbeats or "No shards connected", inline=False)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(BotStats(bot))
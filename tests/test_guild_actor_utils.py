@@ -0,0 +1,71 @@
+import asyncio
+import unittest
+
+from utils.guild_actor_utils import GuildActors
+
+
+class DeferredStops(GuildActors):
+    """Holds the worker done-callbacks back so a test can act between a worker finishing and its callback."""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.stops = []
+
+    def _stopped(self, key, actor, task):
+        self.stops.append((key, actor, task))
+
+    def run_stops(self):
+        while self.stops:
+            GuildActors._stopped(self, *self.stops.pop(0))
+
+
+async def _retired(actor):
+    while not actor.worker.done():
+        await asyncio.sleep(0.001)
+
+
+class GuildActorRetireTest(unittest.IsolatedAsyncioTestCase):
+    async def test_run_between_retire_and_callback(self):
+        actors = DeferredStops(idle_timeout=0.01)
+        self.assertEqual(await actors.run(1, lambda: "first"), "first")
+        old = actors._actors["1"]
+        await _retired(old)
+
+        # The worker has returned but its done-callback hasn't run yet
+        second = asyncio.create_task(actors.run(1, lambda: "second"))
+        await asyncio.sleep(0)
+        actors.run_stops()
+        self.assertEqual(await asyncio.wait_for(second, 1), "second")
+        self.assertEqual(old.jobs, type(old.jobs)())
+
+    async def test_leftover_jobs_move_to_a_fresh_worker(self):
+        actors = DeferredStops(idle_timeout=0.01)
+        await actors.run(1, lambda: None)
+        old = actors._actors["1"]
+        await _retired(old)
+
+        # A job left on a worker that stopped without being cancelled still runs
+        future = asyncio.get_running_loop().create_future()
+        old.jobs.append((lambda: "late", (), {}, future, 0.0))
+        actors.run_stops()
+        self.assertEqual(await asyncio.wait_for(future, 1), "late")
+
+    async def test_cancelled_worker_cancels_leftover_jobs(self):
+        actors = GuildActors(idle_timeout=1)
+        started = asyncio.Event()
+
+        async def block():
+            started.set()
+            await asyncio.sleep(10)
+
+        first = asyncio.create_task(actors.run(1, block))
+        await started.wait()
+        second = asyncio.create_task(actors.run(1, lambda: None))
+        await asyncio.sleep(0)
+        actors._actors["1"].worker.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await second
+        first.cancel()
+
+
+if __name__ == "__main__":
+    unittest.main()
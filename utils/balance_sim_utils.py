@@ -0,0 +1,181 @@
+import argparse
+import time
+import numpy as np
+from utils.battle_engine_utils import BattleEngine, DEFENSE_SCALE, DAMAGE_ROLL
+from utils.capture_odds_utils import capture_chance, POKEBALL_BONUS
+from utils.registry_utils import DATASTORES_DIR
+
+# Offline balance report: python -m utils.balance_sim_utils --help
+TIERS = (("S", 0.10), ("A", 0.20), ("B", 0.40), ("C", 0.20), ("D", 0.10))  # share of species per tier
+DEFAULT_POWERS = (200, 400, 600)
+
+class BalanceSimulator:
+    """
+    Monte Carlo balance numbers for the whole species list, using the battle engine's damage
+    rules and type chart. Stats, base damage and type multipliers are held as arrays so every
+    matchup is simulated in batch rather than battle by battle.
+    """
+    def __init__(self, engine, seed=None):
+        self.engine = engine
+        self.rng = np.random.default_rng(seed)
+        self.species = engine.registry.species
+        fighters = [engine.combatant(s) for s in self.species]
+        self.max_hp = np.array([f.max_hp for f in fighters], dtype=np.int64)
+        attack = np.array([f.attack for f in fighters], dtype=np.float64)
+        defense = np.array([f.defense for f in fighters], dtype=np.float64)
+        # base[a, d]: attacker a's damage against defender d before the random roll
+        self.multipliers = np.asarray(engine.chart.matchup_table(), dtype=np.float64)
+        self.base = attack[:, None] * self.multipliers * DEFENSE_SCALE / (DEFENSE_SCALE + defense[None, :])
+
+    def __len__(self):
+        return len(self.species)
+
+    def hits_to_faint_cdf(self, samples):
+        """
+        cdf[a, d, k] = P(attacker a needs at most k hits to faint defender d).
+
+        Pairs that share a base damage share one batch of sampled damage sequences: the
+        cumulative damage after each hit is sorted across samples, and searchsorted then reads off
+        how many samples have reached each defender's HP.
+        """
+        n = len(self)
+        min_hit = np.maximum(1, np.floor(self.base * DAMAGE_ROLL[0]))
+        hits_needed = np.ceil(self.max_hp[None, :] / min_hit).astype(np.int64)
+        most_hits = int(hits_needed.max())
+        rolls = self.rng.uniform(*DAMAGE_ROLL, size=(samples, most_hits))
+        cdf = np.zeros((n, n, most_hits + 1))
+
+        bases, group = np.unique(self.base, return_inverse=True)
+        order = np.argsort(group.ravel(), kind="stable")
+        bounds = np.searchsorted(group.ravel()[order], np.arange(len(bases) + 1))
+        for g, base in enumerate(bases):
+            pairs = order[bounds[g]:bounds[g + 1]]
+            attackers, defenders = np.divmod(pairs, n)
+            hp = self.max_hp[defenders]
+            hits = int(hits_needed[attackers, defenders].max())
+            dealt = np.cumsum(np.maximum(1, np.floor(base * rolls[:, :hits])), axis=1)
+            dealt.sort(axis=0)
+            for k in range(hits):
+                cdf[attackers, defenders, k + 1] = 1 - np.searchsorted(dealt[:, k], hp) / samples
+            cdf[attackers, defenders, hits + 1:] = 1.0
+        return cdf
+
+    def win_matrix(self, samples=10000):
+        """
+        win[a, d] = chance that a beats d one-on-one, averaged over who attacks first. The opener
+        wins when it needs no more hits than its opponent, the other side only with strictly fewer.
+        """
+        cdf = self.hits_to_faint_cdf(samples)
+        pmf = np.diff(cdf, axis=2)
+        survives = 1 - cdf.transpose(1, 0, 2)  # survives[a, d, k] = P(d needs more than k hits on a)
+        opens = (pmf * survives[:, :, :-1]).sum(axis=2)
+        follows = (pmf * survives[:, :, 1:]).sum(axis=2)
+        return (opens + follows) / 2
+
+    def team_battles(self, battles=100000, team_size=3, best_of=3):
+        """
+        Random best-of-N team battles with the engine's rules, all stepped in lockstep: every
+        active battle makes one attack per iteration. Returns (team_a, team_b, a_won).
+        """
+        n = len(self)
+        team_a = np.argsort(self.rng.random((battles, n)), axis=1)[:, :team_size]
+        team_b = np.argsort(self.rng.random((battles, n)), axis=1)[:, :team_size]
+        teams = np.stack((team_a, team_b), axis=1)  # battle, side, slot
+        rows = np.arange(battles)
+        slot = np.zeros((battles, 2), dtype=np.int64)
+        hp = self.max_hp[teams[:, :, 0]].copy()
+        wins = np.zeros((battles, 2), dtype=np.int64)
+        attacker = np.zeros(battles, dtype=np.int64)
+        live = rows
+        while live.size:
+            side = attacker[live]
+            other = 1 - side
+            attacking = teams[live, side, slot[live, side]]
+            defending = teams[live, other, slot[live, other]]
+            roll = self.rng.uniform(*DAMAGE_ROLL, size=live.size)
+            damage = np.maximum(1, np.floor(self.base[attacking, defending] * roll)).astype(np.int64)
+            hp[live, other] -= damage
+            fainted = hp[live, other] <= 0
+            # Whether or not the defender fainted, it (or its replacement) attacks next
+            attacker[live] = other
+            if fainted.any():
+                done, winner, loser = live[fainted], side[fainted], other[fainted]
+                wins[done, winner] += 1
+                over = (slot[done, loser] + 1 >= team_size) | (wins[done].sum(axis=1) >= best_of)
+                going_on = done[~over]
+                slot[going_on, loser[~over]] += 1
+                hp[going_on, loser[~over]] = self.max_hp[teams[going_on, loser[~over], slot[going_on, loser[~over]]]]
+                live = np.setdiff1d(live, done[over], assume_unique=True)
+        return team_a, team_b, wins[:, 0] > wins[:, 1]
+
+    def team_win_rates(self, battles=100000):
+        """Share of battles won by teams that included each species."""
+        team_a, team_b, a_won = self.team_battles(battles)
+        n = len(self)
+        played = np.bincount(team_a.ravel(), minlength=n) + np.bincount(team_b.ravel(), minlength=n)
+        won = (np.bincount(team_a[a_won].ravel(), minlength=n)
+               + np.bincount(team_b[~a_won].ravel(), minlength=n))
+        return np.divide(won, played, out=np.zeros(n), where=played > 0)
+
+    def capture_by_rarity(self, powers=DEFAULT_POWERS):
+        """Mean capture_chance over each rarity's species, per trainer power and ball."""
+        report = {}
+        for rarity, species in self.engine.registry.species_by_rarity.items():
+            report[rarity] = {
+                (power, ball): float(np.mean([capture_chance(power, s.cp, ball) for s in species]))
+                for power in powers for ball in POKEBALL_BONUS
+            }
+        return report
+
+def tier_list(scores):
+    """Species indices grouped into TIERS by score rank, best first."""
+    ranked = np.argsort(-scores, kind="stable")
+    tiers, start = [], 0
+    for i, (name, share) in enumerate(TIERS):
+        end = len(ranked) if i == len(TIERS) - 1 else start + round(share * len(ranked))
+        tiers.append((name, ranked[start:end]))
+        start = end
+    return tiers
+
+def report(sim, samples, battles, powers, matrix_path=None):
+    names = [s.name for s in sim.species]
+
+    start = time.perf_counter()
+    win = sim.win_matrix(samples)
+    print(f"[Sim] {len(sim)}x{len(sim)} matchups, {samples} samples each, in {time.perf_counter() - start:.2f}s")
+    one_on_one = win.mean(axis=1)
+    if matrix_path:
+        np.savetxt(matrix_path, win, fmt="%.4f", delimiter=",", header=",".join(names), comments="")
+        print(f"[Sim] Win-rate matrix written to {matrix_path}")
+
+    start = time.perf_counter()
+    team = sim.team_win_rates(battles)
+    print(f"[Sim] {battles} random best-of-3 team battles in {time.perf_counter() - start:.2f}s")
+
+    print("\nTier list (mean 1v1 win rate / team win rate)")
+    for tier, members in tier_list(one_on_one):
+        print(f"  {tier}: " + ", ".join(f"{names[i]} {one_on_one[i]:.0%}/{team[i]:.0%}" for i in members))
+
+    print("\nBy rarity (mean 1v1 win rate / team win rate / CP)")
+    rarities = np.array([s.rarity.lower() for s in sim.species])
+    cps = np.array([s.cp for s in sim.species])
+    for rarity in dict.fromkeys(rarities):
+        members = rarities == rarity
+        print(f"  {rarity:<10} {one_on_one[members].mean():.1%} / {team[members].mean():.1%} / {cps[members].mean():.0f} ({members.sum()} species)")
+
+    print("\nExpected capture chance by rarity (power: Poké / Great / Ultra / Master Ball)")
+    for rarity, chances in sim.capture_by_rarity(powers).items():
+        for power in powers:
+            row = " / ".join(f"{chances[(power, ball)]:.0%}" for ball in POKEBALL_BONUS)
+            print(f"  {rarity:<10} power {power:<5} {row}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate every species matchup and print a balance report.")
+    parser.add_argument("--samples", type=int, default=10000, help="Damage samples per matchup")
+    parser.add_argument("--battles", type=int, default=100000, help="Random best-of-3 team battles")
+    parser.add_argument("--power", type=int, nargs="+", default=list(DEFAULT_POWERS), help="Trainer power(s) for capture odds")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--matrix", default=None, help="Write the species win-rate matrix to this CSV file")
+    parser.add_argument("--datastores", default=DATASTORES_DIR)
+    args = parser.parse_args()
+    report(BalanceSimulator(BattleEngine.load(args.datastores), args.seed), args.samples, args.battles, args.power, args.matrix)
@@ -1,8 +1,48 @@
 import discord
-import os
-import json
 import asyncio
-from utils.player_handler import read_user_record
+import heapq
+import time
+from utils.battle_session_utils import BATTLES
+
+BATTLE_INACTIVITY_TIMEOUT = 1800  # seconds without a message before a battle channel is deleted
+
+class BattleChannelIndex:
+    """
+    guild_id -> set of battle channel ids, so on_message can tell battle channels apart
+    with a set lookup instead of reading the guild's data.json.
+    """
+    def __init__(self):
+        self._by_guild = {}
+
+    def add(self, guild_id, channel_id):
+        self._by_guild.setdefault(int(guild_id), set()).add(channel_id)
+
+    def discard(self, guild_id, channel_id):
+        channels = self._by_guild.get(int(guild_id))
+        if channels is not None:
+            channels.discard(channel_id)
+            if not channels:
+                del self._by_guild[int(guild_id)]
+
+    def contains(self, guild_id, channel_id):
+        return channel_id in self._by_guild.get(guild_id, ())
+
+    def channels(self, guild_id):
+        return frozenset(self._by_guild.get(int(guild_id), ()))
+
+    def rebuild(self, sessions):
+        """Build the index from the restored battle sessions; run once at startup."""
+        self._by_guild.clear()
+        for session in sessions:
+            self.add(session.guild_id, session.channel_id)
+
+BATTLE_CHANNELS = BattleChannelIndex()
+
+def battle_ended(guild_id, channel_id):
+    """Drop a finished battle from the battle manager, the channel index and the inactivity tracker."""
+    BATTLES.end(channel_id)
+    BATTLE_CHANNELS.discard(guild_id, channel_id)
+    BATTLE_INACTIVITY.forget(channel_id)
 
 async def create_battle_channel(guild: discord.Guild, user1: discord.Member, user2: discord.Member, category_name="pokemon", bot=None):
     category = discord.utils.get(guild.categories, name=category_name)
@@ -20,105 +60,96 @@ async def create_battle_channel(guild: discord.Guild, user1: discord.Member, use
         category=category,
         topic=f"Pokémon battle between {user1.display_name} and {user2.display_name}"
     )
-    def get_active_pokemon(guild_id, user_id):
-        servers_dir = os.path.join(os.getcwd(), "servers")
-        player_file = os.path.join(servers_dir, str(guild_id), "players.json")
-        if os.path.isfile(player_file):
-            with open(player_file, "r", encoding="utf-8") as f:
-                players = json.load(f)
-            user_data = players.get(str(user_id))
-            if user_data and user_data.get("active_pokemon"):
-                # Use the first active Pokémon for battle
-                poke = user_data["active_pokemon"][0]
-                return {
-                    "id": poke.get("id"),
-                    "name": poke.get("name"),
-                    "cp": poke.get("cp"),
-                    "hp": poke.get("hp"),
-                    "type": poke.get("type"),
-                    "level": poke.get("level"),
-                    "rarity": poke.get("rarity"),
-                    "abilities": poke.get("special_abilities", []),
-                    "current_hp": poke.get("hp"),  # Track current HP for battle
-                }
-        return None
-    user1_pokemon = get_active_pokemon(guild.id, user1.id)
-    user2_pokemon = get_active_pokemon(guild.id, user2.id)
-    servers_dir = os.path.join(os.getcwd(), "servers")
-    data_file = os.path.join(servers_dir, str(guild.id), "data.json")
-    if os.path.isfile(data_file):
-        with open(data_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    else:
-        data = {}
-
-    if "active_battles" not in data:
-        data["active_battles"] = []
-
-    battle_entry = {
-        "channel_id": channel.id,
-        "user1_id": user1.id,
-        "user2_id": user2.id,
-        "user1_name": user1.display_name,
-        "user2_name": user2.display_name,
-        "user1_pokemon": user1_pokemon,
-        "user2_pokemon": user2_pokemon,
-        "user1_played": [],
-        "user2_played": [],
-        "round": 1,
-        "best_of": 3,
-        "turn": user1.id,  # user1 starts
-        "started_at": int(discord.utils.utcnow().timestamp())
-    }
-
-    data["active_battles"].append(battle_entry)
-
-    with open(data_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    BATTLES.create(guild.id, channel.id, user1, user2)
+    BATTLE_CHANNELS.add(guild.id, channel.id)
+    BATTLE_INACTIVITY.track(guild.id, channel.id)
 
     return channel
 
 async def delete_battle_channel(guild: discord.Guild, channel_id: int):
+    battle_ended(guild.id, channel_id)
     channel = guild.get_channel(channel_id)
     if channel:
         await channel.delete(reason="Battle ended")
-    servers_dir = os.path.join(os.getcwd(), "servers")
-    data_file = os.path.join(servers_dir, str(guild.id), "data.json")
-    if os.path.isfile(data_file):
-        with open(data_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        battles = data.get("active_battles", [])
-        data["active_battles"] = [b for b in battles if b.get("channel_id") != channel_id]
-        with open(data_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-
-async def monitor_battle_channel_inactivity(bot, guild: discord.Guild, channel_id: int, timeout_seconds=1800):
-    channel = guild.get_channel(channel_id)
-    if not channel:
-        return
 
-    def check(message):
-        return message.channel.id == channel_id
+class BattleInactivityTracker:
+    """
+    Deletes battle channels nobody has posted in for `timeout` seconds.
+
+    Last activity per channel lives in a dict, so touch() is O(1). Deadlines live in a heap that
+    a single sleeper task drains; an entry that turns out to have seen activity since it was
+    pushed is simply re-pushed with its new deadline.
+    """
+    def __init__(self, timeout=BATTLE_INACTIVITY_TIMEOUT):
+        self.timeout = timeout
+        self._channels = {}  # channel_id -> [guild_id, last_activity]
+        self._heap = []
+        self._wakeup = asyncio.Event()
+
+    def __len__(self):
+        return len(self._channels)
+
+    def __contains__(self, channel_id):
+        return channel_id in self._channels
+
+    def track(self, guild_id, channel_id, at=None):
+        at = time.time() if at is None else at
+        self._channels[channel_id] = [guild_id, at]
+        heapq.heappush(self._heap, (at + self.timeout, channel_id))
+        self._wakeup.set()
+
+    def touch(self, channel_id, at=None):
+        entry = self._channels.get(channel_id)
+        if entry:
+            entry[1] = time.time() if at is None else at
+
+    def forget(self, channel_id):
+        self._channels.pop(channel_id, None)
+
+    def pop_expired(self, now=None):
+        """Remove and return (guild_id, channel_id) for every channel idle past the timeout."""
+        now = time.time() if now is None else now
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            _, channel_id = heapq.heappop(self._heap)
+            entry = self._channels.get(channel_id)
+            if entry is None:
+                continue  # ended or already re-pushed
+            deadline = entry[1] + self.timeout
+            if deadline > now:
+                heapq.heappush(self._heap, (deadline, channel_id))
+            else:
+                del self._channels[channel_id]
+                expired.append((entry[0], channel_id))
+        return expired
+
+    def restore(self, sessions):
+        """Track every restored battle; each gets a fresh window after a restart."""
+        for session in sessions:
+            self.track(session.guild_id, session.channel_id)
+        print(f"[Battle] Tracking inactivity for {len(self)} battle channel(s)")
+
+    async def run(self, bot):
+        while not bot.is_closed():
+            self._wakeup.clear()
+            timeout = max(0.0, self._heap[0][0] - time.time()) if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            for guild_id, channel_id in self.pop_expired():
+                guild = bot.get_guild(guild_id)
+                if not guild:
+                    continue
+                try:
+                    await delete_battle_channel(guild, channel_id)
+                    print(f"[INFO] Deleted inactive battle channel {channel_id} in guild {guild_id}")
+                except Exception as e:
+                    print(f"[Battle] Failed to delete inactive battle channel {channel_id} in guild {guild_id}: {e}")
 
-    try:
-        while True:
-            await bot.wait_for("message", check=check, timeout=timeout_seconds)
-    except asyncio.TimeoutError:
-        await delete_battle_channel(guild, channel_id)
-        print(f"[INFO] Deleted inactive battle channel {channel_id} in guild {guild.id}")
+BATTLE_INACTIVITY = BattleInactivityTracker()
 
 async def monitor_all_battle_channels_clock(bot):
     await bot.wait_until_ready()
-    while not bot.is_closed():
-        for guild in bot.guilds:
-            # Load data.json for the guild
-            servers_dir = os.path.join(os.getcwd(), "servers")
-            data_file = os.path.join(servers_dir, str(guild.id), "data.json")
-            if os.path.isfile(data_file):
-                with open(data_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                active_battles = data.get("active_battles", [])
-                for battle in active_battles:
-                    channel_id = battle.get("channel_id")
-                    asyncio.create_task(monitor_battle_channel_inactivity(bot, guild, channel_id))
-        await asyncio.sleep(300)  # Check every 5 minutes
\ No newline at end of file
+    BATTLE_INACTIVITY.restore(BATTLES.sessions())
+    await BATTLE_INACTIVITY.run(bot)
@@ -1,31 +1,26 @@
-import os
-import json
-from utils.player_handler import read_user_record
+from utils.player_handler import load_user_record, record_battle_result
+from utils.server_handler import load_server_data
+from utils.store_utils import PLAYER_STORE
+from utils.battle_channel_utils import BATTLE_CHANNELS, battle_ended
+from utils.battle_session_utils import BATTLES, BattleError, FINISHED
+from utils.team_utils import hydrate, hydrate_team
 import discord
 
 def is_battle_channel(guild, channel_id):
     """
     Returns True if the channel_id is an active battle channel in the guild.
     """
-    servers_dir = os.path.join(os.getcwd(), "servers")
-    data_file = os.path.join(servers_dir, str(guild.id), "data.json")
-    if os.path.isfile(data_file):
-        with open(data_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        for battle in data.get("active_battles", []):
-            if battle.get("channel_id") == channel_id:
-                return True
-    return False
+    return BATTLE_CHANNELS.contains(guild.id, channel_id)
 
 async def on_message_battle_commands(bot, message):
     if message.author.bot:
         return
     if not message.guild:
         return
-    if not message.content.startswith("!"):
-        return
     if not is_battle_channel(message.guild, message.channel.id):
         return
+    if not message.content.startswith("!"):
+        return
 
     if message.content.strip().lower().startswith("!choose"):
         parts = message.content.strip().split(maxsplit=1)
@@ -62,40 +57,53 @@ async def on_message_battle_commands(bot, message):
             f"Unknown battle command: `{message.content}`"
         )
 
-async def handle_choose_command(bot, message, chosen_arg):
-    # Load battle info
-    servers_dir = os.path.join(os.getcwd(), "servers")
-    data_file = os.path.join(servers_dir, str(message.guild.id), "data.json")
-    if not os.path.isfile(data_file):
-        await message.channel.send(f"{message.author.mention} Battle data not found.")
-        return
-    with open(data_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    battle = next((b for b in data.get("active_battles", []) if b.get("channel_id") == message.channel.id), None)
-    if not battle:
+def mention_for(guild, user_id):
+    member = guild.get_member(user_id)
+    return member.mention if member else f"<@{user_id}>"
+
+async def settle_battle(guild, session, winner_id, forfeit=False):
+    """Record the result and return a line with both trainers' new ratings (empty if it couldn't be recorded)."""
+    ratings = await record_battle_result(guild.id, session.user1_id, session.user2_id, winner_id, session.rounds_won(), forfeit)
+    if not ratings:
+        return ""
+    return f"\nRatings: {mention_for(guild, session.user1_id)} {ratings[0]} | {mention_for(guild, session.user2_id)} {ratings[1]}"
+
+def effectiveness_text(multiplier):
+    if multiplier > 1:
+        return "It's super effective!\n"
+    if multiplier < 1:
+        return "It's not very effective...\n"
+    return ""
+
+async def get_session(message):
+    """The battle for this channel, or None after telling the author it wasn't found."""
+    session = BATTLES.get(message.channel.id)
+    if not session:
         await message.channel.send(f"{message.author.mention} Battle not found.")
+    return session
+
+async def post_to_general(guild, text):
+    data = await load_server_data(guild.id) or {}
+    general_channel_id = data.get("channels", {}).get("general") or data.get("general_channel")
+    if general_channel_id:
+        general_channel = guild.get_channel(general_channel_id)
+        if general_channel:
+            await general_channel.send(text)
+
+async def handle_choose_command(bot, message, chosen_arg):
+    session = await get_session(message)
+    if not session:
         return
-    played_key = None
-    pokemon_key = None
-    if message.author.id == battle.get("user1_id"):
-        played_key = "user1_played"
-        pokemon_key = "user1_pokemon"
-    elif message.author.id == battle.get("user2_id"):
-        played_key = "user2_played"
-        pokemon_key = "user2_pokemon"
-    else:
-        await message.channel.send(f"{message.author.mention} You are not a participant in this battle.")
+    try:
+        session.side(message.author.id)
+    except BattleError as e:
+        await message.channel.send(f"{message.author.mention} {e}")
         return
-    user_data = read_user_record(message.guild.id, message.author.id)
-    if not user_data or not user_data.get("active_pokemon"):
+    active_team = await PLAYER_STORE.aactive_team(message.guild.id, message.author.id)
+    if not active_team:
         await message.channel.send(f"{message.author.mention} You have no active Pokémon.")
         return
-    played_pokemon = battle.get(played_key, [])
-    played_ids = {p.get("id") for p in played_pokemon if p.get("id")}
-    available_pokemon = [
-        poke for poke in user_data["active_pokemon"]
-        if poke.get("id") not in played_ids
-    ]
+    available_pokemon = hydrate_team(bot.registry, session.available(message.author.id, active_team))
 
     if not available_pokemon:
         await message.channel.send(f"{message.author.mention} You have no available Pokémon left to choose.")
@@ -114,15 +122,12 @@ async def handle_choose_command(bot, message, chosen_arg):
         if not chosen_poke:
             await message.channel.send(f"{message.author.mention} Could not find that Pokémon in your available list.")
             return
-        played_pokemon.append(chosen_poke)
-        battle[played_key] = played_pokemon
-        battle[pokemon_key] = chosen_poke
-        for i, b in enumerate(data.get("active_battles", [])):
-            if b.get("channel_id") == message.channel.id:
-                data["active_battles"][i] = battle
-                break
-        with open(data_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+        try:
+            fight_started = session.choose(message.author.id, chosen_poke)
+        except BattleError as e:
+            await message.channel.send(f"{message.author.mention} {e}")
+            return
+        BATTLES.checkpoint(session)
 
         embed = discord.Embed(
             title=f"{message.author.display_name} chose {chosen_poke.get('name', chosen_poke.get('id'))}!",
@@ -139,16 +144,12 @@ async def handle_choose_command(bot, message, chosen_arg):
         if poke_id:
             embed.set_thumbnail(url=f"https://bots.media/pokemon/{poke_id}.png")
         await message.channel.send(f"{message.author.mention}", embed=embed)
-        user1_pokemon = battle.get("user1_pokemon")
-        user2_pokemon = battle.get("user2_pokemon")
-        if user1_pokemon and user2_pokemon:
-            user1_id = battle.get("user1_id")
-            user2_id = battle.get("user2_id")
-            turn_id = battle.get("turn")
-            turn_member = message.guild.get_member(turn_id)
-            user1_mention = message.guild.get_member(user1_id).mention if message.guild.get_member(user1_id) else f"<@{user1_id}>"
-            user2_mention = message.guild.get_member(user2_id).mention if message.guild.get_member(user2_id) else f"<@{user2_id}>"
-            turn_mention = turn_member.mention if turn_member else f"<@{turn_id}>"
+        if fight_started:
+            user1_pokemon = hydrate(bot.registry, session.user1_pokemon)
+            user2_pokemon = hydrate(bot.registry, session.user2_pokemon)
+            user1_mention = mention_for(message.guild, session.user1_id)
+            user2_mention = mention_for(message.guild, session.user2_id)
+            turn_mention = mention_for(message.guild, session.turn)
             try:
                 await message.channel.purge()
             except Exception:
@@ -169,8 +170,8 @@ async def handle_choose_command(bot, message, chosen_arg):
                 color=discord.Color.orange()
             )
             # Load player records for nicknames
-            user1_data = read_user_record(message.guild.id, user1_id)
-            user2_data = read_user_record(message.guild.id, user2_id)
+            user1_data = await load_user_record(message.guild.id, session.user1_id)
+            user2_data = await load_user_record(message.guild.id, session.user2_id)
             user1_nick = user1_data.get("nickname", user1_mention) if user1_data else user1_mention
             user2_nick = user2_data.get("nickname", user2_mention) if user2_data else user2_mention
 
@@ -218,246 +219,112 @@ async def handle_choose_command(bot, message, chosen_arg):
     return
 
 async def handle_attack_command(bot, message):
-    import os
-    import json
-    from utils.player_handler import read_user_record
-
-    servers_dir = os.path.join(os.getcwd(), "servers")
-    data_file = os.path.join(servers_dir, str(message.guild.id), "data.json")
-    if not os.path.isfile(data_file):
-        await message.channel.send(f"{message.author.mention} Battle data not found.")
+    session = await get_session(message)
+    if not session:
         return
-    with open(data_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    battle = next((b for b in data.get("active_battles", []) if b.get("channel_id") == message.channel.id), None)
-    if not battle:
-        await message.channel.send(f"{message.author.mention} Battle not found.")
-        return
-
-    # Check if it's the sender's turn
-    if message.author.id != battle.get("turn"):
-        await message.channel.send(f"{message.author.mention} It's not your turn!")
-        return
-
-    # Get both Pokémon
-    user1_pokemon = battle.get("user1_pokemon")
-    user2_pokemon = battle.get("user2_pokemon")
-    if not user1_pokemon or not user2_pokemon:
-        await message.channel.send(f"{message.author.mention} Both players must choose a Pokémon first.")
+    try:
+        attacker, defender, hit = session.attack(message.author.id, bot.battle_engine)
+    except BattleError as e:
+        await message.channel.send(f"{message.author.mention} {e}")
         return
-
-    # Determine attacker and defender
-    if message.author.id == battle.get("user1_id"):
-        attacker = user1_pokemon
-        defender = user2_pokemon
-        defender_key = "user2_pokemon"
-        next_turn = battle.get("user2_id")
-    else:
-        attacker = user2_pokemon
-        defender = user1_pokemon
-        defender_key = "user1_pokemon"
-        next_turn = battle.get("user1_id")
-
-    # Ensure current_hp is tracked
-    if "current_hp" not in defender:
-        defender["current_hp"] = defender.get("hp", 0)
-    if "current_hp" not in attacker:
-        attacker["current_hp"] = attacker.get("hp", 0)
-
-    # Calculate damage and apply
-    attack_points = attacker.get("attack", 0) or 0
-    defender["current_hp"] = max(0, defender["current_hp"] - attack_points)
-
-    # Update battle state
-    battle[defender_key] = defender
-    battle["turn"] = next_turn
-
-    # Save changes to data.json
-    for i, b in enumerate(data.get("active_battles", [])):
-        if b.get("channel_id") == message.channel.id:
-            data["active_battles"][i] = battle
-            break
-    with open(data_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    BATTLES.checkpoint(session)
+    attack_points, fainted = hit.damage, hit.fainted
 
     # Announce attack
+    defender_hp = defender["current_hp"]
+    attacker, defender = hydrate(bot.registry, attacker), hydrate(bot.registry, defender)
     attacker_name = attacker.get("name", attacker.get("id"))
     defender_name = defender.get("name", defender.get("id"))
-    defender_hp = defender["current_hp"]
     attack_embed = discord.Embed(
         title="Attack!",
         description=(
             f"{message.author.mention}'s **{attacker_name}** attacks **{defender_name}** for {attack_points} damage!\n"
+            f"{effectiveness_text(hit.multiplier)}"
             f"**{defender_name}** now has {defender_hp} HP left."
         ),
-        color=discord.Color.red() if defender_hp <= 0 else discord.Color.blue()
+        color=discord.Color.red() if fainted else discord.Color.blue()
     )
     if attacker.get("id"):
         attack_embed.set_thumbnail(url=f"https://bots.media/pokemon/{attacker.get('id')}.png")
     if defender.get("id"):
         attack_embed.set_image(url=f"https://bots.media/pokemon/{defender.get('id')}.png")
-    if defender_hp <= 0:
+    if fainted:
         attack_embed.add_field(name="KO!", value=f"**{defender_name}** has fainted!", inline=False)
     await message.channel.send(embed=attack_embed)
 
-    # If defender faints, handle round logic
-    if defender_hp <= 0:
-        # Track the winner of each round
-        if "round_winners" not in battle:
-            battle["round_winners"] = []
-        round_winner_id = message.author.id
-        battle["round_winners"].append(round_winner_id)
-
-        # Add fainted Pokémon to played list if not already there
-        if defender_key == "user2_pokemon":
-            played_key = "user2_played"
-            player_id = battle.get("user2_id")
-            opponent_id = battle.get("user1_id")
-        else:
-            played_key = "user1_played"
-            player_id = battle.get("user1_id")
-            opponent_id = battle.get("user2_id")
-
-        played_list = battle.get(played_key, [])
-        if not any(p.get("id") == defender.get("id") for p in played_list):
-            played_list.append(defender)
-            battle[played_key] = played_list
-
-        # Remove the fainted Pokémon from the current slot
-        battle[defender_key] = None
-
-        # Increment round
-        battle["round"] = battle.get("round", 1) + 1
-
-        # Save changes to data.json
-        for i, b in enumerate(data.get("active_battles", [])):
-            if b.get("channel_id") == message.channel.id:
-                data["active_battles"][i] = battle
-                break
-        with open(data_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-
-        # Prompt the player to choose a new Pokémon if they have any left
-        user_data = read_user_record(message.guild.id, player_id)
-        available_pokemon = [
-            poke for poke in user_data.get("active_pokemon", [])
-            if poke.get("id") not in {p.get("id") for p in played_list}
-        ]
-        player_member = message.guild.get_member(player_id)
-        opponent_member = message.guild.get_member(opponent_id)
-
-        # Check for win condition: no Pokémon left or 3 rounds complete
-        if not available_pokemon or len(battle["round_winners"]) >= 3:
-            # Best of 3: winner is who won more rounds
-            round_winners = battle.get("round_winners", [])
-            user1_id = battle.get("user1_id")
-            user2_id = battle.get("user2_id")
-            user1_wins = round_winners.count(user1_id)
-            user2_wins = round_winners.count(user2_id)
-
-            if user1_wins > user2_wins:
-                winner = message.guild.get_member(user1_id).mention if message.guild.get_member(user1_id) else f"<@{user1_id}>"
-            elif user2_wins > user1_wins:
-                winner = message.guild.get_member(user2_id).mention if message.guild.get_member(user2_id) else f"<@{user2_id}>"
-            else:
-                winner = "It's a tie!"
-
-            # Clear the chat before declaring the winner
-            try:
-                await message.channel.purge()
-            except Exception:
-                pass
-
-            # Remove the battle from active_battles and save
-            data["active_battles"] = [
-                b for b in data.get("active_battles", [])
-                if b.get("channel_id") != message.channel.id
-            ]
-            with open(data_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
+    if not fainted:
+        return
 
-            # Delete the battle channel
-            try:
-                await message.channel.delete()
-            except Exception:
-                pass
-
-            # Post results in the general channel
-            general_channel_id = None
-            if "channels" in data and "general" in data["channels"]:
-                general_channel_id = data["channels"]["general"]
-            elif "general_channel" in data:
-                general_channel_id = data["general_channel"]
-
-            if general_channel_id:
-                general_channel = message.guild.get_channel(general_channel_id)
-                if general_channel:
-                    await general_channel.send(
-                        f"Battle over!\nWinner: {winner}"
-                    )
-            return
+    # The defender's trainer needs a new Pokémon, if they have any left
+    player_id = session.opponent_of(message.author.id)
+    user_data = await load_user_record(message.guild.id, player_id)
+    if session.state == FINISHED:
+        return  # forfeited while the record loaded; that path settled it
+    available_pokemon = hydrate_team(bot.registry, session.available(player_id, (user_data or {}).get("active_pokemon", [])))
+    player_member = message.guild.get_member(player_id)
+
+    if session.is_decided(available_pokemon):
+        winner_id = session.finish()
+        # Unregister before any await, so no other command can reach the finished battle
+        battle_ended(message.guild.id, message.channel.id)
+        winner = mention_for(message.guild, winner_id) if winner_id else "It's a tie!"
+
+        # Clear the chat before declaring the winner
+        try:
+            await message.channel.purge()
+        except Exception:
+            pass
 
-        # If not over, prompt for next Pokémon
-        if available_pokemon and player_member:
-            embed = discord.Embed(
-                title=f"{player_member.display_name}, choose your next Pokémon!",
-                description="Your available Pokémon:",
-                color=discord.Color.orange()
-            )
-            for idx, poke in enumerate(available_pokemon, 1):
-                name = poke.get("name", poke.get("id"))
-                cp = poke.get("cp", "?")
-                hp = poke.get("hp", "?")
-                attack = poke.get("attack", "?")
-                defense = poke.get("defense", "?")
-                embed.add_field(
-                    name=f"{idx}: {name}",
-                    value=f"CP: {cp} | HP: {hp} | ATK: {attack} | DEF: {defense}",
-                    inline=False
-                )
-            await message.channel.send(f"{player_member.mention}", embed=embed)
-            await message.channel.send(
-                f"{player_member.mention}, please choose your next Pokémon with `!choose`."
-            )
-        else:
-            await message.channel.send(f"No available Pokémon left for <@{player_id}>!")
+        ratings = await settle_battle(message.guild, session, winner_id)
 
-async def handle_forfeit_command(bot, message):
-    import os
-    import json
+        # Delete the battle channel
+        try:
+            await message.channel.delete()
+        except Exception:
+            pass
 
-    servers_dir = os.path.join(os.getcwd(), "servers")
-    data_file = os.path.join(servers_dir, str(message.guild.id), "data.json")
-    if not os.path.isfile(data_file):
-        await message.channel.send(f"{message.author.mention} Battle data not found.")
-        return
-    with open(data_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    battle = next((b for b in data.get("active_battles", []) if b.get("channel_id") == message.channel.id), None)
-    if not battle:
-        await message.channel.send(f"{message.author.mention} Battle not found.")
+        await post_to_general(message.guild, f"Battle over!\nWinner: {winner}{ratings}")
         return
 
-    user1_id = battle.get("user1_id")
-    user2_id = battle.get("user2_id")
-    if message.author.id == user1_id:
-        winner_id = user2_id
-    elif message.author.id == user2_id:
-        winner_id = user1_id
+    # If not over, prompt for next Pokémon
+    if available_pokemon and player_member:
+        embed = discord.Embed(
+            title=f"{player_member.display_name}, choose your next Pokémon!",
+            description="Your available Pokémon:",
+            color=discord.Color.orange()
+        )
+        for idx, poke in enumerate(available_pokemon, 1):
+            name = poke.get("name", poke.get("id"))
+            cp = poke.get("cp", "?")
+            hp = poke.get("hp", "?")
+            attack = poke.get("attack", "?")
+            defense = poke.get("defense", "?")
+            embed.add_field(
+                name=f"{idx}: {name}",
+                value=f"CP: {cp} | HP: {hp} | ATK: {attack} | DEF: {defense}",
+                inline=False
+            )
+        await message.channel.send(f"{player_member.mention}", embed=embed)
+        await message.channel.send(
+            f"{player_member.mention}, please choose your next Pokémon with `!choose`."
+        )
     else:
-        await message.channel.send(f"{message.author.mention} You are not a participant in this battle.")
+        await message.channel.send(f"No available Pokémon left for <@{player_id}>!")
+
+async def handle_forfeit_command(bot, message):
+    session = await get_session(message)
+    if not session:
+        return
+    try:
+        winner_id = session.forfeit(message.author.id)
+    except BattleError as e:
+        await message.channel.send(f"{message.author.mention} {e}")
         return
 
-    winner_mention = message.guild.get_member(winner_id).mention if message.guild.get_member(winner_id) else f"<@{winner_id}>"
+    winner_mention = mention_for(message.guild, winner_id)
     loser_mention = message.author.mention
-
-    # Remove the battle from active_battles and save
-    data["active_battles"] = [
-        b for b in data.get("active_battles", [])
-        if b.get("channel_id") != message.channel.id
-    ]
-    with open(data_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    battle_ended(message.guild.id, message.channel.id)
+    ratings = await settle_battle(message.guild, session, winner_id, forfeit=True)
 
     # Announce forfeit and winner
     try:
@@ -478,16 +345,4 @@ async def handle_forfeit_command(bot, message):
     except Exception:
         pass
 
-    # Post results in the general channel
-    general_channel_id = None
-    if "channels" in data and "general" in data["channels"]:
-        general_channel_id = data["channels"]["general"]
-    elif "general_channel" in data:
-        general_channel_id = data["general_channel"]
-
-    if general_channel_id:
-        general_channel = message.guild.get_channel(general_channel_id)
-        if general_channel:
-            await general_channel.send(
-                f"Battle over! {loser_mention} forfeited.\nWinner: {winner_mention}"
-            )
\ No newline at end of file
+    await post_to_general(message.guild, f"Battle over! {loser_mention} forfeited.\nWinner: {winner_mention}{ratings}")
@@ -0,0 +1,147 @@
+import json
+import os
+import random
+import time
+from utils.registry_utils import Registry, DATASTORES_DIR
+from utils.team_utils import is_compact, hydrate
+from utils.type_chart_utils import TypeChart
+
+# Battle rules. No discord imports here: the same engine drives !attack and offline simulations.
+DEFENSE_SCALE = 100        # damage is scaled by DEFENSE_SCALE / (DEFENSE_SCALE + defense)
+DAMAGE_ROLL = (0.85, 1.0)  # random spread applied to every hit
+
+def load_types(datastores_dir=DATASTORES_DIR):
+    with open(os.path.join(datastores_dir, "types.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+class Combatant:
+    """A Pokémon in battle: effective stats (abilities applied) plus current HP."""
+    __slots__ = ("species_id", "name", "types", "max_hp", "hp", "attack", "defense")
+
+    def __init__(self, species_id, name, types, max_hp, attack, defense, hp=None):
+        self.species_id = species_id
+        self.name = name
+        self.types = tuple(types)
+        self.max_hp = max_hp
+        self.hp = max_hp if hp is None else hp
+        self.attack = attack
+        self.defense = defense
+
+    @property
+    def fainted(self):
+        return self.hp <= 0
+
+class Hit:
+    __slots__ = ("damage", "multiplier", "fainted")
+
+    def __init__(self, damage, multiplier, fainted):
+        self.damage = damage
+        self.multiplier = multiplier
+        self.fainted = fainted
+
+class BattleEngine:
+    """
+    Resolves hits, rounds and best-of-N matches. Pass a seed for reproducible results.
+    """
+    def __init__(self, registry, types, seed=None):
+        self.registry = registry
+        self.types = types
+        self.rng = random.Random(seed)
+        self.chart = TypeChart(types, registry)
+
+    @classmethod
+    def load(cls, datastores_dir=DATASTORES_DIR, seed=None):
+        return cls(Registry.load(datastores_dir), load_types(datastores_dir), seed)
+
+    # Stats
+
+    def _bonuses(self, ability_names):
+        attack = defense = 0
+        for name in ability_names:
+            ability = self.registry.get_ability(name)
+            if ability:
+                attack += ability.attack_bonus
+                defense += ability.defense_bonus
+        return attack, defense
+
+    def combatant(self, pokemon):
+        """Build a Combatant from a Species or a team entry, compact or legacy (its current_hp is kept)."""
+        if isinstance(pokemon, dict) and is_compact(pokemon):
+            pokemon = hydrate(self.registry, pokemon)
+        if isinstance(pokemon, dict):
+            types, abilities = pokemon.get("type", []), pokemon.get("special_abilities", [])
+            species_id, name = pokemon.get("id"), pokemon.get("name", "?")
+            max_hp, attack, defense = pokemon.get("hp", 0), pokemon.get("attack", 0), pokemon.get("defense", 0)
+            hp = pokemon.get("current_hp")
+        else:
+            types, abilities = pokemon.types, pokemon.abilities
+            species_id, name = pokemon.id, pokemon.name
+            max_hp, attack, defense = pokemon.hp, pokemon.attack, pokemon.defense
+            hp = None
+        attack_bonus, defense_bonus = self._bonuses(abilities)
+        return Combatant(species_id, name, types, max_hp, max(1, attack + attack_bonus), max(0, defense + defense_bonus), hp)
+
+    def type_multiplier(self, attacker_types, defender_types):
+        """Best of the attacker's types, each multiplied across all of the defender's types."""
+        return self.chart.multiplier(attacker_types, defender_types)
+
+    # Turns
+
+    def damage(self, attacker, defender, roll=None):
+        multiplier = self.type_multiplier(attacker.types, defender.types)
+        roll = self.rng.uniform(*DAMAGE_ROLL) if roll is None else roll
+        scaled = attacker.attack * multiplier * roll * DEFENSE_SCALE / (DEFENSE_SCALE + defender.defense)
+        return max(1, int(scaled)), multiplier
+
+    def strike(self, attacker, defender):
+        """One attack: applies damage to the defender and reports the hit."""
+        damage, multiplier = self.damage(attacker, defender)
+        defender.hp = max(0, defender.hp - damage)
+        return Hit(damage, multiplier, defender.fainted)
+
+    def duel(self, first, second):
+        """Alternate attacks, `first` opening, until one faints. Returns 0 if `first` won, else 1."""
+        fighters = (first, second)
+        turn = 0
+        while True:
+            if self.strike(fighters[turn], fighters[1 - turn]).fainted:
+                return turn
+            turn = 1 - turn
+
+    def match(self, team_a, team_b, best_of=3):
+        """
+        A best-of-N battle with the Discord rules: the round winner stays in with the HP it has
+        left, the loser sends out its next Pokémon and attacks first. Ends when a side runs out
+        or best_of rounds are played. Returns (rounds_a, rounds_b); teams are Combatants in order.
+        """
+        queues = (list(team_a), list(team_b))
+        out = [queues[0].pop(0), queues[1].pop(0)]
+        wins = [0, 0]
+        opener = 0
+        while True:
+            winner_of_duel = self.duel(out[opener], out[1 - opener])
+            winner = opener if winner_of_duel == 0 else 1 - opener
+            loser = 1 - winner
+            wins[winner] += 1
+            if not queues[loser] or sum(wins) >= best_of:
+                return wins[0], wins[1]
+            out[loser] = queues[loser].pop(0)
+            opener = loser
+
+def _bench(battles=20000, seed=1):
+    engine = BattleEngine.load(seed=seed)
+    species = engine.registry.species
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    a_wins = 0
+    for _ in range(battles):
+        team_a = [engine.combatant(s) for s in rng.sample(species, 3)]
+        team_b = [engine.combatant(s) for s in rng.sample(species, 3)]
+        rounds_a, rounds_b = engine.match(team_a, team_b)
+        a_wins += rounds_a > rounds_b
+    elapsed = time.perf_counter() - start
+    print(f"[Engine] {battles} best-of-3 battles in {elapsed:.2f}s ({battles / elapsed:,.0f}/s); side A won {a_wins / battles:.1%}")
+
+if __name__ == "__main__":
+    # python -m utils.battle_engine_utils -> throughput of random 3v3 battles
+    _bench()
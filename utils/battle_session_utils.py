@@ -0,0 +1,265 @@
+import asyncio
+import discord
+from utils.store_utils import GUILD_STORE, FLUSH_INTERVAL, run_io
+from utils.server_handler import load_server_data, update_server_data
+from utils.team_utils import compact, species_id_of
+
+# Battle states. A battle starts in CHOOSING, moves to FIGHTING once both sides have a Pokémon
+# out, drops back to CHOOSING when one faints, and ends in FINISHED.
+CHOOSING = "choosing"
+FIGHTING = "fighting"
+FINISHED = "finished"
+
+class BattleError(Exception):
+    """A move that isn't allowed right now; the message is shown to the player."""
+
+class BattleSession:
+    """
+    One battle held in memory. Commands change it only through the transition methods below;
+    the battle manager checkpoints it afterwards. to_dict() keeps the old active_battles shape.
+    """
+    __slots__ = (
+        "guild_id", "channel_id", "user1_id", "user2_id", "user1_name", "user2_name",
+        "user1_pokemon", "user2_pokemon", "user1_played", "user2_played",
+        "round", "best_of", "turn", "started_at", "round_winners", "state",
+    )
+
+    def __init__(self, guild_id, channel_id, user1_id, user2_id, user1_name="", user2_name="",
+                 user1_pokemon=None, user2_pokemon=None, user1_played=None, user2_played=None,
+                 round=1, best_of=3, turn=None, started_at=None, round_winners=None, state=None):
+        self.guild_id = int(guild_id)
+        self.channel_id = channel_id
+        self.user1_id = user1_id
+        self.user2_id = user2_id
+        self.user1_name = user1_name
+        self.user2_name = user2_name
+        self.user1_pokemon = user1_pokemon
+        self.user2_pokemon = user2_pokemon
+        self.user1_played = list(user1_played or [])
+        self.user2_played = list(user2_played or [])
+        self.round = round
+        self.best_of = best_of
+        self.turn = user1_id if turn is None else turn
+        self.started_at = int(discord.utils.utcnow().timestamp()) if started_at is None else started_at
+        self.round_winners = list(round_winners or [])
+        self.state = state or (FIGHTING if user1_pokemon and user2_pokemon else CHOOSING)
+
+    @classmethod
+    def from_dict(cls, guild_id, data):
+        """Rebuild a session; Pokémon saved as full species dicts by older versions are compacted."""
+        fields = {name: data[name] for name in cls.__slots__[1:] if name in data}
+        for side in ("user1", "user2"):
+            if fields.get(f"{side}_pokemon"):
+                fields[f"{side}_pokemon"] = compact(fields[f"{side}_pokemon"])
+            fields[f"{side}_played"] = [compact(p) for p in fields.get(f"{side}_played") or ()]
+        return cls(guild_id, **fields)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__[1:]}
+
+    # Lookups
+
+    def side(self, user_id):
+        if user_id == self.user1_id:
+            return 1
+        if user_id == self.user2_id:
+            return 2
+        raise BattleError("You are not a participant in this battle.")
+
+    def opponent_of(self, user_id):
+        return self.user2_id if self.side(user_id) == 1 else self.user1_id
+
+    def pokemon_of(self, user_id):
+        return self.user1_pokemon if self.side(user_id) == 1 else self.user2_pokemon
+
+    def played_by(self, user_id):
+        return self.user1_played if self.side(user_id) == 1 else self.user2_played
+
+    def available(self, user_id, team):
+        """Team members this player hasn't sent out yet (a team holds each species at most once)."""
+        played_ids = {species_id_of(p) for p in self.played_by(user_id)}
+        return [poke for poke in team if species_id_of(poke) not in played_ids]
+
+    # Transitions
+
+    def choose(self, user_id, pokemon):
+        """Send out a Pokémon. Returns True when this starts the fight (both sides are out)."""
+        side = self.side(user_id)
+        if self.state == FINISHED:
+            raise BattleError("This battle is already over.")
+        if self.pokemon_of(user_id):
+            raise BattleError("You already have a Pokémon in battle.")
+        # A compact copy, so battle damage never leaks into the trainer's saved team and the
+        # checkpoint holds no species data
+        pokemon = compact(pokemon)
+        if side == 1:
+            self.user1_pokemon = pokemon
+            self.user1_played.append(pokemon)
+        else:
+            self.user2_pokemon = pokemon
+            self.user2_played.append(pokemon)
+        if self.user1_pokemon and self.user2_pokemon:
+            self.state = FIGHTING
+            return True
+        return False
+
+    def attack(self, user_id, engine):
+        """
+        The current player attacks; the battle engine resolves the hit.
+        Returns (attacker, defender, hit). A faint ends the round: the winner is recorded and
+        the loser must choose again.
+        """
+        side = self.side(user_id)
+        if self.state != FIGHTING:
+            raise BattleError("Both players must choose a Pokémon first.")
+        if user_id != self.turn:
+            raise BattleError("It's not your turn!")
+        attacker, defender = (self.user1_pokemon, self.user2_pokemon) if side == 1 else (self.user2_pokemon, self.user1_pokemon)
+        defending = engine.combatant(defender)
+        hit = engine.strike(engine.combatant(attacker), defending)
+        defender["current_hp"] = defending.hp
+        self.turn = self.opponent_of(user_id)
+        if hit.fainted:
+            self.round_winners.append(user_id)
+            if side == 1:
+                self.user2_pokemon = None
+            else:
+                self.user1_pokemon = None
+            self.round += 1
+            self.state = CHOOSING
+        return attacker, defender, hit
+
+    def rounds_won(self):
+        return self.round_winners.count(self.user1_id), self.round_winners.count(self.user2_id)
+
+    def is_decided(self, loser_remaining):
+        """Over once the side that just lost a round has nobody left, or best_of rounds are played."""
+        return not loser_remaining or len(self.round_winners) >= self.best_of
+
+    def finish(self):
+        """End the battle on rounds won. Returns the winner's id, or None for a tie."""
+        if self.state == FINISHED:
+            raise BattleError("This battle is already over.")
+        self.state = FINISHED
+        user1_wins, user2_wins = self.rounds_won()
+        if user1_wins == user2_wins:
+            return None
+        return self.user1_id if user1_wins > user2_wins else self.user2_id
+
+    def forfeit(self, user_id):
+        """The given player gives up. Returns the winner's id."""
+        if self.state == FINISHED:
+            raise BattleError("This battle is already over.")
+        winner_id = self.opponent_of(user_id)
+        self.state = FINISHED
+        return winner_id
+
+class BattleManager:
+    """
+    Owns every live BattleSession, keyed by battle channel id. A change only marks the battle
+    dirty; checkpoints are written per battle by the flush clock (one row or one small file
+    each), never as a rewrite of the guild's data.json.
+    """
+    def __init__(self):
+        self._sessions = {}
+        self._dirty = set()
+        self._ended = {}  # channel_id -> guild_id, checkpoints still to delete
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, channel_id):
+        return self._sessions.get(channel_id)
+
+    def sessions(self):
+        return list(self._sessions.values())
+
+    def create(self, guild_id, channel_id, user1, user2):
+        session = BattleSession(guild_id, channel_id, user1.id, user2.id, user1.display_name, user2.display_name)
+        self._sessions[channel_id] = session
+        self.checkpoint(session)
+        return session
+
+    def checkpoint(self, session):
+        self._dirty.add(session.channel_id)
+
+    def end(self, channel_id):
+        session = self._sessions.pop(channel_id, None)
+        self._dirty.discard(channel_id)
+        if session:
+            self._ended[channel_id] = session.guild_id
+        return session
+
+    def drop_guild(self, guild_id):
+        """Forget a removed guild's battles without writing anything (its storage is purged)."""
+        for channel_id, session in list(self._sessions.items()):
+            if session.guild_id == int(guild_id):
+                del self._sessions[channel_id]
+                self._dirty.discard(channel_id)
+        self._ended = {c: g for c, g in self._ended.items() if g != int(guild_id)}
+
+    async def restore(self):
+        """Load checkpointed battles, and move any still stored in a guild's data.json into checkpoints."""
+        for guild_id, data in await run_io(GUILD_STORE.backend.read_battles):
+            if data.get("state") != FINISHED:
+                session = BattleSession.from_dict(guild_id, data)
+                self._sessions[session.channel_id] = session
+        for guild_id in await GUILD_STORE.aguild_ids():
+            data = await load_server_data(guild_id)
+            legacy = (data or {}).pop("active_battles", None)
+            if legacy is None:
+                continue
+            for battle in legacy:
+                if battle.get("channel_id") and battle["channel_id"] not in self._sessions:
+                    session = BattleSession.from_dict(guild_id, battle)
+                    self._sessions[session.channel_id] = session
+                    self.checkpoint(session)
+            update_server_data(guild_id, data)
+        print(f"[Battle] Restored {len(self)} battle(s)")
+
+    def take_dirty(self):
+        backend = GUILD_STORE.backend
+        upserts = [
+            backend.snapshot_battle(self._sessions[c].guild_id, c, self._sessions[c].to_dict())
+            for c in self._dirty
+        ]
+        deletes = [(guild_id, channel_id) for channel_id, guild_id in self._ended.items()]
+        dirty, ended = set(self._dirty), dict(self._ended)
+        self._dirty.clear()
+        self._ended.clear()
+        return upserts, deletes, dirty, ended
+
+    def _restore_dirty(self, dirty, ended):
+        self._dirty.update(c for c in dirty if c in self._sessions)
+        for channel_id, guild_id in ended.items():
+            self._ended.setdefault(channel_id, guild_id)
+
+    def flush(self):
+        upserts, deletes, dirty, ended = self.take_dirty()
+        if not upserts and not deletes:
+            return
+        try:
+            GUILD_STORE.backend.write_battles(upserts, deletes)
+        except Exception:
+            self._restore_dirty(dirty, ended)
+            raise
+
+    async def aflush(self):
+        upserts, deletes, dirty, ended = self.take_dirty()
+        if not upserts and not deletes:
+            return
+        try:
+            await run_io(GUILD_STORE.backend.write_battles, upserts, deletes)
+        except Exception:
+            self._restore_dirty(dirty, ended)
+            raise
+
+BATTLES = BattleManager()
+
+async def battle_checkpoint_clock(bot):
+    while not bot.is_closed():
+        await asyncio.sleep(FLUSH_INTERVAL)
+        try:
+            await BATTLES.aflush()
+        except Exception as e:
+            print(f"[Battle] Checkpoint failed, will retry: {e}")
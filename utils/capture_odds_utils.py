@@ -0,0 +1,11 @@
+# Capture odds, kept free of Discord and storage imports so the balance simulator can use them.
+CAPTURE_CHANCE_FLOOR = 0.05
+CAPTURE_CHANCE_CAP = 0.95
+POKEBALL_BONUS = {1: 1.0, 2: 1.2, 3: 1.5, 4: 2.0}  # Poké, Great, Ultra, Master Ball
+
+def capture_chance(player_power, pokemon_cp, pokeball_id=1):
+    """Probability that one throw succeeds: power against CP, scaled by the ball and capped."""
+    if player_power <= 0 or pokemon_cp <= 0:
+        return 0.0
+    base_chance = min(CAPTURE_CHANCE_CAP, max(CAPTURE_CHANCE_FLOOR, player_power / (player_power + pokemon_cp)))
+    return min(CAPTURE_CHANCE_CAP, base_chance * POKEBALL_BONUS.get(pokeball_id, 1.0))
@@ -0,0 +1,97 @@
+from utils.store_utils import GUILD_STORE, PLAYER_STORE, acommit
+from utils.hourly_item_grant import settle_item_grant
+from utils.player_handler import load_user_record, update_user_record, add_caught_pokemon
+from utils.server_handler import load_server_data, get_spawn, settle_spawn
+from utils.spawn_claim_utils import SPAWN_CLAIMS
+
+POKEBALLS = [
+    {"id": 1, "name": "Poké Ball"},
+    {"id": 2, "name": "Great Ball"},
+    {"id": 3, "name": "Ultra Ball"},
+    {"id": 4, "name": "Master Ball"},
+]
+BALL_NAMES = {ball["id"]: ball["name"] for ball in POKEBALLS}
+
+class CaptureError(Exception):
+    """The capture can't go ahead; the message is shown to the player."""
+
+def ball_counts(inventory):
+    """{ball id: amount} for every Poké Ball the trainer holds, in one pass over the inventory."""
+    return {entry["id"]: entry["amount"] for entry in inventory if entry["id"] in BALL_NAMES and entry["amount"] > 0}
+
+def open_spawn(guild_data, message_id, pokemon_id):
+    """The spawn posted as message_id if it is still this Pokémon and still catchable, else None."""
+    spawn = get_spawn(guild_data, message_id)
+    if spawn and spawn.get("id") == pokemon_id and spawn.get("status") == "active":
+        return spawn
+    return None
+
+class Capture:
+    """
+    One trainer's throw at one of a guild's spawns, found by its message id. The trainer and guild records are loaded once.
+    resolve() spends the ball, settles the spawn and adds the catch in one synchronous step, so no
+    other command can interleave, and commit() writes both records in a single backend batch.
+    """
+    __slots__ = ("guild_id", "user_id", "message_id", "pokemon_id", "user_data", "guild_data")
+
+    def __init__(self, guild_id, user_id, message_id, pokemon_id, user_data, guild_data):
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.message_id = message_id
+        self.pokemon_id = pokemon_id
+        self.user_data = user_data
+        self.guild_data = guild_data
+
+    @classmethod
+    async def open(cls, guild_id, user_id, message_id, pokemon_id):
+        user_data = await load_user_record(guild_id, user_id)
+        guild_data = await load_server_data(guild_id)
+        return cls(guild_id, user_id, message_id, pokemon_id, user_data, guild_data)
+
+    def spawn(self):
+        return open_spawn(self.guild_data, self.message_id, self.pokemon_id)
+
+    def available_balls(self):
+        """The balls the trainer can throw, as [{"id", "name", "amount"}], after crediting accrued grants."""
+        if self.user_data is None:
+            return []
+        if settle_item_grant(self.user_data):
+            PLAYER_STORE.put(self.guild_id, self.user_id, self.user_data)
+        counts = ball_counts(self.user_data.get("inventory", []))
+        return [{"id": ball_id, "name": BALL_NAMES[ball_id], "amount": counts[ball_id]} for ball_id in sorted(counts)]
+
+    async def resolve(self, ball_id, success, trainer_name, species, registry):
+        """
+        Apply a throw. Returns "escaped", or add_caught_pokemon's result for a catch ("success",
+        "duplicate" or "full"). Raises CaptureError, changing nothing, if the spawn is gone or the
+        ball was spent meanwhile (the player may have taken a while to pick one).
+        """
+        # Re-acquire both records (cache hits) in case either was reloaded while the player chose
+        self.user_data = await load_user_record(self.guild_id, self.user_id)
+        self.guild_data = await load_server_data(self.guild_id)
+        # No awaits from here on: the checks and every change below happen as one step
+        spawn = self.spawn()
+        if spawn is None:
+            raise CaptureError("The Pokémon has left the area!")
+        if self.user_data is None:
+            raise CaptureError("You need to set up your profile first with `/join`.")
+        inventory = self.user_data.get("inventory", [])
+        entry = next((e for e in inventory if e["id"] == ball_id and e["amount"] > 0), None)
+        if entry is None:
+            raise CaptureError("You don't have that Poké Ball anymore!")
+
+        entry["amount"] -= 1
+        if entry["amount"] == 0:
+            inventory.remove(entry)
+        settle_spawn(self.guild_data, self.message_id, "captured" if success else "escaped", trainer_name)
+        result = add_caught_pokemon(self.user_data, species, registry) if success else "escaped"
+        # Pokédex and power may change, so this goes through the leaderboard-aware update
+        update_user_record(self.guild_id, self.user_id, self.user_data)
+        GUILD_STORE.put(self.guild_id, self.guild_data)
+        SPAWN_CLAIMS.close(self.guild_id, self.message_id)
+        print(f"[Capture] {trainer_name} threw a {BALL_NAMES[ball_id]} at {species.name} in guild {self.guild_id}: {result}")
+        return result
+
+    async def commit(self):
+        """Write the trainer and guild records together now."""
+        await acommit([self.guild_id], [(self.guild_id, self.user_id)])
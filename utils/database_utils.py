@@ -1,6 +1,11 @@
+import asyncio
 import mysql.connector
+from mysql.connector import pooling
 
-def setup_database_connection(config):
+DEFAULT_POOL_SIZE = 5         # keep above store_utils.IO_WORKERS so the I/O pool never starves
+HEALTH_CHECK_INTERVAL = 60    # seconds between pool health checks
+
+def setup_database_pool(config):
     if not config.get('use_DB', False):
         print("Database usage is disabled in the configuration.")
         return None
@@ -11,16 +16,42 @@ def setup_database_connection(config):
 
     db_config = config['database']
     try:
-        db_connection = mysql.connector.connect(
+        db_pool = pooling.MySQLConnectionPool(
+            pool_name="pokedex",
+            pool_size=db_config.get('pool_size', DEFAULT_POOL_SIZE),
+            pool_reset_session=True,
             host=db_config.get('host', ''),
+            port=db_config.get('port', 3306),
             user=db_config.get('user', ''),
             password=db_config.get('password', ''),
             database=db_config.get('database', ''),
             autocommit=True,
-            connection_timeout=6000
+            connection_timeout=db_config.get('connection_timeout', 10)
         )
-        print("Database connection established successfully.")
-        return db_connection
+        print(f"Database connection pool established successfully (size {db_pool.pool_size}).")
+        return db_pool
     except mysql.connector.Error as err:
         print(f"Error connecting to the database: {err}")
-        return None
\ No newline at end of file
+        return None
+
+def check_database_health(db_pool):
+    """Borrow a connection, reconnect it if the server dropped it, and run a trivial query."""
+    conn = db_pool.get_connection()
+    try:
+        conn.ping(reconnect=True, attempts=3, delay=1)
+        cur = conn.cursor()
+        cur.execute("SELECT 1")
+        cur.fetchall()
+        cur.close()
+        return True
+    finally:
+        conn.close()
+
+async def database_health_clock(bot):
+    await bot.wait_until_ready()
+    while not bot.is_closed() and bot.db_pool:
+        try:
+            await asyncio.to_thread(check_database_health, bot.db_pool)
+        except mysql.connector.Error as err:
+            print(f"[Database] Health check failed: {err}")
+        await asyncio.sleep(HEALTH_CHECK_INTERVAL)
@@ -0,0 +1,185 @@
+import asyncio
+import contextvars
+import inspect
+import time
+from collections import deque
+
+ACTOR_IDLE_TIMEOUT = 30  # seconds a guild's worker waits for more work before it retires
+SERVICE_SAMPLES = 256    # recent service/wait times kept per guild for percentiles
+
+# The guild whose worker is running the current job, so a job can call run() for its own guild
+_running_guild = contextvars.ContextVar("running_guild", default=None)
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000 if ordered else 0.0
+
+class GuildActorStats:
+    """Counters of one guild's actor; they outlive its worker."""
+    __slots__ = ("processed", "failed", "max_depth", "service", "wait")
+
+    def __init__(self, samples=SERVICE_SAMPLES):
+        self.processed = 0
+        self.failed = 0
+        self.max_depth = 0
+        self.service = deque(maxlen=samples)  # seconds a job ran
+        self.wait = deque(maxlen=samples)     # seconds a job sat in the queue
+
+class GuildActor:
+    __slots__ = ("jobs", "wakeup", "worker", "busy")
+
+    def __init__(self):
+        self.jobs = deque()  # (fn, args, kwargs, future, queued_at)
+        self.wakeup = asyncio.Event()
+        self.worker = None
+        self.busy = False
+
+    def depth(self):
+        return len(self.jobs) + self.busy
+
+class GuildActors:
+    """
+    One asyncio actor per guild: a queue of record mutations and a worker that runs them one at a
+    time. Workers start on a guild's first job and retire after idle_timeout seconds without one,
+    so guilds run in parallel while each guild's read-modify-write steps never interleave.
+    Jobs should only touch records; Discord calls and user prompts stay outside, or they would
+    hold up every other mutation in the guild.
+    """
+    def __init__(self, idle_timeout=ACTOR_IDLE_TIMEOUT, samples=SERVICE_SAMPLES):
+        self.idle_timeout = idle_timeout
+        self.samples = samples
+        self._actors = {}
+        self._stats = {}
+
+    def __len__(self):
+        return len(self._actors)
+
+    def depth(self, guild_id):
+        actor = self._actors.get(str(guild_id))
+        return actor.depth() if actor else 0
+
+    async def run(self, guild_id, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) (sync or async) on the guild's actor and return its result."""
+        key = str(guild_id)
+        if _running_guild.get() == key:
+            # Already on this guild's worker: queueing would wait on ourselves
+            return await _call(fn, args, kwargs)
+        actor = self._actors.get(key)
+        if actor is None or actor.worker.done():
+            actor = self._start(key)
+        future = asyncio.get_running_loop().create_future()
+        actor.jobs.append((fn, args, kwargs, future, time.perf_counter()))
+        actor.wakeup.set()
+        stats = self._stats_for(key)
+        stats.max_depth = max(stats.max_depth, actor.depth())
+        return await future
+
+    def _start(self, key):
+        actor = self._actors[key] = GuildActor()
+        actor.worker = asyncio.create_task(self._work(key, actor))
+        actor.worker.add_done_callback(lambda task: self._stopped(key, actor, task))
+        return actor
+
+    def drop_guild(self, guild_id):
+        """Forget a guild's counters; a live worker finishes its queue and retires on its own."""
+        self._stats.pop(str(guild_id), None)
+
+    async def _work(self, key, actor):
+        _running_guild.set(key)
+        while True:
+            if not actor.jobs:
+                actor.wakeup.clear()
+                try:
+                    await asyncio.wait_for(actor.wakeup.wait(), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    pass
+                if not actor.jobs:
+                    # Unregister in the same step as the check, so a later run() starts a new worker
+                    if self._actors.get(key) is actor:
+                        del self._actors[key]
+                    return
+            fn, args, kwargs, future, queued_at = actor.jobs.popleft()
+            if future.done():
+                continue  # the caller gave up while it was queued
+            actor.busy = True
+            began = time.perf_counter()
+            try:
+                result = await _call(fn, args, kwargs)
+            except Exception as e:
+                self._stats_for(key).failed += 1
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                actor.busy = False
+                stats = self._stats_for(key)
+                stats.processed += 1
+                stats.service.append(time.perf_counter() - began)
+                stats.wait.append(began - queued_at)
+
+    def _stopped(self, key, actor, task):
+        if self._actors.get(key) is actor:
+            del self._actors[key]
+        if not actor.jobs:
+            return
+        if task.cancelled():
+            # Shutdown: nothing will run what's left
+            while actor.jobs:
+                future = actor.jobs.popleft()[3]
+                if not future.done():
+                    future.cancel()
+            return
+        # The worker stopped with jobs queued (e.g. one of them raised past it); they go first on a fresh one
+        fresh = self._actors.get(key) or self._start(key)
+        fresh.jobs.extendleft(reversed(actor.jobs))
+        actor.jobs.clear()
+        fresh.wakeup.set()
+
+    def _stats_for(self, key):
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = GuildActorStats(self.samples)
+        return stats
+
+    def guild_stats(self, guild_id):
+        key = str(guild_id)
+        stats = self._stats.get(key)
+        if stats is None:
+            return None
+        service = sorted(stats.service)
+        return {
+            "guild_id": key,
+            "depth": self.depth(key),
+            "max_depth": stats.max_depth,
+            "processed": stats.processed,
+            "failed": stats.failed,
+            "service_p50_ms": _percentile(service, 0.50),
+            "service_p99_ms": _percentile(service, 0.99),
+            "wait_p99_ms": _percentile(sorted(stats.wait), 0.99),
+        }
+
+    def stats(self, top=3):
+        """Totals across guilds, plus the `top` guilds with the slowest p99 service time."""
+        service = sorted(s for stats in self._stats.values() for s in stats.service)
+        wait = sorted(s for stats in self._stats.values() for s in stats.wait)
+        per_guild = [self.guild_stats(key) for key in self._stats]
+        per_guild.sort(key=lambda g: g["service_p99_ms"], reverse=True)
+        return {
+            "actors": len(self._actors),
+            "queued": sum(actor.depth() for actor in self._actors.values()),
+            "processed": sum(stats.processed for stats in self._stats.values()),
+            "failed": sum(stats.failed for stats in self._stats.values()),
+            "service_p50_ms": _percentile(service, 0.50),
+            "service_p99_ms": _percentile(service, 0.99),
+            "wait_p99_ms": _percentile(wait, 0.99),
+            "slowest": per_guild[:top],
+        }
+
+async def _call(fn, args, kwargs):
+    result = fn(*args, **kwargs)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+GUILD_ACTORS = GuildActors()
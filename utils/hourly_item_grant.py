@@ -1,34 +1,35 @@
-import asyncio
-import os
-import json
 import time
-from utils.inventory_utils import add_item_to_inventory, get_item_amount
 
+# Every trainer earns one Poké Ball per hour, up to a balance of 12
+GRANT_ITEM_ID = 1
+GRANT_MAX_AMOUNT = 12
+GRANT_INTERVAL = 3600  # seconds per ball
 
-def item_grant(bot):
-    SERVERS_DIR = os.path.join(os.getcwd(), "servers")
-    item_id=1
-    max_amount=12
-    print("[HourlyItemGrant] Running hourly item grant...")
-    for guild in bot.guilds:
-        guild_dir = os.path.join(SERVERS_DIR, str(guild.id))
-        if not os.path.isdir(guild_dir):
-            continue
-        for filename in os.listdir(guild_dir):
-            if filename == "data.json":
-                continue
-            user_id = filename[:-5]
-            try:
-                amount = get_item_amount(guild.id, user_id, item_id)
-                if amount < max_amount:
-                    add_item_to_inventory(guild.id, user_id, item_id, 1)
-            except Exception as e:
-                print(f"[HourlyItemGrant] Error processing {filename} in {guild_dir}: {e}")
-    print("[HourlyItemGrant] Done. Sleeping until next hour...")
-        
-        
-async def hourly_item_grant(bot):
-    await bot.wait_until_ready()
-    while not bot.is_closed():
-        item_grant(bot)
-        await asyncio.sleep(bot.pokeballrate)
\ No newline at end of file
+def settle_item_grant(data, now=None, interval=GRANT_INTERVAL):
+    """
+    Credit the balls a trainer accrued since data["last_grant_at"]. Called whenever the inventory
+    is read or changed, so nothing has to sweep every player file on a timer. Returns True if the
+    record changed and needs saving.
+
+    Matches the old hourly sweep: each elapsed hour adds one ball while the balance is under the
+    cap, and hours spent at the cap are lost.
+    """
+    now = int(time.time() if now is None else now)
+    last = data.get("last_grant_at")
+    if last is None:
+        data["last_grant_at"] = now
+        return True
+    hours = (now - last) // interval
+    if hours <= 0:
+        return False
+    data["last_grant_at"] = last + hours * interval
+    inventory = data.setdefault("inventory", [])
+    entry = next((e for e in inventory if e["id"] == GRANT_ITEM_ID), None)
+    amount = entry["amount"] if entry else 0
+    if amount < GRANT_MAX_AMOUNT:
+        granted = min(hours, GRANT_MAX_AMOUNT - amount)
+        if entry:
+            entry["amount"] += granted
+        else:
+            inventory.append({"id": GRANT_ITEM_ID, "amount": granted})
+    return True
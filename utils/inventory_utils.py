@@ -1,67 +1,67 @@
-import os
-import json
+from utils.store_utils import PLAYER_STORE
+from utils.hourly_item_grant import settle_item_grant, GRANT_ITEM_ID
+from utils.guild_actor_utils import GUILD_ACTORS
 
-SERVERS_DIR = os.path.join(os.getcwd(), "servers")
+async def _settled_record(guild_id, user_id):
+    """The cached record with any Poké Balls accrued since the last visit credited."""
+    data = await PLAYER_STORE.aget(guild_id, user_id)
+    if data is not None and settle_item_grant(data):
+        PLAYER_STORE.put(guild_id, user_id, data)
+    return data
 
-def get_player_inventory(guild_id, user_id):
-    """Load a player's inventory from their data file."""
-    user_file = os.path.join(SERVERS_DIR, str(guild_id), f"{user_id}.json")
-    if not os.path.isfile(user_file):
+async def get_player_inventory(guild_id, user_id):
+    """Load a player's inventory from their cached record."""
+    data = await _settled_record(guild_id, user_id)
+    if data is None:
         return []
-    with open(user_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
     return data.get("inventory", [])
 
-def save_player_inventory(guild_id, user_id, inventory):
-    """Save a player's inventory to their data file."""
-    user_file = os.path.join(SERVERS_DIR, str(guild_id), f"{user_id}.json")
-    if not os.path.isfile(user_file):
+async def save_player_inventory(guild_id, user_id, inventory):
+    """Save a player's inventory to their cached record."""
+    data = await PLAYER_STORE.aget(guild_id, user_id)
+    if data is None:
         data = {}
-    else:
-        with open(user_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
     data["inventory"] = inventory
-    with open(user_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    PLAYER_STORE.put(guild_id, user_id, data)
 
-def add_item_to_inventory(guild_id, user_id, item_id, amount=1):
+async def add_item_to_inventory(guild_id, user_id, item_id, amount=1):
     """Add an item to a player's inventory."""
-    inventory = get_player_inventory(guild_id, user_id)
+    inventory = await get_player_inventory(guild_id, user_id)
     for entry in inventory:
         if entry["id"] == item_id:
             entry["amount"] += amount
             break
     else:
         inventory.append({"id": item_id, "amount": amount})
-    save_player_inventory(guild_id, user_id, inventory)
+    await save_player_inventory(guild_id, user_id, inventory)
+
+async def grant_item(guild_id, user_id, item_id, amount=1):
+    """add_item_to_inventory on the guild's actor, so concurrent grants can't overwrite each other."""
+    await GUILD_ACTORS.run(guild_id, add_item_to_inventory, guild_id, user_id, item_id, amount)
 
-def remove_item_from_inventory(guild_id, user_id, item_id, amount=1):
+async def remove_item_from_inventory(guild_id, user_id, item_id, amount=1):
     """Remove an item from a player's inventory. Returns True if successful."""
-    inventory = get_player_inventory(guild_id, user_id)
+    inventory = await get_player_inventory(guild_id, user_id)
     for entry in inventory:
         if entry["id"] == item_id:
             if entry["amount"] >= amount:
                 entry["amount"] -= amount
                 if entry["amount"] == 0:
                     inventory.remove(entry)
-                save_player_inventory(guild_id, user_id, inventory)
+                await save_player_inventory(guild_id, user_id, inventory)
                 return True
             else:
                 return False
     return False
 
-def has_item(guild_id, user_id, item_id, amount=1):
+async def has_item(guild_id, user_id, item_id, amount=1):
     """Check if a player has at least a certain amount of an item."""
-    inventory = get_player_inventory(guild_id, user_id)
-    for entry in inventory:
-        if entry["id"] == item_id and entry["amount"] >= amount:
-            return True
-    return False
+    return await get_item_amount(guild_id, user_id, item_id) >= amount
 
-def get_item_amount(guild_id, user_id, item_id):
+async def get_item_amount(guild_id, user_id, item_id):
     """Get the amount of a specific item a player has."""
-    inventory = get_player_inventory(guild_id, user_id)
-    for entry in inventory:
-        if entry["id"] == item_id:
-            return entry["amount"]
-    return 0
\ No newline at end of file
+    if item_id == GRANT_ITEM_ID:
+        # The stored balance may be behind by the balls accrued since last_grant_at
+        data = await _settled_record(guild_id, user_id) or {}
+        return next((entry["amount"] for entry in data.get("inventory", []) if entry["id"] == item_id), 0)
+    return await PLAYER_STORE.aitem_amount(guild_id, user_id, item_id)
@@ -0,0 +1,172 @@
+import heapq
+from bisect import bisect_left, insort
+from itertools import islice
+from utils.store_utils import GUILD_STORE, PLAYER_STORE
+from utils.rating_utils import DEFAULT_RATING
+from utils.pokedex_utils import pokedex_count
+
+# Ranked stats, in the order they are stored in data["leaderboard"][user_id]
+LEADERBOARD_METRICS = ("power", "pokedex", "wins", "rating")
+LEADERBOARD_SIZE = 10
+
+def player_scores(user_data):
+    return [
+        user_data.get("power", 0), pokedex_count(user_data),
+        user_data.get("battle_wins", 0), user_data.get("rating", DEFAULT_RATING),
+    ]
+
+def stored_scores(scores):
+    """Scores saved before a metric existed get that metric's default."""
+    return list(scores) + player_scores({})[len(scores):]
+
+class GuildBoard:
+    """
+    One guild's trainers ranked by each metric. Each ranking is a list of (-score, user_id) kept
+    sorted with bisect, so an update moves one entry and the top K is a slice.
+
+    Every trainer stays in the ranking, not only the top K: when a leader's score drops, the
+    next trainer must already be there to take their place.
+    """
+    __slots__ = ("scores", "ranked")
+
+    def __init__(self, scores=None):
+        self.scores = scores if scores is not None else {}  # user_id -> [power, pokedex, wins, rating]
+        self.ranked = [
+            sorted((-entry[i], user_id) for user_id, entry in self.scores.items())
+            for i in range(len(LEADERBOARD_METRICS))
+        ]
+
+    def update(self, user_id, scores):
+        """Returns True if any of the trainer's scores changed."""
+        old = self.scores.get(user_id)
+        if old == scores:
+            return False
+        for ranking, old_score, new_score in zip(self.ranked, old or [None] * len(scores), scores):
+            if old_score == new_score:
+                continue
+            if old_score is not None:
+                del ranking[bisect_left(ranking, (-old_score, user_id))]
+            insort(ranking, (-new_score, user_id))
+        self.scores[user_id] = scores
+        return True
+
+    def remove(self, user_id):
+        old = self.scores.pop(user_id, None)
+        if old is None:
+            return False
+        for ranking, score in zip(self.ranked, old):
+            del ranking[bisect_left(ranking, (-score, user_id))]
+        return True
+
+    def top(self, metric, k=LEADERBOARD_SIZE):
+        """[(user_id, score)] best first. O(k)."""
+        ranking = self.ranked[LEADERBOARD_METRICS.index(metric)]
+        return [(user_id, -negative) for negative, user_id in ranking[:k]]
+
+    def rank_of(self, metric, user_id):
+        """1-based position of a trainer, or None if they aren't ranked."""
+        scores = self.scores.get(user_id)
+        if scores is None:
+            return None
+        i = LEADERBOARD_METRICS.index(metric)
+        return bisect_left(self.ranked[i], (-scores[i], user_id)) + 1
+
+    def nearest(self, metric, user_id, k=5):
+        """
+        Up to k other trainers whose score is closest to this trainer's, closest first. Walks
+        outwards from the trainer's position in the ranking, so it is O(log n + k).
+        """
+        scores = self.scores.get(user_id)
+        i = LEADERBOARD_METRICS.index(metric)
+        ranking = self.ranked[i]
+        target = -(scores[i] if scores is not None else player_scores({})[i])
+        right = bisect_left(ranking, (target, user_id))
+        left = right - 1
+        found = []
+        while len(found) < k and (left >= 0 or right < len(ranking)):
+            take_right = left < 0 or (right < len(ranking) and ranking[right][0] - target <= target - ranking[left][0])
+            if take_right:
+                negative, other = ranking[right]
+                right += 1
+            else:
+                negative, other = ranking[left]
+                left -= 1
+            if other != user_id:
+                found.append((other, -negative))
+        return found
+
+class Leaderboards:
+    """
+    Per-guild boards kept up to date as player records are written, and persisted as
+    data["leaderboard"] in each guild's record so they are never rebuilt from player files.
+    The global board is a k-way merge of every guild's top K.
+    """
+    def __init__(self):
+        self._boards = {}
+
+    def board(self, guild_id):
+        key = str(guild_id)
+        board = self._boards.get(key)
+        if board is None:
+            data = GUILD_STORE.get(key) or {}
+            board = self._boards[key] = GuildBoard({u: stored_scores(s) for u, s in data.get("leaderboard", {}).items()})
+        return board
+
+    def record(self, guild_id, user_id, user_data):
+        """Called on every player write; only touches the board when a ranked stat moved."""
+        key, uid = str(guild_id), str(user_id)
+        scores = player_scores(user_data)
+        if not self.board(key).update(uid, scores):
+            return
+        data = GUILD_STORE.get(key)
+        if data is not None:
+            data.setdefault("leaderboard", {})[uid] = list(scores)
+            GUILD_STORE.put(key, data)
+
+    def remove(self, guild_id, user_id):
+        key, uid = str(guild_id), str(user_id)
+        if not self.board(key).remove(uid):
+            return
+        data = GUILD_STORE.get(key)
+        if data is not None:
+            data.get("leaderboard", {}).pop(uid, None)
+            GUILD_STORE.put(key, data)
+
+    def drop_guild(self, guild_id):
+        self._boards.pop(str(guild_id), None)
+
+    def top(self, guild_id, metric, k=LEADERBOARD_SIZE):
+        return self.board(guild_id).top(metric, k)
+
+    def global_top(self, metric, k=LEADERBOARD_SIZE):
+        """[(guild_id, user_id, score)] across every loaded guild. O(G + k log G)."""
+        i = LEADERBOARD_METRICS.index(metric)
+        tops = [
+            [(negative, user_id, guild_id) for negative, user_id in board.ranked[i][:k]]
+            for guild_id, board in self._boards.items()
+        ]
+        return [(guild_id, user_id, -negative) for negative, user_id, guild_id in islice(heapq.merge(*tops), k)]
+
+    async def restore(self):
+        """
+        Load every guild's board. A guild stored before leaderboards existed is built once from
+        its player records and saved, so later starts read only data.json.
+        """
+        built = 0
+        for guild_id in await GUILD_STORE.aguild_ids():
+            data = await GUILD_STORE.aget(guild_id)
+            if data is None:
+                continue
+            if "leaderboard" not in data:
+                scores = {}
+                for user_id in await PLAYER_STORE.auser_ids(guild_id):
+                    user_data = await PLAYER_STORE.aget(guild_id, user_id)
+                    if user_data is not None:
+                        scores[user_id] = player_scores(user_data)
+                data["leaderboard"] = scores
+                GUILD_STORE.put(guild_id, data)
+                built += 1
+            self._boards[str(guild_id)] = GuildBoard({u: stored_scores(s) for u, s in data["leaderboard"].items()})
+        print(f"[Leaderboard] Loaded {len(self._boards)} guild board(s), built {built} from player records")
+
+LEADERBOARDS = Leaderboards()
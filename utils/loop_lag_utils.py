@@ -0,0 +1,84 @@
+import asyncio
+import time
+from collections import deque
+
+LAG_SAMPLE_INTERVAL = 0.5  # seconds between probes
+LAG_WARN_THRESHOLD = 0.25  # seconds of lag before a warning is printed
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: how late a sleep(interval) wakes up. Anything that blocks
+    the loop (disk I/O, heavy CPU) shows up here and delays gateway heartbeats the same way.
+    """
+    def __init__(self, interval=LAG_SAMPLE_INTERVAL, window=600):
+        self.interval = interval
+        self.samples = deque(maxlen=window)
+        self.worst = 0.0
+
+    def record(self, lag):
+        self.samples.append(lag)
+        self.worst = max(self.worst, lag)
+
+    def stats(self):
+        if not self.samples:
+            return {"samples": 0, "avg_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(self.samples)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        return {
+            "samples": len(ordered),
+            "avg_ms": sum(ordered) / len(ordered) * 1000,
+            "p99_ms": p99 * 1000,
+            "max_ms": self.worst * 1000,
+        }
+
+    async def run(self, is_closed=lambda: False):
+        while not is_closed():
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.record(lag)
+            if lag > LAG_WARN_THRESHOLD:
+                print(f"[LoopLag] Event loop blocked for {lag*1000:.0f}ms")
+
+async def loop_lag_clock(bot):
+    bot.loop_lag = LoopLagMonitor()
+    await bot.wait_until_ready()
+    await bot.loop_lag.run(bot.is_closed)
+
+async def _bench(players=2000, use_async=True):
+    """Hammer the player store with misses and writes while measuring loop lag."""
+    import tempfile
+    from utils.store_utils import PlayerStore, JsonBackend, _write_json, run_io
+
+    servers_dir = tempfile.mkdtemp()
+    for user_id in range(players):
+        _write_json(f"{servers_dir}/1/{user_id}.json", {"inventory": [{"id": 1, "amount": 1}], "pokedex": list(range(100))})
+    store = PlayerStore(JsonBackend(servers_dir), max_resident=players)
+    monitor = LoopLagMonitor(interval=0.01, window=100000)
+    done = False
+    probe = asyncio.create_task(monitor.run(lambda: done))
+
+    # Roughly what a busy shard sees: many interactions in flight, not thousands at once
+    in_flight = asyncio.Semaphore(50)
+
+    async def touch(user_id):
+        async with in_flight:
+            record = await store.aget(1, user_id) if use_async else store.get(1, user_id)
+            record["inventory"][0]["amount"] += 1
+            store.put(1, user_id, record)
+
+    await asyncio.gather(*(touch(user_id) for user_id in range(players)))
+    _, payloads = store.take_dirty()
+    if use_async:
+        await run_io(store.backend.write_batch, [], payloads)
+    else:
+        store.backend.write_batch([], payloads)
+    done = True
+    await probe
+    return monitor.stats()
+
+if __name__ == "__main__":
+    # python -m utils.loop_lag_utils  -> compare loop lag of blocking vs off-loop store I/O
+    for label, use_async in (("blocking", False), ("off-loop", True)):
+        stats = asyncio.run(_bench(use_async=use_async))
+        print(f"{label:>8}: avg={stats['avg_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms max={stats['max_ms']:.2f}ms")
@@ -0,0 +1,49 @@
+import argparse
+import os
+from utils.store_utils import JsonBackend, SERVERS_DIR
+from utils.sqlite_backend import SqliteBackend
+
+def migrate(servers_dir=SERVERS_DIR, db_path=None):
+    """
+    One-shot copy of the servers/<guild_id>/*.json tree into SQLite.
+    Safe to re-run: every record is written with REPLACE semantics.
+    """
+    db_path = db_path or os.path.join(servers_dir, "pokedex.db")
+    source = JsonBackend(servers_dir)
+    target = SqliteBackend(db_path)
+    guild_count = player_count = 0
+    for guild_id in source.guild_ids():
+        guilds = []
+        data = source.read_guild(guild_id)
+        if data is not None:
+            guilds.append((guild_id, target.snapshot_guild(guild_id, data)))
+        players = []
+        for user_id in source.user_ids(guild_id):
+            try:
+                record = source.read_player(guild_id, user_id)
+            except ValueError as e:
+                print(f"[Migrate] Skipping unreadable player file {user_id}.json in guild {guild_id}: {e}")
+                continue
+            if record is not None:
+                players.append((guild_id, user_id, target.snapshot_player(guild_id, user_id, record)))
+        target.write_batch(guilds, players)
+        # Battles still embedded in data.json from before per-battle checkpoints
+        legacy_battles = (data or {}).get("active_battles", [])
+        target.write_battles([target.snapshot_battle(guild_id, b["channel_id"], b) for b in legacy_battles if b.get("channel_id")], [])
+        matches = source.read_matches(guild_id)
+        if matches and not target.read_matches(guild_id):
+            target.append_matches([(guild_id, row) for row in matches])
+        guild_count += len(guilds)
+        player_count += len(players)
+        print(f"[Migrate] Guild {guild_id}: {len(players)} player(s)")
+    battles = source.read_battles()
+    target.write_battles([target.snapshot_battle(guild_id, b["channel_id"], b) for guild_id, b in battles], [])
+    print(f"[Migrate] Done: {guild_count} guild(s), {player_count} player(s) -> {db_path}")
+    return guild_count, player_count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy the JSON servers/ tree into a SQLite database.")
+    parser.add_argument("--servers", default=SERVERS_DIR, help="Path to the servers/ folder")
+    parser.add_argument("--db", default=None, help="SQLite file to create (default: servers/pokedex.db)")
+    args = parser.parse_args()
+    migrate(args.servers, args.db)
@@ -0,0 +1,192 @@
+import time
+from contextlib import contextmanager
+import mysql.connector
+from mysql.connector import errors
+from utils.sql_backend import SqlBackend
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS guilds (
+        guild_id BIGINT PRIMARY KEY,
+        settings TEXT NOT NULL,
+        channels TEXT NOT NULL,
+        extra TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS trainers (
+        guild_id BIGINT NOT NULL,
+        user_id BIGINT NOT NULL,
+        nickname VARCHAR(255) NOT NULL DEFAULT '',
+        gender VARCHAR(64) NOT NULL DEFAULT '',
+        pronouns VARCHAR(64) NOT NULL DEFAULT '',
+        coin INT NOT NULL DEFAULT 0,
+        power INT NOT NULL DEFAULT 0,
+        badges TEXT NOT NULL,
+        extra TEXT NOT NULL,
+        PRIMARY KEY (guild_id, user_id),
+        INDEX idx_trainers_power (guild_id, power)
+    )""",
+    """CREATE TABLE IF NOT EXISTS inventory (
+        guild_id BIGINT NOT NULL,
+        user_id BIGINT NOT NULL,
+        item_id INT NOT NULL,
+        amount INT NOT NULL,
+        PRIMARY KEY (guild_id, user_id, item_id),
+        INDEX idx_inventory_item (guild_id, item_id, amount)
+    )""",
+    """CREATE TABLE IF NOT EXISTS pokedex (
+        guild_id BIGINT NOT NULL,
+        user_id BIGINT NOT NULL,
+        pokemon_id INT NOT NULL,
+        PRIMARY KEY (guild_id, user_id, pokemon_id),
+        INDEX idx_pokedex_pokemon (guild_id, pokemon_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS active_team (
+        guild_id BIGINT NOT NULL,
+        user_id BIGINT NOT NULL,
+        slot TINYINT NOT NULL,
+        pokemon_id INT,
+        data TEXT NOT NULL,
+        PRIMARY KEY (guild_id, user_id, slot),
+        INDEX idx_active_team_pokemon (guild_id, pokemon_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS spawns (
+        guild_id BIGINT NOT NULL,
+        message_id BIGINT NOT NULL DEFAULT 0,
+        pokemon_id INT,
+        status VARCHAR(16),
+        trainer VARCHAR(255),
+        spawn_time BIGINT,
+        PRIMARY KEY (guild_id, message_id),
+        INDEX idx_spawns_status (status, spawn_time)
+    )""",
+    """CREATE TABLE IF NOT EXISTS battles (
+        guild_id BIGINT NOT NULL,
+        channel_id BIGINT NOT NULL,
+        user1_id BIGINT,
+        user2_id BIGINT,
+        started_at BIGINT,
+        state MEDIUMTEXT NOT NULL,
+        PRIMARY KEY (guild_id, channel_id),
+        INDEX idx_battles_user1 (guild_id, user1_id),
+        INDEX idx_battles_user2 (guild_id, user2_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS matches (
+        match_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        guild_id BIGINT NOT NULL,
+        ended_at BIGINT NOT NULL,
+        user1_id BIGINT NOT NULL,
+        user2_id BIGINT NOT NULL,
+        winner_id BIGINT NOT NULL DEFAULT 0,
+        forfeit TINYINT NOT NULL DEFAULT 0,
+        user1_rounds TINYINT NOT NULL DEFAULT 0,
+        user2_rounds TINYINT NOT NULL DEFAULT 0,
+        user1_rating INT NOT NULL,
+        user2_rating INT NOT NULL,
+        INDEX idx_matches_user1 (guild_id, user1_id),
+        INDEX idx_matches_user2 (guild_id, user2_id)
+    )""",
+]
+
+# Errors that mean the connection is gone rather than the query being wrong
+RETRYABLE_ERRORS = (errors.OperationalError, errors.InterfaceError, errors.PoolError)
+
+class MySQLBackend(SqlBackend):
+    """
+    Same tables as the SQLite backend, on a shared MySQL/MariaDB server through a
+    mysql.connector connection pool, so several bot processes can point at one database.
+    """
+    name = "mysql"
+    PARAM = "%s"
+    RETRIES = 3
+    RETRY_DELAY = 0.5
+
+    def __init__(self, pool):
+        self.pool = pool
+        with self._transaction() as cur:
+            for statement in SCHEMA:
+                cur.execute(statement)
+
+    def _checkout(self):
+        """Borrow a pooled connection, reconnecting it if the server dropped it."""
+        for attempt in range(self.RETRIES):
+            try:
+                conn = self.pool.get_connection()
+            except errors.PoolError:
+                # Pool exhausted: every connection is busy on another I/O thread
+                if attempt == self.RETRIES - 1:
+                    raise
+                time.sleep(self.RETRY_DELAY)
+                continue
+            try:
+                conn.ping(reconnect=True, attempts=3, delay=1)
+            except mysql.connector.Error:
+                conn.close()
+                raise
+            return conn
+
+    def _fetch(self, sql, params, prepared):
+        for attempt in range(self.RETRIES):
+            conn = self._checkout()
+            try:
+                # Prepared cursors let the server reuse the plan for the hot lookups
+                cur = conn.cursor(prepared=prepared)
+                try:
+                    cur.execute(sql, params)
+                    return cur.fetchall()
+                finally:
+                    cur.close()
+            except RETRYABLE_ERRORS:
+                if attempt == self.RETRIES - 1:
+                    raise
+                time.sleep(self.RETRY_DELAY)
+            finally:
+                conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._checkout()
+        cur = conn.cursor()
+        try:
+            conn.start_transaction()
+            yield cur
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
+
+def self_test(config):
+    """Round-trip a throwaway guild and player through the configured database."""
+    from utils.database_utils import setup_database_pool
+    pool = setup_database_pool(config)
+    if pool is None:
+        print("[MySQL] No pool; check use_DB and the database section of config.json.")
+        return False
+    backend = MySQLBackend(pool)
+    guild = {"guild_id": 0, "created": True, "settings": {}, "channels": {"wild": 1},
+             "spawns": {"2": {"id": 25, "spawn_time": 1, "status": "active", "trainer": None, "message_id": 2}}}
+    battle = {"channel_id": 3, "user1_id": 4, "user2_id": 5, "started_at": 1, "state": "choosing"}
+    player = {"inventory": [{"id": 1, "amount": 3}], "pokedex": "2000000", "active_pokemon": [{"species_id": 25, "instance_id": "0", "current_hp": 35, "level": 1, "nickname": ""}],
+              "badges": [], "coin": 100, "gender": "", "pronouns": "", "nickname": "selftest", "power": 0}
+    backend.write_batch([("0", backend.snapshot_guild("0", guild))], [("0", "0", backend.snapshot_player("0", "0", player))])
+    backend.write_battles([backend.snapshot_battle("0", 3, battle)], [])
+    match = (1, 4, 5, 4, 0, 2, 1, 1216, 1184)
+    backend.append_matches([("0", match)])
+    ok = (
+        backend.read_guild("0") == guild
+        and backend.read_player("0", "0") == player
+        and backend.item_amount("0", "0", 1) == 3
+        and backend.spawns("0") == guild["spawns"]
+        and backend.active_team("0", "0") == player["active_pokemon"]
+        and ("0", battle) in backend.read_battles()
+        and backend.read_matches("0") == [match]
+    )
+    backend.purge_guild("0")
+    print(f"[MySQL] Self-test {'passed' if ok else 'FAILED'}")
+    return ok
+
+if __name__ == "__main__":
+    # python -m utils.mysql_backend -> round-trip test against datastores/config.json's database
+    from utils.config_utils import load_config
+    self_test(load_config())
@@ -1,192 +1,254 @@
 import os
-import json
+import time
 import discord
+from utils.store_utils import PLAYER_STORE, SERVERS_DIR
+from utils.guild_actor_utils import GUILD_ACTORS
+from utils.leaderboard_utils import LEADERBOARDS
+from utils.rating_utils import DEFAULT_RATING, rate, match_row, append_match
+from utils.pokedex_utils import add_caught, encode
+from utils.team_utils import new_instance, compact_team, species_id_of, hydrate, hydrate_team, team_power
 
-# Store player files in servers/<guild_id>/<user_id>.json
-SERVERS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "servers")
+# Player records live in servers/<guild_id>/<user_id>.json, cached by PLAYER_STORE
 
 def get_user_file_path(guild_id, user_id):
     guild_folder = os.path.join(SERVERS_DIR, str(guild_id))
     os.makedirs(guild_folder, exist_ok=True)
     return os.path.join(guild_folder, f"{user_id}.json")
 
-def create_user_record(guild_id, user_id):
-    user_file = get_user_file_path(guild_id, user_id)
-    if not os.path.exists(user_file):
+async def create_user_record(guild_id, user_id):
+    if await load_user_record(guild_id, user_id) is None:
         user_data = {
             "inventory": [],
-            "pokedex": [],
+            "pokedex": encode(0),
             "active_pokemon": [],
             "badges": [],
             "coin": 100,
             "gender": "",
             "pronouns": "",
             "nickname": "",
-            "power": 0
+            "power": 0,
+            "battle_wins": 0,
+            "battle_losses": 0,
+            "rating": DEFAULT_RATING,
+            "last_grant_at": int(time.time())
         }
-        with open(user_file, "w", encoding="utf-8") as f:
-            json.dump(user_data, f, indent=2)
-    return read_user_record(guild_id, user_id)
+        PLAYER_STORE.put(guild_id, user_id, user_data)
+        LEADERBOARDS.record(guild_id, user_id, user_data)
+    return await load_user_record(guild_id, user_id)
 
 def read_user_record(guild_id, user_id):
-    user_file = get_user_file_path(guild_id, user_id)
-    if not os.path.exists(user_file):
-        return None
-    with open(user_file, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return PLAYER_STORE.get(guild_id, user_id)
+
+async def load_user_record(guild_id, user_id):
+    """Async read_user_record for coroutines: a cache miss is read off the event loop."""
+    return await PLAYER_STORE.aget(guild_id, user_id)
 
 def update_user_record(guild_id, user_id, user_data):
-    user_file = get_user_file_path(guild_id, user_id)
-    with open(user_file, "w", encoding="utf-8") as f:
-        json.dump(user_data, f, indent=2)
+    compact_team(user_data)
+    PLAYER_STORE.put(guild_id, user_id, user_data)
+    LEADERBOARDS.record(guild_id, user_id, user_data)
 
 def delete_user_record(guild_id, user_id):
-    user_file = get_user_file_path(guild_id, user_id)
-    if os.path.exists(user_file):
-        os.remove(user_file)
+    PLAYER_STORE.delete(guild_id, user_id)
+    LEADERBOARDS.remove(guild_id, user_id)
+
+async def record_battle_result(guild_id, user1_id, user2_id, winner_id, rounds=(0, 0), forfeit=False):
+    """
+    Settle a finished battle: both trainers' ratings and win/loss counts change, and the match
+    is appended to the guild's history. winner_id is None for a tie. Runs on the guild's actor,
+    so both records are read and rated without another mutation slipping in between.
+    """
+    return await GUILD_ACTORS.run(guild_id, _record_battle_result, guild_id, user1_id, user2_id, winner_id, rounds, forfeit)
+
+async def _record_battle_result(guild_id, user1_id, user2_id, winner_id, rounds, forfeit):
+    user1 = await load_user_record(guild_id, user1_id)
+    user2 = await load_user_record(guild_id, user2_id)
+    if user1 is None or user2 is None:
+        return None
+    score1 = 0.5 if winner_id is None else float(winner_id == user1_id)
+    ratings = rate(user1.get("rating", DEFAULT_RATING), user2.get("rating", DEFAULT_RATING), score1)
+    for user_id, user_data, rating in ((user1_id, user1, ratings[0]), (user2_id, user2, ratings[1])):
+        user_data["rating"] = rating
+        if winner_id == user_id:
+            user_data["battle_wins"] = user_data.get("battle_wins", 0) + 1
+        elif winner_id is not None:
+            user_data["battle_losses"] = user_data.get("battle_losses", 0) + 1
+        update_user_record(guild_id, user_id, user_data)
+    await append_match(guild_id, match_row(user1_id, user2_id, winner_id, rounds, forfeit, ratings))
+    return ratings
 
-def add_pokemon_to_pokedex(guild_id, user_id, pokemon_id):
-    user_data = read_user_record(guild_id, user_id)
+async def add_pokemon_to_pokedex(guild_id, user_id, pokemon_id):
+    user_data = await load_user_record(guild_id, user_id)
     if user_data is None:
-        user_data = create_user_record(guild_id, user_id)
-    if pokemon_id not in user_data["pokedex"]:
-        user_data["pokedex"].append(pokemon_id)
+        user_data = await create_user_record(guild_id, user_id)
+    if add_caught(user_data, pokemon_id):
         update_user_record(guild_id, user_id, user_data)
         print(f"[Output] Added Pokémon ID {pokemon_id} to your pokedex.")
 
-def add_active_pokemon(guild_id, user_id, pokemon_obj):
-    user_data = read_user_record(guild_id, user_id)
+async def add_active_pokemon(guild_id, user_id, species, registry):
+    user_data = await load_user_record(guild_id, user_id)
     if user_data is None:
-        user_data = create_user_record(guild_id, user_id)
+        user_data = await create_user_record(guild_id, user_id)
     if len(user_data["active_pokemon"]) < 6:
-        user_data["active_pokemon"].append(pokemon_obj)
-        update_user_power(user_data)
+        user_data["active_pokemon"].append(new_instance(species))
+        update_user_power(user_data, registry)
         update_user_record(guild_id, user_id, user_data)
-        print(f"[Output] Added Pokémon {pokemon_obj.get('name', pokemon_obj.get('id'))} to your {user_id}'s active team.")
+        print(f"[Output] Added Pokémon {species.name} to your {user_id}'s active team.")
     else:
         print(f"[Output] User {user_id} already has 6 active Pokémon.")
 
-def remove_active_pokemon(guild_id, user_id, index):
-    user_data = read_user_record(guild_id, user_id)
+async def remove_active_pokemon(guild_id, user_id, index, registry):
+    user_data = await load_user_record(guild_id, user_id)
     if user_data is None or not user_data["active_pokemon"]:
         print(f"[Output] No active Pokémon to remove.")
         return False
     if 0 <= index < len(user_data["active_pokemon"]):
-        removed = user_data["active_pokemon"].pop(index)
-        update_user_power(user_data)
+        removed = hydrate(registry, user_data["active_pokemon"].pop(index))
+        update_user_power(user_data, registry)
         update_user_record(guild_id, user_id, user_data)
-        print(f"[Output] Removed Pokémon {removed.get('name', removed.get('id'))} from your {user_id}'s active team.")
+        print(f"[Output] Removed Pokémon {removed['name']} from your {user_id}'s active team.")
         return True
     else:
         print(f"[Output] Invalid index {index} for removing active Pokémon for user {user_id}.")
         return False
 
+async def replace_active_pokemon(guild_id, user_id, index, species, registry):
+    """
+    Swap team slot `index` for a new `species`. Returns the replaced Pokémon's name, or None
+    (changing nothing) if the slot is gone or the rest of the team already has that species.
+    """
+    user_data = await load_user_record(guild_id, user_id)
+    team = user_data["active_pokemon"] if user_data else []
+    if not 0 <= index < len(team) or any(species_id_of(p) == species.id for i, p in enumerate(team) if i != index):
+        return None
+    removed = team.pop(index)
+    team.append(new_instance(species))
+    update_user_power(user_data, registry)
+    update_user_record(guild_id, user_id, user_data)
+    return hydrate(registry, removed)["name"]
+
+def add_caught_pokemon(user_data, species, registry):
+    """
+    Record a caught species in user_data (nothing is saved): it always goes into the Pokédex, and
+    onto the active team if it isn't there already and there is room.
+    Returns "success", "duplicate" or "full".
+    """
+    add_caught(user_data, species.id)
+    team = compact_team(user_data)
+    if any(species_id_of(p) == species.id for p in team):
+        return "duplicate"
+    if len(team) >= 6:
+        return "full"
+    team.append(new_instance(species))
+    update_user_power(user_data, registry)
+    return "success"
+
 async def add_pokemon_to_player(bot, guild_id, user_id, pokemon_id, interaction=None):
-    user_data = read_user_record(guild_id, user_id)
+    user_data = await load_user_record(guild_id, user_id)
     if user_data is None:
-        user_data = create_user_record(guild_id, user_id)
+        user_data = await create_user_record(guild_id, user_id)
 
-    pokemon_obj = next((p for p in bot.pokemon if p.get("id") == pokemon_id), None)
-    if not pokemon_obj:
+    species = bot.registry.get_species(pokemon_id)
+    if not species:
         return "not_found"
 
-    if pokemon_id not in user_data["pokedex"]:
-        user_data["pokedex"].append(pokemon_id)
+    result = add_caught_pokemon(user_data, species, bot.registry)
+    update_user_record(guild_id, user_id, user_data)
+    if result == "success":
+        print(f"[Output] Added Pokémon {species.name} to user {user_id}'s active team.")
+    if result != "full":
+        return result
 
-    if any(p.get("id") == pokemon_id for p in user_data["active_pokemon"]):
-        return "duplicate"
+    if interaction is not None:
+        return await prompt_team_replacement(bot, guild_id, user_id, user_data, species, interaction)
+    print(f"[Output] User {user_id} already has 6 active Pokémon. No interaction provided for replacement.")
+    return "full"
 
-    if len(user_data["active_pokemon"]) < 6:
-        user_data["active_pokemon"].append(pokemon_obj)
-        update_user_power(user_data)
-        update_user_record(guild_id, user_id, user_data)
-        print(f"[Output] Added Pokémon {pokemon_obj.get('name', pokemon_obj.get('id'))} to user {user_id}'s active team.")
-        return "success"
+async def prompt_team_replacement(bot, guild_id, user_id, user_data, species, interaction):
+    """
+    Ask a trainer with a full team which Pokémon to swap for `species`. Uses a followup when the
+    interaction has already been answered. Returns "success", "duplicate", "cancel" or "timeout".
+    """
+    class ReplacePokemonView(discord.ui.View):
+        def __init__(self, active_pokemon):
+            super().__init__(timeout=180)
+            for idx, poke in enumerate(active_pokemon):
+                label = f"{poke.get('name', str(poke.get('id', '?')))} (CP: {poke.get('cp', '?')})"
+                self.add_item(discord.ui.Button(label=f"{idx+1}: {label}", style=discord.ButtonStyle.primary, custom_id=str(idx)))
 
-    if interaction is not None:
-        class ReplacePokemonView(discord.ui.View):
-            def __init__(self, active_pokemon):
-                super().__init__(timeout=180)
-                for idx, poke in enumerate(active_pokemon):
-                    label = f"{poke.get('name', str(poke.get('id', '?')))} (CP: {poke.get('cp', '?')})"
-                    self.add_item(discord.ui.Button(label=f"{idx+1}: {label}", style=discord.ButtonStyle.primary, custom_id=str(idx)))
-
-            @discord.ui.button(label="Cancel", style=discord.ButtonStyle.danger, custom_id="cancel")
-            async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
-                await interaction.response.send_message("Cancelled replacement.", ephemeral=True)
-                self.stop()
-
-        active_pokemon = user_data["active_pokemon"]
-        description = "\n".join([
-            f"{idx+1}: {poke.get('name', poke.get('id'))} (CP: {poke.get('cp', '?')})"
-            for idx, poke in enumerate(active_pokemon)
-        ])
-        embed = discord.Embed(
-            title="Active Pokémon Full",
-            description=f"You already have 6 active Pokémon:\n{description}\n\nSelect one to replace.",
-            color=discord.Color.orange()
-        )
-        view = ReplacePokemonView(active_pokemon)
+        @discord.ui.button(label="Cancel", style=discord.ButtonStyle.danger, custom_id="cancel")
+        async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+            await interaction.response.send_message("Cancelled replacement.", ephemeral=True)
+            self.stop()
+
+    active_pokemon = hydrate_team(bot.registry, user_data["active_pokemon"])
+    description = "\n".join([
+        f"{idx+1}: {poke.get('name', poke.get('id'))} (CP: {poke.get('cp', '?')})"
+        for idx, poke in enumerate(active_pokemon)
+    ])
+    embed = discord.Embed(
+        title="Active Pokémon Full",
+        description=f"You already have 6 active Pokémon:\n{description}\n\nSelect one to replace.",
+        color=discord.Color.orange()
+    )
+    view = ReplacePokemonView(active_pokemon)
+    if interaction.response.is_done():
+        original_msg = await interaction.followup.send(embed=embed, view=view, ephemeral=True, wait=True)
+    else:
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
-        # Wait for button click
         original_msg = await interaction.original_response()
-        def check(i):
-            return i.user.id == user_id and i.message.id == original_msg.id
-        try:
-            button_interaction = await bot.wait_for("interaction", check=check, timeout=60)
-            if button_interaction.data["custom_id"] == "cancel":
-                return "cancel"
-            idx = int(button_interaction.data["custom_id"])
-            removed = user_data["active_pokemon"].pop(idx)
-            # Prevent adding duplicate after replacement
-            if any(p.get("id") == pokemon_id for p in user_data["active_pokemon"]):
-                await button_interaction.response.send_message(
-                    f"You already have {pokemon_obj.get('name', pokemon_obj.get('id'))} in your active team!", ephemeral=True
-                )
-                # Put the removed Pokémon back
-                user_data["active_pokemon"].insert(idx, removed)
-                return "duplicate"
-            user_data["active_pokemon"].append(pokemon_obj)
-            update_user_power(user_data)
-            update_user_record(guild_id, user_id, user_data)
+    # Wait for button click
+    def check(i):
+        return i.user.id == user_id and i.message.id == original_msg.id
+    try:
+        button_interaction = await bot.wait_for("interaction", check=check, timeout=60)
+        if button_interaction.data["custom_id"] == "cancel":
+            return "cancel"
+        idx = int(button_interaction.data["custom_id"])
+        # The swap runs on the guild's actor against the current record, not the one shown a minute ago
+        removed_name = await GUILD_ACTORS.run(guild_id, replace_active_pokemon, guild_id, user_id, idx, species, bot.registry)
+        if removed_name is None:
             await button_interaction.response.send_message(
-                f"Replaced {removed.get('name', removed.get('id'))} with {pokemon_obj.get('name', pokemon_obj.get('id'))} in your active team.",
-                ephemeral=True
+                f"You already have {species.name} in your active team!", ephemeral=True
             )
-            print(f"[Output] Replaced Pokémon for user {user_id}: {removed.get('name', removed.get('id'))} -> {pokemon_obj.get('name', pokemon_obj.get('id'))}")
-            return "success"
-        except Exception as e:
-            print(f"[ERROR] Replacement selection failed: {e}")
-            await interaction.followup.send("No selection made. Pokémon not added.", ephemeral=True)
-            return "timeout"
-    else:
-        print(f"[Output] User {user_id} already has 6 active Pokémon. No interaction provided for replacement.")
-        return "full"
+            return "duplicate"
+        await button_interaction.response.send_message(
+            f"Replaced {removed_name} with {species.name} in your active team.",
+            ephemeral=True
+        )
+        print(f"[Output] Replaced Pokémon for user {user_id}: {removed_name} -> {species.name}")
+        return "success"
+    except Exception as e:
+        print(f"[ERROR] Replacement selection failed: {e}")
+        await interaction.followup.send("No selection made. Pokémon not added.", ephemeral=True)
+        return "timeout"
 
-def add_pokemon_to_player_no_interaction(bot, guild_id, user_id, pokemon_id):
-    user_data = read_user_record(guild_id, user_id)
+async def add_pokemon_to_player_no_interaction(bot, guild_id, user_id, pokemon_id):
+    user_data = await load_user_record(guild_id, user_id)
     if user_data is None:
-        user_data = create_user_record(guild_id, user_id)
+        user_data = await create_user_record(guild_id, user_id)
 
-    pokemon_obj = next((p for p in bot.pokemon if p.get("id") == pokemon_id), None)
-    if not pokemon_obj:
+    species = bot.registry.get_species(pokemon_id)
+    if not species:
         return "not_found"
+    pokemon_obj = new_instance(species)
 
-    if pokemon_id not in user_data["pokedex"]:
-        user_data["pokedex"].append(pokemon_id)
+    if add_caught(user_data, pokemon_id):
+        # user_data is the cached record, so a new Pokédex entry must be saved even if the team doesn't change
+        update_user_record(guild_id, user_id, user_data)
 
-    if any(p.get("id") == pokemon_id for p in user_data["active_pokemon"]):
+    if any(species_id_of(p) == pokemon_id for p in user_data["active_pokemon"]):
         return "duplicate"
 
     if len(user_data["active_pokemon"]) < 6:
         user_data["active_pokemon"].append(pokemon_obj)
-        update_user_power(user_data)
+        update_user_power(user_data, bot.registry)
         update_user_record(guild_id, user_id, user_data)
-        print(f"[Output] Added Pokémon {pokemon_obj.get('name', pokemon_obj.get('id'))} to user {user_id}'s active team.")
+        print(f"[Output] Added Pokémon {species.name} to user {user_id}'s active team.")
         return "success"
     else:
         print(f"[Prompt] User {user_id} already has 6 active Pokémon:")
-        for idx, poke in enumerate(user_data["active_pokemon"]):
+        for idx, poke in enumerate(hydrate_team(bot.registry, user_data["active_pokemon"])):
             print(f"{idx+1}: {poke.get('name', poke.get('id'))} (CP: {poke.get('cp', '?')})")
         try:
             idx = int(input(f"Enter the number (1-6) of the Pokémon to replace for user {user_id}, or 0 to cancel: ")) - 1
@@ -194,26 +256,22 @@ def add_pokemon_to_player_no_interaction(bot, guild_id, user_id, pokemon_id):
                 print("[Prompt] Replacement cancelled or invalid.")
                 return "full"
             removed = user_data["active_pokemon"].pop(idx)
-            if any(p.get("id") == pokemon_id for p in user_data["active_pokemon"]):
-                print(f"[Prompt] You already have {pokemon_obj.get('name', pokemon_obj.get('id'))} in your active team!")
+            removed_name = hydrate(bot.registry, removed)["name"]
+            if any(species_id_of(p) == pokemon_id for p in user_data["active_pokemon"]):
+                print(f"[Prompt] You already have {species.name} in your active team!")
                 user_data["active_pokemon"].insert(idx, removed)
                 return "duplicate"
             user_data["active_pokemon"].append(pokemon_obj)
-            update_user_power(user_data)
+            update_user_power(user_data, bot.registry)
             update_user_record(guild_id, user_id, user_data)
-            print(f"[Output] Replaced Pokémon for user {user_id}: {removed.get('name', removed.get('id'))} -> {pokemon_obj.get('name', pokemon_obj.get('id'))}")
+            print(f"[Output] Replaced Pokémon for user {user_id}: {removed_name} -> {species.name}")
             return "success"
         except Exception as e:
             print(f"[ERROR] Replacement selection failed: {e}")
             return "timeout"
 
-def update_user_power(user_data):
+def update_user_power(user_data, registry):
     """
-    Updates the user's 'power' field based on the average CP of their active Pokémon.
+    Updates the user's 'power' field based on the average CP of their active Pokémon's species.
     """
-    active_pokemon = user_data.get("active_pokemon", [])
-    if not active_pokemon:
-        user_data["power"] = 0
-    else:
-        total_cp = sum(poke.get("cp", 0) for poke in active_pokemon)
-        user_data["power"] = int(total_cp / len(active_pokemon))
\ No newline at end of file
+    user_data["power"] = team_power(registry, user_data.get("active_pokemon", []))
\ No newline at end of file
@@ -27,17 +27,30 @@ async def prompt_for_pokeball(interaction, available_balls):
     Also deletes the selector message after selection or timeout.
     """
     select_view = PokeballSelectView(available_balls)
-    await interaction.response.send_message(
-        "Which Poké Ball would you like to use?",
-        view=select_view,
-        ephemeral=True
-    )
+    prompt = None
+    if interaction.response.is_done():
+        # Already answered (e.g. the trainer waited in the claim queue): ask in a followup
+        prompt = await interaction.followup.send(
+            "Which Poké Ball would you like to use?",
+            view=select_view,
+            ephemeral=True,
+            wait=True
+        )
+    else:
+        await interaction.response.send_message(
+            "Which Poké Ball would you like to use?",
+            view=select_view,
+            ephemeral=True
+        )
     await select_view.wait()
     selected_ball_id = select_view.selected_ball_id
 
     # Remove the Poké Ball selector message immediately after a selection or timeout
     try:
-        await interaction.delete_original_response()
+        if prompt is not None:
+            await prompt.delete()
+        else:
+            await interaction.delete_original_response()
     except Exception:
         pass
 
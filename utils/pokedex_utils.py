@@ -0,0 +1,77 @@
+# A trainer's Pokédex is a bitset: bit n is set once species #n has been caught. It is stored in
+# the player record as a hex string (e.g. "2000002" for #1 and #25); older records hold a list of ids.
+
+def species_mask(species_ids):
+    mask = 0
+    for species_id in species_ids:
+        mask |= 1 << species_id
+    return mask
+
+def mask_ids(mask):
+    """Species ids in a mask, ascending."""
+    ids = []
+    while mask:
+        low = mask & -mask
+        ids.append(low.bit_length() - 1)
+        mask ^= low
+    return ids
+
+def count(mask):
+    return bin(mask).count("1")
+
+def encode(mask):
+    return format(mask, "x")
+
+def decode(value):
+    """Mask from a stored Pokédex: a hex string, or the legacy list of ids."""
+    if isinstance(value, str):
+        return int(value or "0", 16)
+    return species_mask(value or ())
+
+def pokedex_mask(user_data):
+    """The trainer's caught-species mask. A legacy id list is converted in place (losslessly)."""
+    value = user_data.get("pokedex")
+    mask = decode(value)
+    if not isinstance(value, str):
+        user_data["pokedex"] = encode(mask)
+    return mask
+
+def pokedex_count(user_data):
+    return count(decode(user_data.get("pokedex")))
+
+def has_caught(user_data, species_id):
+    return bool(pokedex_mask(user_data) >> species_id & 1)
+
+def add_caught(user_data, species_id):
+    """Mark a species as caught. Returns True if it is new to the Pokédex."""
+    mask = pokedex_mask(user_data)
+    bit = 1 << species_id
+    if mask & bit:
+        return False
+    user_data["pokedex"] = encode(mask | bit)
+    return True
+
+def migrate_json_pokedexes(servers_dir=None):
+    """Rewrite every list-based Pokédex in the JSON servers/ tree as a bitset, checking each one round-trips."""
+    from utils.store_utils import JsonBackend, SERVERS_DIR
+    backend = JsonBackend(servers_dir or SERVERS_DIR)
+    migrated = 0
+    for guild_id in backend.guild_ids():
+        players = []
+        for user_id in backend.user_ids(guild_id):
+            data = backend.read_player(guild_id, user_id)
+            if data is None or isinstance(data.get("pokedex"), str):
+                continue
+            caught = sorted(set(data.get("pokedex") or ()))
+            pokedex_mask(data)
+            if mask_ids(decode(data["pokedex"])) != caught:
+                raise ValueError(f"Pokédex of {user_id} in guild {guild_id} did not round-trip")
+            players.append((guild_id, user_id, backend.snapshot_player(guild_id, user_id, data)))
+        backend.write_batch([], players)
+        migrated += len(players)
+    print(f"[Pokedex] Migrated {migrated} Pokédex list(s) to bitsets")
+    return migrated
+
+if __name__ == "__main__":
+    # python -m utils.pokedex_utils -> convert stored lists up front (otherwise each converts on its next save)
+    migrate_json_pokedexes()
@@ -0,0 +1,26 @@
+import time
+from utils.store_utils import GUILD_STORE, run_io
+
+# Elo ratings for battles
+DEFAULT_RATING = 1200
+RATING_K = 32  # most a single battle can move a rating
+
+def expected_score(rating, opponent_rating):
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+def rate(rating1, rating2, score1, k=RATING_K):
+    """New ratings after one battle; score1 is 1 if player 1 won, 0.5 for a tie, 0 if they lost."""
+    change = k * (score1 - expected_score(rating1, rating2))
+    return round(rating1 + change), round(rating2 - change)
+
+def match_row(user1_id, user2_id, winner_id, rounds, forfeit, ratings, ended_at=None):
+    """One match-history entry, in the column order of the matches table."""
+    ended_at = int(time.time() if ended_at is None else ended_at)
+    return (ended_at, int(user1_id), int(user2_id), int(winner_id or 0), int(forfeit), rounds[0], rounds[1], ratings[0], ratings[1])
+
+async def append_match(guild_id, row):
+    """Append a finished battle to the guild's match history. History is never rewritten."""
+    try:
+        await run_io(GUILD_STORE.backend.append_matches, [(str(guild_id), row)])
+    except Exception as e:
+        print(f"[Rating] Failed to record match in guild {guild_id}: {e}")
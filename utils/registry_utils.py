@@ -0,0 +1,152 @@
+import json
+import os
+from utils.pokedex_utils import species_mask
+
+DATASTORES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "datastores")
+
+class _Record:
+    """Immutable, slot-based view of one datastore entry. Fields are listed in __slots__."""
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} records are read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} records are read-only")
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__[:2])
+        return f"{type(self).__name__}({fields})"
+
+class Species(_Record):
+    __slots__ = ("id", "name", "types", "cp", "hp", "attack", "defense", "rarity", "abilities", "lore")
+
+    @classmethod
+    def from_json(cls, entry):
+        return cls(
+            id=entry["id"],
+            name=entry.get("name", "Unknown"),
+            types=tuple(entry.get("type", [])),
+            cp=entry.get("cp", 100),
+            hp=entry.get("hp", 0),
+            attack=entry.get("attack", 0),
+            defense=entry.get("defense", 0),
+            rarity=entry.get("rarity", "Common"),
+            abilities=tuple(entry.get("special_abilities", [])),
+            lore=entry.get("lore", ""),
+        )
+
+    def to_dict(self):
+        """A fresh dict in pokemon.json's shape, safe to store in a player record."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "type": list(self.types),
+            "cp": self.cp,
+            "hp": self.hp,
+            "attack": self.attack,
+            "defense": self.defense,
+            "rarity": self.rarity,
+            "special_abilities": list(self.abilities),
+            "lore": self.lore,
+        }
+
+class Item(_Record):
+    __slots__ = ("id", "name", "cost", "description")
+
+    @classmethod
+    def from_json(cls, entry):
+        return cls(id=entry["id"], name=entry["name"], cost=entry.get("cost", 0), description=entry.get("description", ""))
+
+    @classmethod
+    def unknown(cls, item_id):
+        return cls(id=item_id, name=f"Item #{item_id}", cost=0, description="No description.")
+
+class Ability(_Record):
+    __slots__ = ("name", "description", "attack_bonus", "defense_bonus")
+
+    @classmethod
+    def from_json(cls, entry):
+        return cls(
+            name=entry["name"],
+            description=entry.get("description", ""),
+            attack_bonus=entry.get("attack_bonus", 0),
+            defense_bonus=entry.get("defense_bonus", 0),
+        )
+
+class Badge(_Record):
+    __slots__ = ("name", "meaning")
+
+    @classmethod
+    def from_json(cls, entry):
+        return cls(name=entry["name"], meaning=entry.get("meaning", ""))
+
+def _group(records, key):
+    groups = {}
+    for record in records:
+        for value in key(record):
+            groups.setdefault(value.lower(), []).append(record)
+    return {value: tuple(members) for value, members in groups.items()}
+
+class Registry:
+    """
+    Static game data, built once at startup. Every lookup is a dict hit instead of a
+    scan over the raw JSON lists. Names, rarities and types are indexed lowercase.
+    """
+    def __init__(self, pokemon, items, abilities, badges):
+        self.species = tuple(sorted((Species.from_json(p) for p in pokemon), key=lambda s: s.id))
+        self.items = tuple(Item.from_json(i) for i in items)
+        self.abilities = tuple(Ability.from_json(a) for a in abilities)
+        self.badges = tuple(Badge.from_json(b) for b in badges)
+
+        self.species_by_id = {s.id: s for s in self.species}
+        self.species_by_name = {s.name.lower(): s for s in self.species}
+        self.species_by_rarity = _group(self.species, lambda s: (s.rarity,))
+        self.species_by_type = _group(self.species, lambda s: s.types)
+        self.items_by_id = {i.id: i for i in self.items}
+        self.items_by_name = {i.name.lower(): i for i in self.items}
+        self.abilities_by_name = {a.name.lower(): a for a in self.abilities}
+        self.badges_by_name = {b.name.lower(): b for b in self.badges}
+        # Pokédex bitset masks (see pokedex_utils): every species, and each rarity and type
+        self.all_species_mask = species_mask(s.id for s in self.species)
+        self.mask_by_rarity = {rarity: species_mask(s.id for s in group) for rarity, group in self.species_by_rarity.items()}
+        self.mask_by_type = {type_name: species_mask(s.id for s in group) for type_name, group in self.species_by_type.items()}
+
+    @classmethod
+    def load(cls, datastores_dir=DATASTORES_DIR):
+        def read(name):
+            with open(os.path.join(datastores_dir, name), "r", encoding="utf-8") as f:
+                return json.load(f)
+        return cls(read("pokemon.json"), read("items.json"), read("abilities.json"), read("badges.json"))
+
+    def get_species(self, species_id):
+        return self.species_by_id.get(species_id)
+
+    def find_species(self, name):
+        return self.species_by_name.get(name.strip().lower())
+
+    def species_of_rarity(self, rarity):
+        return self.species_by_rarity.get(rarity.lower(), ())
+
+    def species_of_type(self, type_name):
+        return self.species_by_type.get(type_name.lower(), ())
+
+    def rarity_mask(self, rarity):
+        return self.mask_by_rarity.get(rarity.lower(), 0)
+
+    def type_mask(self, type_name):
+        return self.mask_by_type.get(type_name.lower(), 0)
+
+    def get_item(self, item_id):
+        """The item with this id, or a placeholder so display code never has to check."""
+        return self.items_by_id.get(item_id) or Item.unknown(item_id)
+
+    def get_ability(self, name):
+        return self.abilities_by_name.get(name.lower())
+
+    def get_badge(self, name):
+        return self.badges_by_name.get(name.lower())
@@ -0,0 +1,55 @@
+from collections import OrderedDict
+
+RENDER_CACHE_SIZE = 2048  # rendered views kept in memory
+
+def record_version(user_data):
+    """Bumped by every PLAYER_STORE write, so it changes whenever a rendered view could."""
+    return (user_data or {}).get("version", 0)
+
+class RenderCache:
+    """
+    LRU of rendered views (embeds, message text) keyed by
+    (guild_id, user_id, view, page, record version). A write to the record changes its
+    version, so stale renders are never hit again and simply age out.
+    """
+    def __init__(self, max_entries=RENDER_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_render(self, guild_id, user_id, view, page, version, render):
+        """The cached render for this key, or render() stored under it. Cached values must not be mutated."""
+        key = (str(guild_id), str(user_id), view, page, version)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        return self._store(key, render())
+
+    def prefetch(self, guild_id, user_id, view, page, version, render):
+        """Render ahead without counting a miss (a later request for it counts as a hit)."""
+        key = (str(guild_id), str(user_id), view, page, version)
+        if key not in self._entries:
+            self._store(key, render())
+
+    def _store(self, key, value):
+        self._entries[key] = value
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+RENDER_CACHE = RenderCache()
@@ -1,11 +1,9 @@
 import os
-import json
 import time
 import discord
 import asyncio
-
-# Store server data in the 'servers' folder at the project root
-SERVERS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "servers")
+from utils.store_utils import GUILD_STORE, SERVERS_DIR
+from utils.spawn_claim_utils import SPAWN_CLAIMS
 
 def ensure_servers_folder():
     """Create the servers folder if it doesn't exist."""
@@ -18,57 +16,79 @@ def ensure_servers_folder():
 # Ensure servers folder exists when this util loads
 ensure_servers_folder()
 
-def log_active_spawn(guild_id, pokemon_id, status="active", trainer=None, message_id=None):
-    servers_dir = os.path.join(os.getcwd(), "servers")
-    data_file = os.path.join(servers_dir, str(guild_id), "data.json")
-    if not os.path.isfile(data_file):
+# A guild's live spawns are kept in data["spawns"], keyed by the spawn message's id (as a string).
+# A spawn leaves the table once it is caught or runs away; data["last_spawn_time"] remembers the
+# latest one for the spawn scheduler. Older records hold a single "active_spawn" slot instead.
+
+def guild_spawns(data):
+    """The guild's live spawn table. A legacy active_spawn slot is moved into it in place."""
+    spawns = data.setdefault("spawns", {})
+    if "active_spawn" in data:
+        legacy = data.pop("active_spawn") or {}
+        if legacy.get("spawn_time"):
+            data.setdefault("last_spawn_time", legacy["spawn_time"])
+        if legacy.get("status") == "active" and legacy.get("message_id"):
+            spawns[str(legacy["message_id"])] = legacy
+    return spawns
+
+def get_spawn(data, message_id):
+    """The live spawn posted as this message, or None."""
+    return guild_spawns(data).get(str(message_id)) if data else None
+
+async def log_active_spawn(guild_id, pokemon_id, message_id, status="active", trainer=None):
+    data = await load_server_data(guild_id)
+    if data is None:
         print(f"[WARN] No data.json found for guild {guild_id} to log spawn.")
         return
-    with open(data_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
     spawn_entry = {
         "id": pokemon_id,
         "spawn_time": int(time.time()),
         "status": status,
-        "trainer": trainer
+        "trainer": trainer,
+        "message_id": message_id
     }
-    if message_id is not None:
-        spawn_entry["message_id"] = message_id
-    data["active_spawn"] = spawn_entry
-    with open(data_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    guild_spawns(data)[str(message_id)] = spawn_entry
+    data["last_spawn_time"] = spawn_entry["spawn_time"]
+    GUILD_STORE.put(guild_id, data)
+    SPAWN_CLAIMS.open(guild_id, message_id, pokemon_id, data.get("settings"))
     print(f"[Output] Logged active spawn for guild {guild_id}: {spawn_entry}")
 
-def update_active_spawn_status(guild_id, pokemon_id, status, trainer):
-    servers_dir = os.path.join(os.getcwd(), "servers")
-    data_file = os.path.join(servers_dir, str(guild_id), "data.json")
-    if not os.path.isfile(data_file):
-        return
-
-    with open(data_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    updated = False
-    spawn = data.get("active_spawn")
-    if spawn and spawn["id"] == pokemon_id and spawn["status"] == "active":
-        spawn["status"] = status
-        spawn["trainer"] = trainer
-        spawn["spawn_time"] = int(time.time())  # Update spawn_time to now
-        data["active_spawn"] = spawn
-        updated = True
+def settle_spawn(data, message_id, status, trainer):
+    """Take a live spawn out of the table as caught or escaped. Returns it, or None if it was already gone."""
+    spawn = guild_spawns(data).pop(str(message_id), None)
+    if spawn is None:
+        return None
+    spawn["status"] = status
+    spawn["trainer"] = trainer
+    spawn["spawn_time"] = int(time.time())
+    return spawn
 
-    if updated:
-        with open(data_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-        print(f"[Output] Updated spawn {pokemon_id} to status '{status}' for guild {guild_id} (trainer: {trainer})")
+async def update_active_spawn_status(guild_id, message_id, status, trainer):
+    data = await load_server_data(guild_id)
+    if data is None:
+        return
+    spawn = settle_spawn(data, message_id, status, trainer)
+    if spawn:
+        GUILD_STORE.put(guild_id, data)
+        SPAWN_CLAIMS.close(guild_id, message_id)
+        print(f"[Output] Updated spawn {spawn['id']} (message {message_id}) to status '{status}' for guild {guild_id} (trainer: {trainer})")
 
+async def retire_oldest_spawns(guild_id, limit):
+    """Let the oldest live spawns escape until at most `limit` are left. Returns their message ids."""
+    data = await load_server_data(guild_id)
+    if data is None:
+        return []
+    spawns = guild_spawns(data)
+    retired = list(spawns)[:max(0, len(spawns) - limit)]
+    for message_id in retired:
+        await update_active_spawn_status(guild_id, message_id, "escaped", "System")
+    return [int(message_id) for message_id in retired]
 
 def setup_server_savedata(guild_id):
     os.makedirs(SERVERS_DIR, exist_ok=True)
     guild_folder = os.path.join(SERVERS_DIR, str(guild_id))
     os.makedirs(guild_folder, exist_ok=True)
-    data_file = os.path.join(guild_folder, "data.json")
-    if not os.path.exists(data_file):
+    if not GUILD_STORE.exists(guild_id):
         generate_server_data(guild_id)
         print(f"[Output] Created server data for guild {guild_id}")
     else:
@@ -84,38 +104,34 @@ def generate_server_data(guild_id):
         "created": True,
         "settings": {}, 
         "channels": {},
-        "active_spawn": {},
-        "active_battles": []
+        "spawns": {}
         }
-    with open(data_file, "w", encoding="utf-8") as f:
-        json.dump(default_data, f, indent=2)
+    GUILD_STORE.put(guild_id, default_data)
     print(f"[Output] Generated new data.json for guild {guild_id}")
     return data_file
 
 def read_server_data(guild_id):
-    data_file = os.path.join(SERVERS_DIR, str(guild_id), "data.json")
-    if not os.path.exists(data_file):
+    data = GUILD_STORE.get(guild_id)
+    if data is None:
         print(f"[Output] No data.json found for guild {guild_id}")
-        return None
-    with open(data_file, "r", encoding="utf-8") as f:
-        print(f"[Output] Read data.json for guild {guild_id}")
-        return json.load(f)
+    return data
+
+async def load_server_data(guild_id):
+    """Async read_server_data for coroutines: a cache miss is read off the event loop."""
+    return await GUILD_STORE.aget(guild_id)
 
 def update_server_data(guild_id, data):
-    data_file = os.path.join(SERVERS_DIR, str(guild_id), "data.json")
-    with open(data_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    GUILD_STORE.put(guild_id, data)
     print(f"[Output] Updated data.json for guild {guild_id}")
 
 def delete_server_data(guild_id):
-    data_file = os.path.join(SERVERS_DIR, str(guild_id), "data.json")
-    if os.path.exists(data_file):
-        os.remove(data_file)
+    if GUILD_STORE.delete(guild_id):
         print(f"[Output] Deleted data.json for guild {guild_id}")
     else:
         print(f"[Output] No data.json to delete for guild {guild_id}")
 
 async def generate_pokemon_channels(guild):
+    await load_server_data(guild.id)
     setup_server_savedata(guild.id)
     data = read_server_data(guild.id) or {}
 
@@ -210,6 +226,7 @@ async def send_battle_guide_embed(channel):
     await channel.send(embed=battle_guide_embed)
 
 async def setup_guide_channel(guild):
+    await load_server_data(guild.id)
     setup_server_savedata(guild.id)
     data = read_server_data(guild.id) or {}
 
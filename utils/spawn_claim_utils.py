@@ -0,0 +1,263 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+
+# Who gets to throw at a spawn. Claims live only in memory and are decided on the event loop:
+# every check-and-set below runs without an await in between, so it is a compare-and-set.
+FIRST_CLICK = "first"     # the first clicker throws; everyone else is turned away until they let go
+ATTEMPT_WINDOW = "window" # clickers within claim_window seconds of the first click queue up for a turn
+CLAIM_POLICIES = (FIRST_CLICK, ATTEMPT_WINDOW)
+DEFAULT_CLAIM_WINDOW = 5   # seconds after the first click during which others may join the queue
+DEFAULT_CLAIM_QUEUE = 5    # trainers queued behind the one throwing
+CLAIM_LEASE = 45           # seconds a claim is held before it passes on (the ball prompt times out at 30)
+CLOSED_CLAIMS_KEPT = 4096  # closed spawns remembered so late clicks are turned away without a lookup
+
+# Claim outcomes
+GRANTED = "granted"  # this trainer throws now
+QUEUED = "queued"    # wait_turn() resolves to GRANTED or CLOSED
+TAKEN = "taken"      # someone else is throwing and there is no room to wait
+CLOSED = "closed"    # the spawn was caught or ran away
+
+def claim_policy(settings):
+    """A guild's claim policy: settings["claim_policy"] if valid, else first click wins."""
+    policy = (settings or {}).get("claim_policy", FIRST_CLICK)
+    return policy if policy in CLAIM_POLICIES else FIRST_CLICK
+
+def claim_window(settings):
+    return max(0.0, float((settings or {}).get("claim_window", DEFAULT_CLAIM_WINDOW)))
+
+def claim_queue_size(settings):
+    return max(0, int((settings or {}).get("claim_queue", DEFAULT_CLAIM_QUEUE)))
+
+class SpawnClaim:
+    """Claim state of one spawn: who holds it, until when, and who is waiting."""
+    __slots__ = ("pokemon_id", "policy", "window", "queue_size", "first_click", "holder", "lease_until", "queue", "timer", "closed")
+
+    def __init__(self, pokemon_id, policy=FIRST_CLICK, window=DEFAULT_CLAIM_WINDOW, queue_size=DEFAULT_CLAIM_QUEUE):
+        self.pokemon_id = pokemon_id
+        self.policy = policy
+        self.window = window
+        self.queue_size = queue_size
+        self.first_click = None
+        self.holder = None
+        self.lease_until = 0.0
+        self.queue = deque()  # (user_id, future)
+        self.timer = None
+        self.closed = False
+
+class SpawnClaims:
+    """
+    Every open spawn's claim, keyed by (guild, spawn message). A losing click is answered from here
+    alone, without loading any record. The spawn record stays the source of truth:
+    Capture.resolve() still re-checks it, so a claim only decides who may try.
+    """
+    def __init__(self, clock=time.monotonic, lease=CLAIM_LEASE, remember_closed=CLOSED_CLAIMS_KEPT):
+        self.clock = clock
+        self.lease = lease
+        self.remember_closed = remember_closed
+        self._claims = {}
+        self._closed = OrderedDict()  # recently closed keys, oldest first
+
+    def __len__(self):
+        return len(self._claims)
+
+    @staticmethod
+    def _key(guild_id, message_id):
+        return (str(guild_id), int(message_id))
+
+    def open(self, guild_id, message_id, pokemon_id, settings=None):
+        """A new spawn posted as message_id."""
+        key = self._key(guild_id, message_id)
+        self._closed.pop(key, None)
+        claim = SpawnClaim(pokemon_id, claim_policy(settings), claim_window(settings), claim_queue_size(settings))
+        self._claims[key] = claim
+        return claim
+
+    def close(self, guild_id, message_id):
+        """
+        The spawn was caught or left: waiters are told. Its key is remembered for a while, so late
+        clicks are still turned away from memory.
+        """
+        key = self._key(guild_id, message_id)
+        claim = self._claims.pop(key, None)
+        self._closed[key] = True
+        self._closed.move_to_end(key)
+        while len(self._closed) > self.remember_closed:
+            self._closed.popitem(last=False)
+        if claim is None or claim.closed:
+            return
+        claim.closed = True
+        claim.holder = None
+        self._cancel_timer(claim)
+        while claim.queue:
+            _, waiter = claim.queue.popleft()
+            if not waiter.done():
+                waiter.set_result(CLOSED)
+
+    def drop_guild(self, guild_id):
+        guild_key = str(guild_id)
+        for key in [key for key in self._claims if key[0] == guild_key]:
+            self.close(*key)
+        for key in [key for key in self._closed if key[0] == guild_key]:
+            del self._closed[key]
+
+    def try_claim(self, guild_id, message_id, pokemon_id, user_id):
+        """Claim the spawn for a click. Returns GRANTED, QUEUED, TAKEN or CLOSED; never waits."""
+        key = self._key(guild_id, message_id)
+        if key in self._closed:
+            return CLOSED
+        claim = self._claims.get(key)
+        if claim is None:
+            # A spawn posted before a restart has no claim yet; it gets the default policy
+            claim = self.open(guild_id, message_id, pokemon_id)
+        if claim.pokemon_id != pokemon_id:
+            return CLOSED
+        now = self.clock()
+        if claim.holder is not None and now >= claim.lease_until:
+            self._pass_on(key, claim)
+        if claim.holder is None and not claim.queue:
+            if claim.first_click is None:
+                claim.first_click = now
+            self._grant(key, claim, user_id, now)
+            return GRANTED
+        if claim.holder == user_id or any(waiting == user_id for waiting, _ in claim.queue):
+            return TAKEN
+        if (claim.policy == ATTEMPT_WINDOW and now - claim.first_click <= claim.window
+                and len(claim.queue) < claim.queue_size):
+            claim.queue.append((user_id, asyncio.get_running_loop().create_future()))
+            return QUEUED
+        return TAKEN
+
+    async def wait_turn(self, guild_id, message_id, user_id):
+        """For a QUEUED click: waits until it is this trainer's turn (GRANTED) or the spawn is gone (CLOSED)."""
+        claim = self._claims.get(self._key(guild_id, message_id))
+        waiter = next((w for waiting, w in claim.queue if waiting == user_id), None) if claim else None
+        if waiter is None:
+            return CLOSED
+        return await waiter
+
+    def queue_position(self, guild_id, message_id, user_id):
+        claim = self._claims.get(self._key(guild_id, message_id))
+        if claim:
+            for position, (waiting, _) in enumerate(claim.queue, 1):
+                if waiting == user_id:
+                    return position
+        return 0
+
+    def release(self, guild_id, message_id, user_id):
+        """The holder is done without settling the spawn (no balls, no choice): the next in line gets it."""
+        key = self._key(guild_id, message_id)
+        claim = self._claims.get(key)
+        if claim and not claim.closed and claim.holder == user_id:
+            self._pass_on(key, claim)
+
+    def _grant(self, key, claim, user_id, now):
+        claim.holder = user_id
+        claim.lease_until = now + self.lease
+        self._cancel_timer(claim)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no loop (scripts): expiry is still noticed by the next try_claim
+        # So a holder that never lets go doesn't strand the queue
+        claim.timer = loop.call_later(self.lease, self._expire, key, claim, user_id)
+
+    def _pass_on(self, key, claim):
+        claim.holder = None
+        self._cancel_timer(claim)
+        while claim.queue:
+            user_id, waiter = claim.queue.popleft()
+            if not waiter.done():
+                self._grant(key, claim, user_id, self.clock())
+                waiter.set_result(GRANTED)
+                return
+
+    def _expire(self, key, claim, user_id):
+        claim.timer = None
+        if self._claims.get(key) is claim and claim.holder == user_id:
+            self._pass_on(key, claim)
+
+    def _cancel_timer(self, claim):
+        if claim.timer is not None:
+            claim.timer.cancel()
+            claim.timer = None
+
+SPAWN_CLAIMS = SpawnClaims()
+
+def _percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000
+    return {"n": len(ordered), "p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": ordered[-1] * 1000}
+
+async def _bench_claims(clickers, policy, throw_time, give_up_every):
+    """
+    A burst of `clickers` simultaneous clicks on one spawn. Each holder takes throw_time seconds;
+    only every give_up_every-th one throws (settling the spawn), the others let go (no balls).
+    Returns latency percentiles to a claim decision, and the number of trainers who got to throw.
+    """
+    claims = SpawnClaims()
+    claims.open(1, 1000, 25, {"claim_policy": policy, "claim_window": 1.0, "claim_queue": clickers})
+    start = asyncio.Event()
+    decided, turns = [], []
+
+    async def click(user_id):
+        await start.wait()
+        began = time.perf_counter()
+        outcome = claims.try_claim(1, 1000, 25, user_id)
+        decided.append(time.perf_counter() - began)
+        if outcome == QUEUED:
+            outcome = await claims.wait_turn(1, 1000, user_id)
+        if outcome != GRANTED:
+            return
+        turns.append(user_id)
+        await asyncio.sleep(throw_time)
+        if give_up_every and len(turns) % give_up_every:
+            claims.release(1, 1000, user_id)
+        else:
+            claims.close(1, 1000)
+
+    tasks = [asyncio.create_task(click(user_id)) for user_id in range(clickers)]
+    await asyncio.sleep(0)
+    start.set()
+    await asyncio.gather(*tasks)
+    return _percentiles(decided), len(turns)
+
+async def _bench_file_checks(clickers):
+    """The old path for comparison: every click reads the guild and its trainer's record from disk."""
+    import tempfile
+    from utils.store_utils import JsonBackend, run_io
+    backend = JsonBackend(tempfile.mkdtemp())
+    guild = {"guild_id": 1, "settings": {}, "channels": {}, "spawns": {"1000": {"id": 25, "status": "active", "message_id": 1000}}}
+    players = [(1, u, backend.snapshot_player(1, u, {"inventory": [{"id": 1, "amount": 3}]})) for u in range(clickers)]
+    backend.write_batch([(1, backend.snapshot_guild(1, guild))], players)
+    start = asyncio.Event()
+    decided = []
+
+    async def click(user_id):
+        await start.wait()
+        began = time.perf_counter()
+        await run_io(backend.read_player, 1, user_id)
+        await run_io(backend.read_guild, 1)
+        decided.append(time.perf_counter() - began)
+
+    tasks = [asyncio.create_task(click(user_id)) for user_id in range(clickers)]
+    await asyncio.sleep(0)
+    start.set()
+    await asyncio.gather(*tasks)
+    return _percentiles(decided)
+
+if __name__ == "__main__":
+    # python -m utils.spawn_claim_utils --clickers 200 -> claim/reject latency under a burst
+    import argparse
+    parser = argparse.ArgumentParser(description="Burst benchmark for spawn claims.")
+    parser.add_argument("--clickers", type=int, default=100, help="simultaneous clicks on one spawn")
+    parser.add_argument("--throw-time", type=float, default=0.01, help="seconds a holder takes to throw")
+    parser.add_argument("--give-up-every", type=int, default=3, help="every Nth holder throws; the others let go")
+    args = parser.parse_args()
+    for policy in CLAIM_POLICIES:
+        stats, turns = asyncio.run(_bench_claims(args.clickers, policy, args.throw_time, args.give_up_every))
+        print(f"[Claims] {policy:>6}: {stats['n']} clicks, {turns} turn(s), decision p50 {stats['p50_ms']:.4f}ms "
+              f"p95 {stats['p95_ms']:.4f}ms p99 {stats['p99_ms']:.4f}ms max {stats['max_ms']:.4f}ms")
+    stats = asyncio.run(_bench_file_checks(args.clickers))
+    print(f"[Claims]  files: {stats['n']} clicks, per-click record reads p50 {stats['p50_ms']:.2f}ms "
+          f"p95 {stats['p95_ms']:.2f}ms p99 {stats['p99_ms']:.2f}ms max {stats['max_ms']:.2f}ms")
@@ -0,0 +1,134 @@
+import time
+import discord
+from utils.server_handler import load_server_data, update_active_spawn_status, guild_spawns, get_spawn
+from utils.spawn_scheduler_utils import SpawnScheduler
+
+SPAWN_LIFETIME = 180  # seconds a wild Pokémon stays before it runs away
+MIN_SPAWN_LIFETIME = 15
+
+def spawn_lifetime(settings, default=SPAWN_LIFETIME):
+    """How long a guild's spawns stay: settings["spawn_lifetime"] if set, else `default`."""
+    return max(MIN_SPAWN_LIFETIME, float((settings or {}).get("spawn_lifetime", default)))
+
+def spawn_embed(bot, pokemon):
+    """The "A wild ... appeared!" embed of a spawn message."""
+    embed = discord.Embed(
+        title=f"A wild {pokemon.name} appeared!",
+        color=discord.Color.green()
+    )
+    embed.add_field(name="Type", value=", ".join(pokemon.types) or "Unknown", inline=True)
+    embed.add_field(name="Rarity", value=pokemon.rarity, inline=True)
+    embed.add_field(name="CP", value=str(pokemon.cp), inline=True)
+    embed.set_image(url=f"{bot.media}/pokemon/{pokemon.id}.png?width=100&height=100")
+    return embed
+
+class SpawnMessage:
+    __slots__ = ("guild_id", "channel_id", "message_id", "pokemon_id", "embed")
+
+    def __init__(self, guild_id, channel_id, message_id, pokemon_id, embed):
+        self.guild_id = str(guild_id)
+        self.channel_id = int(channel_id)
+        self.message_id = int(message_id)
+        self.pokemon_id = pokemon_id
+        self.embed = embed
+
+class SpawnMessages:
+    """
+    Every live spawn message, keyed by message id, with a per-guild index in posting order.
+    Messages are edited through PartialMessage handles built from the stored ids, so closing a
+    spawn is one REST call with no fetch_message first. One deadline heap expires every spawn,
+    each at its own time, instead of a timer per View.
+    """
+    def __init__(self, lifetime=SPAWN_LIFETIME):
+        self.lifetime = lifetime
+        self.expiry = SpawnScheduler()
+        self._live = {}
+        self._by_guild = {}  # guild -> {message id: None}, oldest first
+
+    def __len__(self):
+        return len(self._live)
+
+    def get(self, message_id):
+        return self._live.get(int(message_id))
+
+    def in_guild(self, guild_id):
+        """The guild's live spawn messages, oldest first."""
+        return [self._live[message_id] for message_id in self._by_guild.get(str(guild_id), ())]
+
+    def register(self, guild_id, channel_id, message_id, pokemon_id, embed, spawned_at=None, lifetime=None):
+        """Track a posted spawn until spawned_at + lifetime (default: this registry's lifetime)."""
+        entry = SpawnMessage(guild_id, channel_id, message_id, pokemon_id, embed)
+        self.forget(entry.message_id)
+        self._live[entry.message_id] = entry
+        self._by_guild.setdefault(entry.guild_id, {})[entry.message_id] = None
+        start = time.time() if spawned_at is None else spawned_at
+        self.expiry.schedule_at(entry.message_id, start + (self.lifetime if lifetime is None else lifetime))
+        return entry
+
+    def forget(self, message_id):
+        message_id = int(message_id)
+        self.expiry.remove(message_id)
+        entry = self._live.pop(message_id, None)
+        if entry is not None:
+            guild = self._by_guild.get(entry.guild_id)
+            guild.pop(message_id, None)
+            if not guild:
+                del self._by_guild[entry.guild_id]
+        return entry
+
+    def forget_guild(self, guild_id):
+        for entry in self.in_guild(guild_id):
+            self.forget(entry.message_id)
+
+    async def edit(self, bot, entry, content, embed=None):
+        """Replace a spawn message's text and drop its button, without fetching it."""
+        message = bot.get_partial_messageable(entry.channel_id).get_partial_message(entry.message_id)
+        try:
+            await message.edit(content=content, embed=embed or entry.embed, view=None)
+            return True
+        except discord.HTTPException as e:
+            print(f"[Spawn] Could not edit spawn message {entry.message_id} in guild {entry.guild_id}: {e}")
+            return False
+
+    async def settle(self, bot, message_id, status_message, embed=None):
+        """The spawn was caught or ran: stop tracking it and show why on its message."""
+        entry = self.forget(message_id)
+        if entry is None:
+            return False
+        return await self.edit(bot, entry, status_message, embed)
+
+    async def expire(self, bot, message_id):
+        """Lifetime is up: the spawn escapes if nobody caught it in time."""
+        entry = self.forget(message_id)
+        if entry is None:
+            return
+        data = await load_server_data(entry.guild_id)
+        if data and get_spawn(data, entry.message_id):
+            await update_active_spawn_status(entry.guild_id, entry.message_id, "escaped", "System")
+        await self.edit(bot, entry, "The Pokémon has left the area!")
+
+    def restore(self, bot, guild_id, data):
+        """Re-track a guild record's live spawns at startup; any already past their lifetime expire at once."""
+        wild_channel_id = (data or {}).get("channels", {}).get("wild")
+        if not data or not wild_channel_id:
+            return
+        lifetime = spawn_lifetime(data.get("settings"), self.lifetime)
+        for spawn in guild_spawns(data).values():
+            pokemon = bot.registry.get_species(spawn["id"])
+            if pokemon:
+                self.register(guild_id, wild_channel_id, spawn["message_id"], spawn["id"], spawn_embed(bot, pokemon),
+                              spawn.get("spawn_time"), lifetime)
+
+    async def run(self, bot):
+        while not bot.is_closed():
+            for message_id in await self.expiry.wait_due():
+                try:
+                    await self.expire(bot, message_id)
+                except Exception as e:
+                    print(f"[Spawn] Expiring spawn message {message_id} failed: {e}")
+
+SPAWN_MESSAGES = SpawnMessages()
+
+async def spawn_expiry_clock(bot):
+    await bot.wait_until_ready()
+    await SPAWN_MESSAGES.run(bot)
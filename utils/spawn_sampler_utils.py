@@ -0,0 +1,143 @@
+import json
+import random
+import numpy as np
+
+# Chance of each rarity tier appearing; species split their tier's weight evenly.
+# Keys match the lowercase rarities in pokemon.json ("mythical", not "mythic").
+DEFAULT_RARITY_WEIGHTS = {
+    "common": 0.80,
+    "uncommon": 0.13,
+    "rare": 0.05,
+    "legendary": 0.015,
+    "mythical": 0.005,
+}
+DEFAULT_EVENT_BOOST = 5.0  # weight multiplier for event species listed without one
+
+# Batch draws use numpy's generator; single draws keep using the random module
+_BATCH_RNG = np.random.default_rng()
+
+class AliasTable:
+    """
+    Walker/Vose alias table: O(n) to build, O(1) per draw with a single random number.
+    Columns are kept as numpy arrays so sample_many() draws a whole batch in a few array ops.
+    """
+    __slots__ = ("values", "ids", "prob", "alias")
+
+    def __init__(self, values, weights):
+        if not values or len(values) != len(weights):
+            raise ValueError("AliasTable needs one positive weight per value")
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("AliasTable weights must sum to more than zero")
+        n = len(values)
+        scaled = [w * n / total for w in weights]
+        prob = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            lo, hi = small.pop(), large.pop()
+            prob[lo] = scaled[lo]
+            alias[lo] = hi
+            scaled[hi] -= 1.0 - scaled[lo]
+            (small if scaled[hi] < 1.0 else large).append(hi)
+        # Whatever is left is 1.0 up to rounding error
+        self.values = tuple(values)
+        self.ids = np.asarray(values)
+        self.prob = np.asarray(prob, dtype=float)
+        self.alias = np.asarray(alias, dtype=np.intp)
+
+    def _pick(self, u):
+        # One uniform draw picks the column (integer part) and the coin flip (fraction)
+        u *= len(self.values)
+        i = int(u)
+        return self.values[i] if u - i < self.prob[i] else self.values[self.alias[i]]
+
+    def sample(self, rng=random):
+        return self._pick(rng.random())
+
+    def sample_many(self, count, rng=None):
+        """`count` draws as a list, vectorized; rng is a numpy Generator."""
+        rng = _BATCH_RNG if rng is None else rng
+        idx = rng.integers(len(self.values), size=count)
+        keep = rng.random(count) < self.prob[idx]
+        return self.ids[np.where(keep, idx, self.alias[idx])].tolist()
+
+def _spawn_overrides(settings):
+    return (settings or {}).get("spawn_table") or {}
+
+def species_weights(registry, overrides=None):
+    """
+    Per-species spawn weights for a guild. overrides is the "spawn_table" entry of a guild's
+    data.json settings:
+      rarity_weights: {"rare": 0.1, ...}      replaces the tier's share
+      type_boosts:    {"Fire": 2.0, ...}      multiplies species of that type (once per matching type)
+      event_species:  [25, 133] or {"25": 10} multiplies those species (DEFAULT_EVENT_BOOST for a list)
+    """
+    overrides = overrides or {}
+    rarity_weights = dict(DEFAULT_RARITY_WEIGHTS)
+    rarity_weights.update({k.lower(): float(v) for k, v in overrides.get("rarity_weights", {}).items()})
+    type_boosts = {k.lower(): float(v) for k, v in overrides.get("type_boosts", {}).items()}
+    events = overrides.get("event_species", {})
+    if isinstance(events, list):
+        events = {species_id: DEFAULT_EVENT_BOOST for species_id in events}
+    events = {int(k): float(v) for k, v in events.items()}
+
+    species, weights = [], []
+    for tier, members in registry.species_by_rarity.items():
+        tier_weight = rarity_weights.get(tier, 0.0)
+        for s in members:
+            weight = tier_weight / len(members)
+            for type_name in s.types:
+                weight *= type_boosts.get(type_name.lower(), 1.0)
+            weight *= events.get(s.id, 1.0)
+            if weight > 0:
+                species.append(s.id)
+                weights.append(weight)
+    return species, weights
+
+class SpawnSampler:
+    """
+    Compiled spawn tables. Guilds with the same overrides share one table, so the default
+    table is built once and a tick's worth of spawns is drawn in one numpy batch per table.
+    """
+    def __init__(self, registry):
+        self.registry = registry
+        self._tables = {}
+
+    def table_for(self, settings=None):
+        overrides = _spawn_overrides(settings)
+        key = json.dumps(overrides, sort_keys=True)
+        table = self._tables.get(key)
+        if table is None:
+            species, weights = species_weights(self.registry, overrides)
+            if not species:
+                # A guild zeroed every weight; fall back to the default table rather than never spawning
+                species, weights = species_weights(self.registry)
+            table = AliasTable(species, weights)
+            self._tables[key] = table
+        return table
+
+    def sample(self, settings=None, rng=random):
+        return self.table_for(settings).sample(rng)
+
+    def sample_many(self, count, settings=None, rng=None):
+        return self.table_for(settings).sample_many(count, rng)
+
+    def sample_for_guilds(self, guild_settings, rng=None):
+        """
+        One species id per guild for a whole tick. guild_settings: {guild_id: settings}.
+        Guilds are grouped by table and each group is drawn in one batch.
+        """
+        groups = {}
+        for guild_id, settings in guild_settings.items():
+            table = self.table_for(settings)
+            groups.setdefault(id(table), (table, []))[1].append(guild_id)
+        picks = {}
+        for table, guild_ids in groups.values():
+            picks.update(zip(guild_ids, table.sample_many(len(guild_ids), rng)))
+        return picks
+
+    def invalidate(self):
+        """Drop compiled tables, e.g. after pokemon.json is reloaded."""
+        self._tables.clear()
@@ -0,0 +1,99 @@
+import asyncio
+import heapq
+import random
+import time
+
+DEFAULT_SPAWN_JITTER = 0.1  # +/- fraction of the interval, so guilds don't all fire on the same second
+MIN_SPAWN_INTERVAL = 10     # seconds; floor for per-guild overrides
+SPAWN_SLOT_MEMBERS = 250    # members per extra live spawn when a guild doesn't set max_spawns
+MAX_SPAWN_SLOTS = 5         # most live spawns a guild gets by size alone
+SPAWN_SLOT_LIMIT = 25       # hard cap, even for settings["max_spawns"]
+
+def spawn_interval(settings, default_interval):
+    """A guild's spawn interval: settings["spawn_interval"] if set, else the bot-wide rate."""
+    interval = (settings or {}).get("spawn_interval", default_interval)
+    return max(MIN_SPAWN_INTERVAL, float(interval))
+
+def spawn_jitter(settings):
+    return max(0.0, min(1.0, float((settings or {}).get("spawn_jitter", DEFAULT_SPAWN_JITTER))))
+
+def max_spawns(settings, member_count=None):
+    """
+    How many spawns a guild may have out at once: settings["max_spawns"] if set, else one per
+    SPAWN_SLOT_MEMBERS members (at least one, at most MAX_SPAWN_SLOTS).
+    """
+    configured = (settings or {}).get("max_spawns")
+    if configured is not None:
+        return max(1, min(SPAWN_SLOT_LIMIT, int(configured)))
+    return min(MAX_SPAWN_SLOTS, 1 + (member_count or 0) // SPAWN_SLOT_MEMBERS)
+
+def slot_interval(settings, default_interval, slots):
+    """Seconds between spawns when a guild keeps `slots` of them out: the interval is shared, so bigger guilds see more."""
+    return max(MIN_SPAWN_INTERVAL, spawn_interval(settings, default_interval) / max(1, slots))
+
+class SpawnScheduler:
+    """
+    Min-heap of per-guild spawn deadlines. Only guilds that are due are ever touched;
+    rescheduling leaves the old heap entry behind and it is skipped when popped.
+    """
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._heap = []
+        self._deadlines = {}
+        self._wakeup = asyncio.Event()
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def __contains__(self, guild_id):
+        return str(guild_id) in self._deadlines
+
+    def schedule_at(self, guild_id, deadline):
+        key = str(guild_id)
+        earliest = self._heap[0][0] if self._heap else None
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, key))
+        # A sleeper waiting on a later deadline has to re-check
+        if earliest is None or deadline < earliest:
+            self._wakeup.set()
+
+    def schedule(self, guild_id, interval, jitter=DEFAULT_SPAWN_JITTER, after=None):
+        """Schedule the next spawn one jittered interval after `after` (default: now)."""
+        start = self.clock() if after is None else after
+        delay = interval * (1 + random.uniform(-jitter, jitter))
+        self.schedule_at(guild_id, start + delay)
+
+    def remove(self, guild_id):
+        self._deadlines.pop(str(guild_id), None)
+
+    def next_deadline(self):
+        while self._heap:
+            deadline, key = self._heap[0]
+            if self._deadlines.get(key) == deadline:
+                return deadline
+            heapq.heappop(self._heap)  # stale entry
+        return None
+
+    def pop_due(self, now=None):
+        """Remove and return every guild whose deadline has passed. O(due * log n)."""
+        now = self.clock() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, key = heapq.heappop(self._heap)
+            if self._deadlines.get(key) == deadline:
+                del self._deadlines[key]
+                due.append(key)
+        return due
+
+    async def wait_due(self):
+        """Sleep until the earliest deadline (or until an earlier one is scheduled), then pop due guilds."""
+        while True:
+            deadline = self.next_deadline()
+            if deadline is not None and deadline <= self.clock():
+                return self.pop_due()
+            self._wakeup.clear()
+            timeout = None if deadline is None else deadline - self.clock()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
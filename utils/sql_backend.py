@@ -0,0 +1,231 @@
+import json
+from utils.pokedex_utils import decode, encode, mask_ids, species_mask
+from utils.team_utils import species_id_of
+
+GUILD_COLUMNS = ("guild_id", "created", "settings", "channels", "spawns", "active_spawn", "active_battles")
+TRAINER_COLUMNS = ("inventory", "pokedex", "active_pokemon", "badges", "coin", "gender", "pronouns", "nickname", "power")
+PLAYER_TABLES = ("inventory", "pokedex", "active_team", "trainers")
+GUILD_TABLES = ("spawns", "battles", "matches", "guilds")
+MATCH_COLUMNS = ("ended_at", "user1_id", "user2_id", "winner_id", "forfeit", "user1_rounds", "user2_rounds", "user1_rating", "user2_rating")
+
+class SqlBackend:
+    """
+    Shared row mapping for the SQL backends. The store still hands around the same dict
+    records; they are split into rows on write and reassembled on read.
+
+    Subclasses provide _fetch(sql, params, prepared) and _transaction(), a context manager
+    yielding a cursor with execute/executemany that commits on success. SQL here is written
+    with ? placeholders and translated through _sql() for drivers that use %s.
+    """
+    name = "sql"
+    PARAM = "?"
+
+    def _sql(self, sql):
+        return sql if self.PARAM == "?" else sql.replace("?", self.PARAM)
+
+    def _query(self, sql, params=(), prepared=False):
+        return self._fetch(self._sql(sql), params, prepared)
+
+    def _fetch(self, sql, params, prepared):
+        raise NotImplementedError
+
+    def _transaction(self):
+        raise NotImplementedError
+
+    # Record -> rows (runs on the event loop, so the result must not share live objects)
+
+    def snapshot_guild(self, guild_id, data):
+        gid = int(guild_id)
+        extra = {k: v for k, v in data.items() if k not in GUILD_COLUMNS}
+        extra["created"] = data.get("created", True)
+        guild_row = (gid, json.dumps(data.get("settings", {})), json.dumps(data.get("channels", {})), json.dumps(extra))
+        spawns = dict(data.get("spawns") or {})
+        legacy = data.get("active_spawn")
+        if legacy and legacy.get("status") == "active" and legacy.get("message_id"):
+            spawns.setdefault(str(legacy["message_id"]), legacy)
+        spawn_rows = [
+            (gid, int(message_id), spawn.get("id"), spawn.get("status"), spawn.get("trainer"), spawn.get("spawn_time"))
+            for message_id, spawn in spawns.items()
+        ]
+        return guild_row, spawn_rows
+
+    def snapshot_battle(self, guild_id, channel_id, data):
+        return (int(guild_id), int(channel_id), data.get("user1_id"), data.get("user2_id"), data.get("started_at"), json.dumps(data))
+
+    def snapshot_player(self, guild_id, user_id, data):
+        gid, uid = int(guild_id), int(user_id)
+        extra = {k: v for k, v in data.items() if k not in TRAINER_COLUMNS}
+        trainer_row = (
+            gid, uid, data.get("nickname", ""), data.get("gender", ""), data.get("pronouns", ""),
+            data.get("coin", 0), data.get("power", 0), json.dumps(data.get("badges", [])), json.dumps(extra)
+        )
+        inventory_rows = [(gid, uid, entry["id"], entry.get("amount", 0)) for entry in data.get("inventory", [])]
+        pokedex_rows = [(gid, uid, pokemon_id) for pokemon_id in mask_ids(decode(data.get("pokedex")))]
+        team_rows = [
+            (gid, uid, slot, species_id_of(poke), json.dumps(poke))
+            for slot, poke in enumerate(data.get("active_pokemon", []))
+        ]
+        return trainer_row, inventory_rows, pokedex_rows, team_rows
+
+    # Rows -> record
+
+    def read_guild(self, guild_id):
+        gid = int(guild_id)
+        rows = self._query("SELECT settings, channels, extra FROM guilds WHERE guild_id = ?", (gid,))
+        if not rows:
+            return None
+        settings, channels, extra = rows[0]
+        extra = json.loads(extra)
+        data = {
+            "guild_id": gid,
+            "created": extra.pop("created", True),
+            "settings": json.loads(settings),
+            "channels": json.loads(channels),
+            "spawns": {},
+        }
+        data.update(extra)
+        for message_id, pokemon_id, status, trainer, spawn_time in self._query(
+            "SELECT message_id, pokemon_id, status, trainer, spawn_time FROM spawns WHERE guild_id = ? ORDER BY spawn_time", (gid,)
+        ):
+            if message_id and status == "active":
+                data["spawns"][str(message_id)] = {"id": pokemon_id, "spawn_time": spawn_time, "status": status, "trainer": trainer, "message_id": message_id}
+            elif spawn_time:
+                # A settled spawn from the single-slot layout still dates the guild's last spawn
+                data.setdefault("last_spawn_time", spawn_time)
+        return data
+
+    def read_player(self, guild_id, user_id):
+        gid, uid = int(guild_id), int(user_id)
+        rows = self._query(
+            "SELECT nickname, gender, pronouns, coin, power, badges, extra FROM trainers WHERE guild_id = ? AND user_id = ?",
+            (gid, uid)
+        )
+        if not rows:
+            return None
+        nickname, gender, pronouns, coin, power, badges, extra = rows[0]
+        key = (gid, uid)
+        data = {
+            "inventory": [
+                {"id": item_id, "amount": amount} for item_id, amount in self._query(
+                    "SELECT item_id, amount FROM inventory WHERE guild_id = ? AND user_id = ? ORDER BY item_id", key
+                )
+            ],
+            "pokedex": encode(species_mask(
+                pokemon_id for (pokemon_id,) in self._query(
+                    "SELECT pokemon_id FROM pokedex WHERE guild_id = ? AND user_id = ?", key
+                )
+            )),
+            "active_pokemon": [
+                json.loads(poke) for (poke,) in self._query(
+                    "SELECT data FROM active_team WHERE guild_id = ? AND user_id = ? ORDER BY slot", key
+                )
+            ],
+            "badges": json.loads(badges),
+            "coin": coin,
+            "gender": gender,
+            "pronouns": pronouns,
+            "nickname": nickname,
+            "power": power,
+        }
+        data.update(json.loads(extra))
+        return data
+
+    def write_batch(self, guilds, players):
+        """One transaction per flush: a group commit of every dirty record."""
+        with self._transaction() as cur:
+            for guild_id, (guild_row, spawn_rows) in guilds:
+                gid = (guild_row[0],)
+                cur.execute(self._sql("REPLACE INTO guilds (guild_id, settings, channels, extra) VALUES (?, ?, ?, ?)"), guild_row)
+                self._replace_rows(cur, "spawns", "guild_id = ?", gid,
+                                   "(guild_id, message_id, pokemon_id, status, trainer, spawn_time) VALUES (?, ?, ?, ?, ?, ?)", spawn_rows)
+            for guild_id, user_id, (trainer_row, inventory_rows, pokedex_rows, team_rows) in players:
+                key = trainer_row[:2]
+                cur.execute(self._sql(
+                    "REPLACE INTO trainers (guild_id, user_id, nickname, gender, pronouns, coin, power, badges, extra) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                ), trainer_row)
+                where = "guild_id = ? AND user_id = ?"
+                self._replace_rows(cur, "inventory", where, key, "(guild_id, user_id, item_id, amount) VALUES (?, ?, ?, ?)", inventory_rows)
+                self._replace_rows(cur, "pokedex", where, key, "(guild_id, user_id, pokemon_id) VALUES (?, ?, ?)", pokedex_rows)
+                self._replace_rows(cur, "active_team", where, key, "(guild_id, user_id, slot, pokemon_id, data) VALUES (?, ?, ?, ?, ?)", team_rows)
+
+    def write_battles(self, upserts, deletes):
+        """Battle checkpoints: upserts are snapshot_battle rows, deletes are (guild_id, channel_id)."""
+        with self._transaction() as cur:
+            for guild_id, channel_id in deletes:
+                cur.execute(self._sql("DELETE FROM battles WHERE guild_id = ? AND channel_id = ?"), (int(guild_id), int(channel_id)))
+            for row in upserts:
+                cur.execute(self._sql(
+                    "REPLACE INTO battles (guild_id, channel_id, user1_id, user2_id, started_at, state) VALUES (?, ?, ?, ?, ?, ?)"
+                ), row)
+
+    def read_battles(self):
+        return [(str(gid), json.loads(state)) for gid, state in self._query("SELECT guild_id, state FROM battles ORDER BY started_at")]
+
+    def append_matches(self, rows):
+        """Match history is insert-only; rows are (guild_id, match_row) with match_row in MATCH_COLUMNS order."""
+        placeholders = ", ".join("?" * (len(MATCH_COLUMNS) + 1))
+        with self._transaction() as cur:
+            cur.executemany(
+                self._sql(f"INSERT INTO matches (guild_id, {', '.join(MATCH_COLUMNS)}) VALUES ({placeholders})"),
+                [(int(guild_id),) + tuple(row) for guild_id, row in rows]
+            )
+
+    def read_matches(self, guild_id):
+        return [tuple(row) for row in self._query(
+            f"SELECT {', '.join(MATCH_COLUMNS)} FROM matches WHERE guild_id = ? ORDER BY match_id", (int(guild_id),)
+        )]
+
+    def _replace_rows(self, cur, table, where, key, insert, rows):
+        cur.execute(self._sql(f"DELETE FROM {table} WHERE {where}"), key)
+        if rows:
+            cur.executemany(self._sql(f"INSERT INTO {table} {insert}"), rows)
+
+    def _delete(self, tables, where, params):
+        deleted = 0
+        with self._transaction() as cur:
+            for table in tables:
+                cur.execute(self._sql(f"DELETE FROM {table} WHERE {where}"), params)
+                deleted += max(cur.rowcount, 0)
+        return deleted > 0
+
+    def delete_guild(self, guild_id):
+        return self._delete(GUILD_TABLES, "guild_id = ?", (int(guild_id),))
+
+    def delete_player(self, guild_id, user_id):
+        self._delete(PLAYER_TABLES, "guild_id = ? AND user_id = ?", (int(guild_id), int(user_id)))
+
+    def purge_guild(self, guild_id):
+        return self._delete(PLAYER_TABLES + GUILD_TABLES, "guild_id = ?", (int(guild_id),))
+
+    def guild_ids(self):
+        return [str(gid) for (gid,) in self._query("SELECT guild_id FROM guilds")]
+
+    def user_ids(self, guild_id):
+        return [str(uid) for (uid,) in self._query("SELECT user_id FROM trainers WHERE guild_id = ?", (int(guild_id),))]
+
+    # Hot single-value lookups, answered from an index without assembling a whole record
+
+    def item_amount(self, guild_id, user_id, item_id):
+        rows = self._query(
+            "SELECT amount FROM inventory WHERE guild_id = ? AND user_id = ? AND item_id = ?",
+            (int(guild_id), int(user_id), int(item_id)), prepared=True
+        )
+        return rows[0][0] if rows else 0
+
+    def active_team(self, guild_id, user_id):
+        return [
+            json.loads(poke) for (poke,) in self._query(
+                "SELECT data FROM active_team WHERE guild_id = ? AND user_id = ? ORDER BY slot",
+                (int(guild_id), int(user_id)), prepared=True
+            )
+        ]
+
+    def spawns(self, guild_id):
+        return {
+            str(message_id): {"id": pokemon_id, "spawn_time": spawn_time, "status": status, "trainer": trainer, "message_id": message_id}
+            for message_id, pokemon_id, status, trainer, spawn_time in self._query(
+                "SELECT message_id, pokemon_id, status, trainer, spawn_time FROM spawns WHERE guild_id = ? AND status = 'active' AND message_id <> 0 ORDER BY spawn_time",
+                (int(guild_id),), prepared=True
+            )
+        }
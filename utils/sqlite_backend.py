@@ -0,0 +1,126 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from utils.sql_backend import SqlBackend
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS guilds (
+        guild_id INTEGER PRIMARY KEY,
+        settings TEXT NOT NULL DEFAULT '{}',
+        channels TEXT NOT NULL DEFAULT '{}',
+        extra TEXT NOT NULL DEFAULT '{}'
+    )""",
+    """CREATE TABLE IF NOT EXISTS trainers (
+        guild_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        nickname TEXT NOT NULL DEFAULT '',
+        gender TEXT NOT NULL DEFAULT '',
+        pronouns TEXT NOT NULL DEFAULT '',
+        coin INTEGER NOT NULL DEFAULT 0,
+        power INTEGER NOT NULL DEFAULT 0,
+        badges TEXT NOT NULL DEFAULT '[]',
+        extra TEXT NOT NULL DEFAULT '{}',
+        PRIMARY KEY (guild_id, user_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_trainers_power ON trainers (guild_id, power)",
+    """CREATE TABLE IF NOT EXISTS inventory (
+        guild_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        item_id INTEGER NOT NULL,
+        amount INTEGER NOT NULL,
+        PRIMARY KEY (guild_id, user_id, item_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_inventory_item ON inventory (guild_id, item_id, amount)",
+    """CREATE TABLE IF NOT EXISTS pokedex (
+        guild_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        pokemon_id INTEGER NOT NULL,
+        PRIMARY KEY (guild_id, user_id, pokemon_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_pokedex_pokemon ON pokedex (guild_id, pokemon_id)",
+    """CREATE TABLE IF NOT EXISTS active_team (
+        guild_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        slot INTEGER NOT NULL,
+        pokemon_id INTEGER,
+        data TEXT NOT NULL,
+        PRIMARY KEY (guild_id, user_id, slot)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_active_team_pokemon ON active_team (guild_id, pokemon_id)",
+    """CREATE TABLE IF NOT EXISTS spawns (
+        guild_id INTEGER NOT NULL,
+        message_id INTEGER NOT NULL DEFAULT 0,
+        pokemon_id INTEGER,
+        status TEXT,
+        trainer TEXT,
+        spawn_time INTEGER,
+        PRIMARY KEY (guild_id, message_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_spawns_status ON spawns (status, spawn_time)",
+    """CREATE TABLE IF NOT EXISTS battles (
+        guild_id INTEGER NOT NULL,
+        channel_id INTEGER NOT NULL,
+        user1_id INTEGER,
+        user2_id INTEGER,
+        started_at INTEGER,
+        state TEXT NOT NULL,
+        PRIMARY KEY (guild_id, channel_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_battles_user1 ON battles (guild_id, user1_id)",
+    "CREATE INDEX IF NOT EXISTS idx_battles_user2 ON battles (guild_id, user2_id)",
+    """CREATE TABLE IF NOT EXISTS matches (
+        match_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id INTEGER NOT NULL,
+        ended_at INTEGER NOT NULL,
+        user1_id INTEGER NOT NULL,
+        user2_id INTEGER NOT NULL,
+        winner_id INTEGER NOT NULL DEFAULT 0,
+        forfeit INTEGER NOT NULL DEFAULT 0,
+        user1_rounds INTEGER NOT NULL DEFAULT 0,
+        user2_rounds INTEGER NOT NULL DEFAULT 0,
+        user1_rating INTEGER NOT NULL,
+        user2_rating INTEGER NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_matches_user1 ON matches (guild_id, user1_id)",
+    "CREATE INDEX IF NOT EXISTS idx_matches_user2 ON matches (guild_id, user2_id)",
+]
+
+class SqliteBackend(SqlBackend):
+    """Normalized storage in one SQLite database file, in WAL mode."""
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self._transaction() as cur:
+            for statement in SCHEMA:
+                cur.execute(statement)
+
+    def _connect(self):
+        # One connection per I/O thread; WAL lets readers run while a flush is writing
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _fetch(self, sql, params, prepared):
+        # sqlite3 caches compiled statements per connection, so every query is effectively prepared
+        return self._connect().execute(sql, params).fetchall()
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        with self._write_lock:
+            cur = conn.cursor()
+            try:
+                yield cur
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cur.close()
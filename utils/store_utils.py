@@ -0,0 +1,543 @@
+import os
+import json
+import shutil
+import asyncio
+import tempfile
+from itertools import islice
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Same on-disk layout as before: servers/<guild_id>/data.json and servers/<guild_id>/<user_id>.json
+SERVERS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "servers")
+
+FLUSH_INTERVAL = 5           # seconds between group-commit flushes
+MAX_RESIDENT_PLAYERS = 5000  # LRU bound on player records kept in memory
+IO_WORKERS = 4               # threads doing disk I/O for the async API
+FLUSH_CHUNK = 100            # records serialized per hop to the I/O pool
+
+# Bounded pool so a burst of cache misses can't spawn unbounded threads
+IO_EXECUTOR = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="store-io")
+
+async def run_io(func, *args):
+    """Run a blocking function on the store's I/O pool without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(IO_EXECUTOR, func, *args)
+
+def _read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _read_json_if_exists(path):
+    if not os.path.isfile(path):
+        return None
+    return _read_json(path)
+
+def _write_text(path, text):
+    """
+    Write through a temp file so a crash mid-write never leaves a truncated record. The temp
+    file is unique, so two writers can never replace each other's half-written file.
+    """
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _write_json(path, data):
+    _write_text(path, json.dumps(data, indent=2))
+
+def _list_dir(path):
+    if not os.path.isdir(path):
+        return []
+    return os.listdir(path)
+
+class JsonBackend:
+    """
+    The original layout: one data.json per guild and one <user_id>.json per trainer.
+
+    Every backend has the same shape. snapshot_* runs on the event loop and turns a live
+    record into an immutable payload; everything else may run on the I/O pool.
+    """
+    name = "json"
+
+    def __init__(self, servers_dir=SERVERS_DIR):
+        self.servers_dir = servers_dir
+
+    def _guild_path(self, guild_id):
+        return os.path.join(self.servers_dir, str(guild_id), "data.json")
+
+    def _player_path(self, guild_id, user_id):
+        return os.path.join(self.servers_dir, str(guild_id), f"{user_id}.json")
+
+    def snapshot_guild(self, guild_id, data):
+        return json.dumps(data, indent=2)
+
+    def snapshot_player(self, guild_id, user_id, data):
+        return json.dumps(data, indent=2)
+
+    def _battle_path(self, guild_id, channel_id):
+        return os.path.join(self.servers_dir, str(guild_id), "battles", f"{channel_id}.json")
+
+    def read_guild(self, guild_id):
+        return _read_json_if_exists(self._guild_path(guild_id))
+
+    def read_player(self, guild_id, user_id):
+        return _read_json_if_exists(self._player_path(guild_id, user_id))
+
+    def write_batch(self, guilds, players):
+        """guilds: [(guild_id, payload)], players: [(guild_id, user_id, payload)]"""
+        for guild_id, text in guilds:
+            _write_text(self._guild_path(guild_id), text)
+        for guild_id, user_id, text in players:
+            _write_text(self._player_path(guild_id, user_id), text)
+
+    def snapshot_battle(self, guild_id, channel_id, data):
+        return (guild_id, channel_id, json.dumps(data, indent=2))
+
+    def write_battles(self, upserts, deletes):
+        """One small file per battle, so a turn never rewrites the guild's data.json."""
+        for guild_id, channel_id in deletes:
+            path = self._battle_path(guild_id, channel_id)
+            if os.path.exists(path):
+                os.remove(path)
+        for guild_id, channel_id, text in upserts:
+            _write_text(self._battle_path(guild_id, channel_id), text)
+
+    def read_battles(self):
+        battles = []
+        for guild_id in self.guild_ids():
+            folder = os.path.join(self.servers_dir, guild_id, "battles")
+            for name in _list_dir(folder):
+                if name.endswith(".json"):
+                    battles.append((guild_id, _read_json(os.path.join(folder, name))))
+        return battles
+
+    def _matches_path(self, guild_id):
+        return os.path.join(self.servers_dir, str(guild_id), "matches.jsonl")
+
+    def append_matches(self, rows):
+        """rows: [(guild_id, match_row)], appended one compact line each to the guild's matches.jsonl."""
+        for guild_id, row in rows:
+            path = self._matches_path(guild_id)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(row, separators=(",", ":")) + "\n")
+
+    def read_matches(self, guild_id):
+        path = self._matches_path(guild_id)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return [tuple(json.loads(line)) for line in f if line.strip()]
+
+    def delete_guild(self, guild_id):
+        path = self._guild_path(guild_id)
+        if os.path.exists(path):
+            os.remove(path)
+            return True
+        return False
+
+    def delete_player(self, guild_id, user_id):
+        path = self._player_path(guild_id, user_id)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def purge_guild(self, guild_id):
+        guild_folder = os.path.join(self.servers_dir, str(guild_id))
+        if os.path.exists(guild_folder):
+            shutil.rmtree(guild_folder)
+            return True
+        return False
+
+    def guild_ids(self):
+        return [name for name in _list_dir(self.servers_dir) if name.isdigit()]
+
+    def user_ids(self, guild_id):
+        return [
+            name[:-5] for name in _list_dir(os.path.join(self.servers_dir, str(guild_id)))
+            if name.endswith(".json") and name != "data.json"
+        ]
+
+    # Hot lookups; a file backend has no index, so these read the whole record
+
+    def item_amount(self, guild_id, user_id, item_id):
+        data = self.read_player(guild_id, user_id) or {}
+        return next((entry["amount"] for entry in data.get("inventory", []) if entry["id"] == item_id), 0)
+
+    def active_team(self, guild_id, user_id):
+        return (self.read_player(guild_id, user_id) or {}).get("active_pokemon", [])
+
+    def spawns(self, guild_id):
+        return (self.read_guild(guild_id) or {}).get("spawns") or {}
+
+class GuildStore:
+    """
+    Keeps parsed data.json records in memory. Writes only mark a guild dirty;
+    dirty guilds are written back together by flush(). A guild being written is never taken
+    again until that write lands, so two writes of one record can't overlap or land out of order.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+        self._records = {}
+        self._missing = set()
+        self._dirty = set()
+        self._writing = set()
+
+    def get(self, guild_id):
+        key = str(guild_id)
+        if key in self._records:
+            return self._records[key]
+        if key in self._missing:
+            return None
+        data = self.backend.read_guild(key)
+        if data is None:
+            self._missing.add(key)
+            return None
+        self._records[key] = data
+        return data
+
+    async def aget(self, guild_id):
+        """Like get(), but a cache miss is read on the I/O pool."""
+        key = str(guild_id)
+        if key in self._records:
+            return self._records[key]
+        if key in self._missing:
+            return None
+        data = await run_io(self.backend.read_guild, key)
+        # Another coroutine may have loaded or written the record while we waited
+        if key in self._records:
+            return self._records[key]
+        if data is None:
+            self._missing.add(key)
+            return None
+        self._records[key] = data
+        return data
+
+    def exists(self, guild_id):
+        return self.get(guild_id) is not None
+
+    def put(self, guild_id, data):
+        key = str(guild_id)
+        self._records[key] = data
+        self._missing.discard(key)
+        self._dirty.add(key)
+
+    def delete(self, guild_id):
+        key = str(guild_id)
+        self._records.pop(key, None)
+        self._dirty.discard(key)
+        self._missing.add(key)
+        return self.backend.delete_guild(key)
+
+    def drop(self, guild_id):
+        """Forget a guild without writing it back (its data is being purged)."""
+        key = str(guild_id)
+        self._records.pop(key, None)
+        self._dirty.discard(key)
+        self._missing.discard(key)
+
+    def guild_ids(self):
+        return sorted(set(self._records).union(self.backend.guild_ids()))
+
+    async def aguild_ids(self):
+        stored = await run_io(self.backend.guild_ids)
+        return sorted(set(self._records).union(stored))
+
+    def take_dirty(self, limit=None):
+        """Pop up to `limit` dirty guilds that aren't already being written, as backend payloads."""
+        keys = list(islice((key for key in self._dirty if key not in self._writing), limit))
+        self._start_writing(keys)
+        return keys, [(key, self.backend.snapshot_guild(key, self._records[key])) for key in keys if key in self._records]
+
+    def take(self, guild_ids):
+        """Pop these guilds from the dirty set as backend payloads, for an immediate commit. Wait for writing() first."""
+        keys = [str(guild_id) for guild_id in guild_ids if str(guild_id) in self._dirty]
+        self._start_writing(keys)
+        return keys, [(key, self.backend.snapshot_guild(key, self._records[key])) for key in keys if key in self._records]
+
+    def writing(self, guild_ids):
+        return [str(guild_id) for guild_id in guild_ids if str(guild_id) in self._writing]
+
+    def _start_writing(self, keys):
+        self._dirty.difference_update(keys)
+        self._writing.update(keys)
+
+    def write_done(self, keys):
+        self._writing.difference_update(keys)
+
+    def mark_dirty(self, keys):
+        self._dirty.update(key for key in keys if key in self._records)
+
+class PlayerStore:
+    """
+    Keeps parsed <user_id>.json records in memory with dirty tracking.
+    Resident records are bounded by an LRU of clean records: a dirty one stays resident until a
+    flush has written it, so eviction never does I/O on the event loop.
+    """
+    def __init__(self, backend, max_resident=MAX_RESIDENT_PLAYERS):
+        self.backend = backend
+        self.max_resident = max_resident
+        self._records = OrderedDict()
+        self._missing = set()
+        self._dirty = set()
+        self._writing = set()  # taken for a write that hasn't landed yet
+
+    def _key(self, guild_id, user_id):
+        return (str(guild_id), str(user_id))
+
+    def _remember(self, key, data):
+        self._records[key] = data
+        self._records.move_to_end(key)
+        self.trim()
+
+    def trim(self):
+        """Drop the least recently used clean records over the bound; dirty ones wait for the next flush."""
+        excess = len(self._records) - self.max_resident
+        if excess <= 0:
+            return
+        victims = []
+        for key in self._records:
+            if key not in self._dirty and key not in self._writing:
+                victims.append(key)
+                if len(victims) == excess:
+                    break
+        for key in victims:
+            del self._records[key]
+
+    def get(self, guild_id, user_id):
+        key = self._key(guild_id, user_id)
+        if key in self._records:
+            self._records.move_to_end(key)
+            return self._records[key]
+        if key in self._missing:
+            return None
+        data = self.backend.read_player(*key)
+        if data is None:
+            self._missing.add(key)
+            return None
+        self._remember(key, data)
+        return data
+
+    async def aget(self, guild_id, user_id):
+        """Like get(), but a cache miss is read on the I/O pool."""
+        key = self._key(guild_id, user_id)
+        if key in self._records:
+            self._records.move_to_end(key)
+            return self._records[key]
+        if key in self._missing:
+            return None
+        data = await run_io(self.backend.read_player, *key)
+        if key in self._records:
+            return self._records[key]
+        if data is None:
+            self._missing.add(key)
+            return None
+        self._remember(key, data)
+        return data
+
+    async def aitem_amount(self, guild_id, user_id, item_id):
+        """One inventory amount; served from memory when resident, else by an indexed backend lookup on the I/O pool."""
+        key = self._key(guild_id, user_id)
+        if key in self._records:
+            return next((entry["amount"] for entry in self._records[key].get("inventory", []) if entry["id"] == item_id), 0)
+        if key in self._missing:
+            return 0
+        return await run_io(self.backend.item_amount, *key, item_id)
+
+    async def aactive_team(self, guild_id, user_id):
+        """A trainer's active team without loading the whole record when it isn't cached."""
+        key = self._key(guild_id, user_id)
+        if key in self._records:
+            return self._records[key].get("active_pokemon", [])
+        if key in self._missing:
+            return []
+        return await run_io(self.backend.active_team, *key)
+
+    def put(self, guild_id, user_id, data):
+        key = self._key(guild_id, user_id)
+        # Every write gets a new version, so anything rendered from the old one is known to be stale
+        data["version"] = data.get("version", 0) + 1
+        self._missing.discard(key)
+        self._dirty.add(key)
+        self._remember(key, data)
+
+    def delete(self, guild_id, user_id):
+        key = self._key(guild_id, user_id)
+        self._records.pop(key, None)
+        self._dirty.discard(key)
+        self._missing.add(key)
+        self.backend.delete_player(*key)
+
+    def drop_guild(self, guild_id):
+        """Forget every record of a guild without writing it back."""
+        gid = str(guild_id)
+        for key in [k for k in self._records if k[0] == gid]:
+            del self._records[key]
+        self._dirty = {k for k in self._dirty if k[0] != gid}
+        self._missing = {k for k in self._missing if k[0] != gid}
+
+    def _merge_user_ids(self, gid, stored):
+        return sorted({k[1] for k in self._records if k[0] == gid}.union(stored))
+
+    def user_ids(self, guild_id):
+        gid = str(guild_id)
+        return self._merge_user_ids(gid, self.backend.user_ids(gid))
+
+    async def auser_ids(self, guild_id):
+        gid = str(guild_id)
+        stored = await run_io(self.backend.user_ids, gid)
+        return self._merge_user_ids(gid, stored)
+
+    def take_dirty(self, limit=None):
+        """Pop up to `limit` dirty players that aren't already being written, as backend payloads."""
+        keys = list(islice((key for key in self._dirty if key not in self._writing), limit))
+        self._start_writing(keys)
+        return keys, [(key[0], key[1], self.backend.snapshot_player(key[0], key[1], self._records[key])) for key in keys if key in self._records]
+
+    def take(self, player_keys):
+        """Pop these (guild_id, user_id) players from the dirty set as backend payloads, for an immediate commit. Wait for writing() first."""
+        keys = [self._key(*key) for key in player_keys if self._key(*key) in self._dirty]
+        self._start_writing(keys)
+        return keys, [(key[0], key[1], self.backend.snapshot_player(key[0], key[1], self._records[key])) for key in keys if key in self._records]
+
+    def writing(self, player_keys):
+        return [self._key(*key) for key in player_keys if self._key(*key) in self._writing]
+
+    def _start_writing(self, keys):
+        self._dirty.difference_update(keys)
+        self._writing.update(keys)
+
+    def write_done(self, keys):
+        self._writing.difference_update(keys)
+
+    def mark_dirty(self, keys):
+        self._dirty.update(key for key in keys if key in self._records)
+
+GUILD_STORE = GuildStore(JsonBackend())
+PLAYER_STORE = PlayerStore(JsonBackend())
+
+def configure_storage(config, db_pool=None):
+    """Pick the persistence backend from config.json's "storage" section (default: json files)."""
+    storage = config.get("storage", {}) if config else {}
+    backend_name = storage.get("backend", "json")
+    if backend_name == "sqlite":
+        from utils.sqlite_backend import SqliteBackend
+        backend = SqliteBackend(storage.get("sqlite_path", os.path.join(SERVERS_DIR, "pokedex.db")))
+    elif backend_name == "mysql":
+        if db_pool is None:
+            raise RuntimeError("storage.backend is 'mysql' but no database pool could be created (check use_DB and database)")
+        from utils.mysql_backend import MySQLBackend
+        backend = MySQLBackend(db_pool)
+    else:
+        backend = JsonBackend()
+    GUILD_STORE.backend = backend
+    PLAYER_STORE.backend = backend
+    PLAYER_STORE.max_resident = storage.get("max_resident_players", MAX_RESIDENT_PLAYERS)
+    print(f"[Store] Using {backend.name} storage backend")
+    return backend
+
+_write_landed = None  # asyncio.Event set (and replaced) whenever an async write finishes
+
+def _landed_event():
+    global _write_landed
+    if _write_landed is None:
+        _write_landed = asyncio.Event()
+    return _write_landed
+
+async def _write(guild_keys, guilds, player_keys, players):
+    """One backend batch on the I/O pool; failed records go back to dirty for the next flush."""
+    global _write_landed
+    try:
+        await run_io(GUILD_STORE.backend.write_batch, guilds, players)
+    except Exception:
+        GUILD_STORE.mark_dirty(guild_keys)
+        PLAYER_STORE.mark_dirty(player_keys)
+        raise
+    finally:
+        GUILD_STORE.write_done(guild_keys)
+        PLAYER_STORE.write_done(player_keys)
+        if _write_landed is not None:
+            _write_landed.set()
+            _write_landed = None
+
+def flush_all():
+    """
+    Shutdown flush: waits for writes still on the I/O pool, then writes every dirty record on
+    this thread. The pool is closed afterwards, so only call this once the bot has stopped.
+    """
+    IO_EXECUTOR.shutdown(wait=True)
+    # Their completions ran on the (now stopped) loop or never will; the writes themselves are done
+    GUILD_STORE.write_done(list(GUILD_STORE._writing))
+    PLAYER_STORE.write_done(list(PLAYER_STORE._writing))
+    guild_keys, guilds = GUILD_STORE.take_dirty()
+    player_keys, players = PLAYER_STORE.take_dirty()
+    try:
+        GUILD_STORE.backend.write_batch(guilds, players)
+    except Exception:
+        GUILD_STORE.mark_dirty(guild_keys)
+        PLAYER_STORE.mark_dirty(player_keys)
+        raise
+    finally:
+        GUILD_STORE.write_done(guild_keys)
+        PLAYER_STORE.write_done(player_keys)
+    PLAYER_STORE.trim()
+    if guilds or players:
+        print(f"[Store] Flushed {len(guilds)} guild record(s) and {len(players)} player record(s)")
+
+async def aflush_all():
+    """
+    Group commit: payloads are snapshotted on the loop (so nothing mutates mid-dump)
+    and written on the I/O pool, in chunks so a large backlog never holds the loop.
+    Records still being written by a commit stay dirty for the next flush.
+    """
+    flushed_guilds = flushed_players = 0
+    while True:
+        guild_keys, guilds = GUILD_STORE.take_dirty(FLUSH_CHUNK)
+        player_keys, players = PLAYER_STORE.take_dirty(FLUSH_CHUNK)
+        if not guild_keys and not player_keys:
+            break
+        await _write(guild_keys, guilds, player_keys, players)
+        flushed_guilds += len(guilds)
+        flushed_players += len(players)
+    # Records kept over the bound because they were dirty can go now
+    PLAYER_STORE.trim()
+    if flushed_guilds or flushed_players:
+        print(f"[Store] Flushed {flushed_guilds} guild record(s) and {flushed_players} player record(s)")
+
+async def acommit(guild_ids=(), player_keys=()):
+    """
+    Write these guild and player records now, as one backend batch (one transaction on the SQL
+    backends), instead of at the next flush. For changes that must land together, like a capture
+    spending a ball and claiming the spawn. A flush already writing one of them is waited for
+    first, so this write is the later one.
+    """
+    while GUILD_STORE.writing(guild_ids) or PLAYER_STORE.writing(player_keys):
+        await _landed_event().wait()
+    guild_keys, guilds = GUILD_STORE.take(guild_ids)
+    player_keys, players = PLAYER_STORE.take(player_keys)
+    if not guilds and not players:
+        GUILD_STORE.write_done(guild_keys)
+        PLAYER_STORE.write_done(player_keys)
+        return
+    await _write(guild_keys, guilds, player_keys, players)
+
+async def purge_guild(guild_id):
+    """Forget a guild's cached records and delete everything the backend holds for it."""
+    GUILD_STORE.drop(guild_id)
+    PLAYER_STORE.drop_guild(guild_id)
+    return await run_io(GUILD_STORE.backend.purge_guild, str(guild_id))
+
+async def store_flush_clock(bot):
+    await bot.wait_until_ready()
+    while not bot.is_closed():
+        await asyncio.sleep(FLUSH_INTERVAL)
+        try:
+            await aflush_all()
+        except Exception as e:
+            print(f"[Store] Flush failed: {e}")
@@ -0,0 +1,119 @@
+# A trainer's active team stores compact instances, not species data:
+#   {"species_id": 25, "instance_id": "9f1c2a7b", "current_hp": 35, "level": 1, "nickname": ""}
+# Everything static (name, types, stats, rarity, lore) comes from the species registry when the
+# entry is read. Older records hold full pokemon.json dicts ("id", "name", "lore", ...).
+import json
+import secrets
+import tracemalloc
+
+INSTANCE_FIELDS = ("species_id", "instance_id", "current_hp", "level", "nickname")
+DEFAULT_LEVEL = 1
+
+def new_instance(species, level=DEFAULT_LEVEL, nickname=""):
+    """A freshly caught Pokémon of this species, at full HP."""
+    return {
+        "species_id": species.id,
+        "instance_id": secrets.token_hex(4),
+        "current_hp": species.hp,
+        "level": level,
+        "nickname": nickname,
+    }
+
+def is_compact(entry):
+    return "species_id" in entry
+
+def species_id_of(entry):
+    """The species of a team entry, compact or legacy."""
+    return entry.get("species_id", entry.get("id"))
+
+def compact(entry):
+    """The compact form of a team entry (a new dict). A legacy dict keeps its current HP (or its max HP)."""
+    if is_compact(entry):
+        return {field: entry.get(field) for field in INSTANCE_FIELDS}
+    return {
+        "species_id": entry.get("id"),
+        "instance_id": secrets.token_hex(4),
+        "current_hp": entry.get("current_hp", entry.get("hp", 0)),
+        "level": entry.get("level", DEFAULT_LEVEL),
+        "nickname": entry.get("nickname", ""),
+    }
+
+def compact_team(user_data):
+    """The trainer's active team, with any legacy entries converted in place. Returns the list."""
+    team = user_data.setdefault("active_pokemon", [])
+    for idx, entry in enumerate(team):
+        if not is_compact(entry):
+            team[idx] = compact(entry)
+    return team
+
+def hydrate(registry, entry):
+    """
+    A display/battle view of a team entry: the species' pokemon.json fields plus the instance
+    fields. The view is a new dict; changing it does not change the stored entry.
+    """
+    entry = compact(entry)
+    species = registry.get_species(entry["species_id"])
+    view = species.to_dict() if species else {"id": entry["species_id"], "name": "Unknown"}
+    view.pop("lore", None)
+    view.update(entry)
+    return view
+
+def hydrate_team(registry, team):
+    return [hydrate(registry, entry) for entry in team]
+
+def team_power(registry, team):
+    """Average CP of the team's species, 0 for an empty team."""
+    if not team:
+        return 0
+    total_cp = 0
+    for entry in team:
+        species = registry.get_species(species_id_of(entry))
+        total_cp += species.cp if species else 0
+    return int(total_cp / len(team))
+
+def footprint(records):
+    """(bytes on disk as the JSON backend writes them, bytes allocated when parsed) for these records."""
+    texts = [json.dumps(record, indent=2) for record in records]
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    parsed = [json.loads(text) for text in texts]
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    if not tracing:
+        tracemalloc.stop()
+    del parsed
+    return sum(len(text.encode("utf-8")) for text in texts), allocated
+
+def migrate_json_teams(servers_dir=None):
+    """
+    Rewrite every legacy active team in the JSON servers/ tree in compact form, checking that
+    each entry keeps its species and HP. Prints the size of the changed files before and after.
+    """
+    from utils.store_utils import JsonBackend, SERVERS_DIR
+    backend = JsonBackend(servers_dir or SERVERS_DIR)
+    before, after, players = [], [], 0
+    for guild_id in backend.guild_ids():
+        batch = []
+        for user_id in backend.user_ids(guild_id):
+            data = backend.read_player(guild_id, user_id)
+            if data is None or all(is_compact(entry) for entry in data.get("active_pokemon", [])):
+                continue
+            before.append(json.loads(json.dumps(data)))
+            legacy = [(species_id_of(e), e.get("current_hp", e.get("hp", 0))) for e in data["active_pokemon"]]
+            team = compact_team(data)
+            if [(e["species_id"], e["current_hp"]) for e in team] != legacy:
+                raise ValueError(f"Active team of {user_id} in guild {guild_id} did not round-trip")
+            after.append(data)
+            batch.append((guild_id, user_id, backend.snapshot_player(guild_id, user_id, data)))
+        backend.write_batch([], batch)
+        players += len(batch)
+    if players:
+        (disk_before, mem_before), (disk_after, mem_after) = footprint(before), footprint(after)
+        print(f"[Team] Files: {disk_before:,} -> {disk_after:,} bytes; parsed: {mem_before:,} -> {mem_after:,} bytes")
+    print(f"[Team] Migrated {players} active team(s) to compact instances")
+    return players
+
+if __name__ == "__main__":
+    # python -m utils.team_utils -> convert stored teams up front (otherwise each converts on its next save)
+    migrate_json_teams()
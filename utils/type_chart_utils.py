@@ -0,0 +1,92 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # only whole-table operations use numpy
+    np = None
+
+SUPER_EFFECTIVE = 2.0
+NOT_VERY_EFFECTIVE = 0.5
+
+def type_effectiveness(types, attacking, defending):
+    """
+    Multiplier for one attacking type against one defending type, from types.json.
+    "strengths" lists types a type hits hard; "weaknesses" lists types that hit it hard.
+    """
+    attacker, defender = types.get(attacking, {}), types.get(defending, {})
+    multiplier = 1.0
+    if defending in attacker.get("strengths", ()) or attacking in defender.get("weaknesses", ()):
+        multiplier *= SUPER_EFFECTIVE
+    if defending in attacker.get("weaknesses", ()) or attacking in defender.get("strengths", ()):
+        multiplier *= NOT_VERY_EFFECTIVE
+    return multiplier
+
+class TypeChart:
+    """
+    types.json compiled into a flat, integer-indexed effectiveness matrix:
+    matrix[attacking * size + defending].
+
+    Every defending type combination is folded into one row over the attacking types (the
+    product across both of a dual type's halves), so a species-vs-species multiplier is at
+    most two array reads.
+    """
+    def __init__(self, types, registry=None):
+        self.names = tuple(types)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.size = len(self.names)
+        self.matrix = array("d", (
+            type_effectiveness(types, attacking, defending)
+            for attacking in self.names for defending in self.names
+        ))
+        self._defense_rows = {}
+        self.species_ids = ()
+        self.species_types = {}
+        if registry is not None:
+            for species in registry.species:
+                self.defense_row(species.types)
+            self.species_ids = tuple(s.id for s in registry.species)
+            self.species_types = {s.id: s.types for s in registry.species}
+
+    def effectiveness(self, attacking, defending):
+        return self.matrix[self.index[attacking] * self.size + self.index[defending]]
+
+    def defense_row(self, defending_types):
+        """Multiplier taken by this type combination from each attacking type (cached per combination)."""
+        key = tuple(defending_types)
+        row = self._defense_rows.get(key)
+        if row is None:
+            row = array("d", [1.0] * self.size)
+            for defending in key:
+                d = self.index.get(defending)
+                if d is None:
+                    continue
+                for a in range(self.size):
+                    row[a] *= self.matrix[a * self.size + d]
+            self._defense_rows[key] = row
+        return row
+
+    def multiplier(self, attacking_types, defending_types):
+        """The attacker uses whichever of its types hits hardest."""
+        row = self.defense_row(defending_types)
+        best = None
+        for attacking in attacking_types:
+            a = self.index.get(attacking)
+            if a is not None and (best is None or row[a] > best):
+                best = row[a]
+        return 1.0 if best is None else best
+
+    def species_multiplier(self, attacker_id, defender_id):
+        return self.multiplier(self.species_types[attacker_id], self.species_types[defender_id])
+
+    def matchup_table(self):
+        """
+        Attacker species x defender species multipliers, in registry order. One vectorized
+        operation when numpy is installed, otherwise a list of rows.
+        """
+        ids = self.species_ids
+        if np is not None:
+            defense = np.array([self.defense_row(self.species_types[i]) for i in ids])  # species x attacking type
+            first = np.array([self.index[self.species_types[i][0]] for i in ids])
+            second = np.array([self.index[self.species_types[i][-1]] for i in ids])
+            return np.maximum(defense[:, first], defense[:, second]).T
+        return [[self.species_multiplier(a, d) for d in ids] for a in ids]
@@ -1,140 +1,144 @@
 import random
-import os
-import json
 import discord
 import asyncio
 import time
-from utils.capture_utils import CaptureButton
-from utils.server_handler import read_server_data, log_active_spawn
+from utils.capture_utils import capture_view
+from utils.spawn_message_utils import SPAWN_MESSAGES, spawn_embed, spawn_lifetime
+from utils.server_handler import load_server_data, log_active_spawn, retire_oldest_spawns, guild_spawns
+from utils.store_utils import GUILD_STORE
+from utils.spawn_scheduler_utils import spawn_jitter, max_spawns, slot_interval
 
-MIN_SPAWN_INTERVAL = 10  # seconds, adjust as needed
+SPAWN_SENDS_PER_SHARD = 5  # concurrent spawn messages in flight per shard
+MAX_RATELIMIT_WAIT = 30    # seconds discord.py may sleep on a rate limit (its minimum); longer ones raise
 
-async def update_wild_pokemon_message(bot, guild_id, status_message, new_embed=None):
-    from utils.server_handler import read_server_data
-    data = read_server_data(guild_id)
-    if not data:
-        return False
-    active_spawn = data.get("active_spawn")
-    if not active_spawn or "message_id" not in active_spawn:
-        return False
-    channels = data.get("channels", {})
-    wild_channel_id = channels.get("wild")
-    if not wild_channel_id:
-        return False
-    channel = bot.get_channel(int(wild_channel_id))
-    if not channel:
-        return False
-    try:
-        message = await channel.fetch_message(active_spawn["message_id"])
-        original_content = message.content or ""
-        updated_content = f"{original_content}\n\n{status_message}"
-        await message.edit(
-            content=updated_content,
-            embed=new_embed if new_embed is not None else (message.embeds[0] if message.embeds else None),
-            view=None  # Remove the button
-        )
-        return True
-    except Exception as e:
-        return False
+_SHARD_SEMAPHORES = {}
 
-def generate_wild_pokemon(bot):
-    pokemon_list = bot.pokemon
-    rarity = get_random_rarity()
-    filtered = [p for p in pokemon_list if p.get("rarity", "common").lower() == rarity]
-    if not filtered:
-        filtered = pokemon_list
-    chosen = random.choice(filtered)
-    return chosen.get("id")
-
-def get_random_rarity():
-    roll = random.random()
-    if roll < 0.005:
-        rarity = "mythic"
-    elif roll < 0.02:
-        rarity = "legendary"
-    elif roll < 0.07:
-        rarity = "rare"
-    elif roll < 0.20:
-        rarity = "uncommon"
-    else:
-        rarity = "common"
-    #print(f"[get_random_rarity] roll={roll:.4f}, rarity={rarity}")
-    return rarity
-    
-def can_spawn_pokemon(data, min_spawn_interval: int = MIN_SPAWN_INTERVAL) -> bool:
-    active_spawn = data.get("active_spawn")
-    now = int(time.time())
-    if not active_spawn or "spawn_time" not in active_spawn:
-        print(f"[can_spawn_pokemon] No active spawn or no spawn_time: True")
-        return True
-    spawn_time = int(active_spawn.get("spawn_time", 0))
-    result = (now - spawn_time) >= min_spawn_interval
-    print(f"[can_spawn_pokemon] now={now}, spawn_time={spawn_time}, interval={now-spawn_time}, min={min_spawn_interval}, result={result}")
-    return result
-
-async def handle_active_spawn(bot, guild_id, data, active_spawn):
-    channels = data.get("channels", {})
-    wild_channel_id = channels.get("wild")
-    if not wild_channel_id:
-        return
-    channel = bot.get_channel(int(wild_channel_id))
-    if not channel or "message_id" not in active_spawn:
-        return
-    try:
-        message = await channel.fetch_message(active_spawn["message_id"])
-        if message.components or message.attachments or getattr(message, "view", None):
-            await update_wild_pokemon_message(
-                bot,
-                guild_id,
-                status_message="The wild Pokémon ran away!",
-                new_embed=None
-            )
-    except discord.NotFound:
-        pass
-    except Exception as e:
-        print(f"[WARN] Could not update previous wild Pokémon message for guild {guild_id}: {e}")
+def generate_wild_pokemon(bot, settings=None):
+    """Draw one species id from the guild's compiled spawn table (see spawn_sampler_utils)."""
+    return bot.spawn_sampler.sample(settings)
 
-async def spawn_wild_pokemon_in_all_servers(bot):
-    servers_dir = os.path.join(os.getcwd(), "servers")
-    for guild_id in os.listdir(servers_dir):
-        data = read_server_data(guild_id)
-        if not data:
-            continue
+def guild_spawn_slots(bot, guild_id, settings):
+    """How many spawns this guild may have out at once (see max_spawns); member counts come from the gateway cache."""
+    guild = bot.get_guild(int(guild_id))
+    return max_spawns(settings, guild.member_count if guild else None)
+
+def guild_spawn_interval(bot, guild_id, settings):
+    return slot_interval(settings, bot.spawnrate, guild_spawn_slots(bot, guild_id, settings))
 
-        if not can_spawn_pokemon(data):
-            continue  # Only time-based check
+def schedule_next_spawn(bot, guild_id, data, after=None):
+    """Put a guild back on the spawn scheduler using its own interval, slots and jitter settings."""
+    settings = data.get("settings")
+    bot.spawn_scheduler.schedule(guild_id, guild_spawn_interval(bot, guild_id, settings), spawn_jitter(settings), after)
 
-        channels = data.get("channels", {})
-        wild_channel_id = channels.get("wild")
-        if not wild_channel_id:
+def last_spawn_time(data):
+    """When the guild's latest spawn appeared (0 if never)."""
+    guild_spawns(data)  # moves a legacy active_spawn slot's time over
+    return data.get("last_spawn_time") or 0
+
+async def seed_spawn_schedule(bot):
+    """Load every guild once at startup and schedule its next spawn from its last one."""
+    for guild_id in await GUILD_STORE.aguild_ids():
+        data = await load_server_data(guild_id)
+        if data:
+            last_spawn = last_spawn_time(data) or None
+            schedule_next_spawn(bot, guild_id, data, after=last_spawn)
+            SPAWN_MESSAGES.restore(bot, guild_id, data)
+    print(f"[Spawn] Scheduled {len(bot.spawn_scheduler)} guild(s), {len(SPAWN_MESSAGES)} spawn(s) still out")
+
+async def spawn_wild_pokemon_in_due_servers(bot, guild_ids):
+    now = time.time()
+    due = {}
+    for guild_id in guild_ids:
+        data = await load_server_data(guild_id)
+        if not data:
+            continue  # Guild was removed; it drops off the schedule
+
+        if not data.get("channels", {}).get("wild"):
+            schedule_next_spawn(bot, guild_id, data)
             continue
 
-        pokemon_id = generate_wild_pokemon(bot)
-        pokemon = next((p for p in bot.pokemon if p.get("id") == pokemon_id), None)
-        if not pokemon:
+        # A /force_spawn since this deadline was set pushes the next natural spawn back
+        last_spawn = last_spawn_time(data)
+        settings = data.get("settings")
+        if now - last_spawn < guild_spawn_interval(bot, guild_id, settings) * (1 - spawn_jitter(settings)):
+            schedule_next_spawn(bot, guild_id, data, after=last_spawn)
             continue
+        due[guild_id] = data
+
+    # Draw every due guild's species in one batch, grouped by spawn table
+    picks = bot.spawn_sampler.sample_for_guilds({guild_id: data.get("settings") for guild_id, data in due.items()})
+
+    # Fan the sends out per shard; each shard gets its own bounded pool of in-flight sends
+    by_shard = {}
+    for guild_id in due:
+        by_shard.setdefault(guild_shard_id(bot, guild_id), []).append(guild_id)
+    results = await asyncio.gather(*(
+        spawn_in_guild(bot, shard_semaphore(shard_id), guild_id, due[guild_id], picks[guild_id])
+        for shard_id, shard_guilds in by_shard.items() for guild_id in shard_guilds
+    ))
+    return results.count(True), results.count(False)
+
+def guild_shard_id(bot, guild_id):
+    # Discord's shard formula; works for guilds the cache hasn't seen yet
+    return (int(guild_id) >> 22) % (bot.shard_count or 1)
 
-        name = pokemon.get("name", "Unknown")
-        poke_type = ", ".join(pokemon.get("type", []))
-        rarity = pokemon.get("rarity", "Unknown")
-        cp = pokemon.get("cp", "?")
-        embed = discord.Embed(
-            title=f"A wild {name} appeared!",
-            color=discord.Color.green()
-        )
-        embed.add_field(name="Type", value=poke_type or "Unknown", inline=True)
-        embed.add_field(name="Rarity", value=rarity, inline=True)
-        embed.add_field(name="CP", value=str(cp), inline=True)
-        embed.set_image(url=f"{bot.media}/pokemon/{pokemon_id}.png?width=100&height=100")
-
-        channel = bot.get_channel(int(wild_channel_id))
-        if channel:
-            view = CaptureButton(guild_id, pokemon_id)
-            message = await channel.send(embed=embed, view=view)
-            log_active_spawn(guild_id, pokemon_id, status="active", trainer=None, message_id=message.id)
+def shard_semaphore(shard_id):
+    semaphore = _SHARD_SEMAPHORES.get(shard_id)
+    if semaphore is None:
+        semaphore = _SHARD_SEMAPHORES[shard_id] = asyncio.Semaphore(SPAWN_SENDS_PER_SHARD)
+    return semaphore
+
+async def spawn_in_guild(bot, semaphore, guild_id, data, pokemon_id):
+    """Send one guild's spawn. Failures are logged and contained so the rest of the tick carries on."""
+    retry_after = None
+    try:
+        pokemon = bot.registry.get_species(pokemon_id)
+        channel = bot.get_channel(int(data["channels"]["wild"]))
+        if not pokemon or not channel:
+            return None
+
+        embed = spawn_embed(bot, pokemon)
+        async with semaphore:
+            message = await channel.send(embed=embed, view=capture_view(guild_id, pokemon_id))
+        settings = data.get("settings")
+        await log_active_spawn(guild_id, pokemon_id, message.id)
+        SPAWN_MESSAGES.register(guild_id, channel.id, message.id, pokemon_id, embed, lifetime=spawn_lifetime(settings))
+        # A full guild makes room: its oldest uncaught spawn runs off
+        for message_id in await retire_oldest_spawns(guild_id, guild_spawn_slots(bot, guild_id, settings)):
+            await SPAWN_MESSAGES.settle(bot, message_id, "The wild Pokémon ran away!")
+        return True
+    except discord.RateLimited as e:
+        # Longer than discord.py would wait: skip this spawn and retry once the bucket resets,
+        # instead of holding a shard's send slot
+        retry_after = e.retry_after
+        print(f"[Spawn] Rate limited in guild {guild_id}; retrying in {retry_after:.0f}s")
+        return False
+    except Exception as e:
+        print(f"[Spawn] Failed to spawn in guild {guild_id}: {e}")
+        return False
+    finally:
+        if retry_after is None:
+            schedule_next_spawn(bot, guild_id, data)
+        else:
+            bot.spawn_scheduler.schedule_at(guild_id, time.time() + retry_after)
 
 async def wild_pokemon_spawn_clock(bot):
     await bot.wait_until_ready()
+    await seed_spawn_schedule(bot)
     while not bot.is_closed():
-        await spawn_wild_pokemon_in_all_servers(bot)
-        await asyncio.sleep(bot.spawnrate)
+        # Sleeps until the earliest guild deadline; idle guilds cost nothing
+        guild_ids = await bot.spawn_scheduler.wait_due()
+        start = time.perf_counter()
+        try:
+            spawned, failed = await spawn_wild_pokemon_in_due_servers(bot, guild_ids)
+        except Exception as e:
+            print(f"[Spawn] Tick failed: {e}")
+            spawned, failed = 0, len(guild_ids)
+            # Keep every guild on the schedule even if the pass itself blew up
+            for guild_id in guild_ids:
+                if guild_id not in bot.spawn_scheduler:
+                    bot.spawn_scheduler.schedule(guild_id, bot.spawnrate)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        bot.spawn_tick = {"due": len(guild_ids), "spawned": spawned, "failed": failed, "ms": elapsed_ms}
+        if failed or elapsed_ms > 1000:
+            print(f"[Spawn] Tick: {len(guild_ids)} due, {spawned} spawned, {failed} failed in {elapsed_ms:.0f}ms")